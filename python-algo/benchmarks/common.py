@@ -0,0 +1,117 @@
+"""
+Helpers shared by the gamelib benchmarks.
+
+The benchmarks are plain scripts, run them from anywhere with python3, for example:
+    python3 python-algo/benchmarks/bench_pathing.py
+"""
+import json
+import os
+import random
+import sys
+import timeit
+
+ALGO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(ALGO_DIR)
+if ALGO_DIR not in sys.path:
+    sys.path.insert(0, ALGO_DIR)
+
+import gamelib
+
+EMPTY_TURN = """{"p2Units":[[],[],[],[],[],[],[]],"turnInfo":[0,0,-1],"p1Stats":[30.0,25.0,5.0,0],"p1Units":[[],[],[],[],[],[],[]],"p2Stats":[30.0,25.0,5.0,0],"events":{"selfDestruct":[],"breach":[],"damage":[],"shield":[],"move":[],"spawn":[],"death":[],"attack":[],"melee":[]}}"""
+
+
+def load_config():
+    """Loads the game config shipped at the root of the repository
+    """
+    with open(os.path.join(REPO_DIR, "game-configs.json")) as config_file:
+        return json.load(config_file)
+
+
+def make_state(config, num_firewalls=0, seed=0, **kwargs):
+    """Creates a GameState with num_firewalls random firewalls, split between both players by board half
+
+    Extra keyword arguments are passed on to the GameState constructor.
+    """
+    rng = random.Random(seed)
+    state = gamelib.GameState(config, EMPTY_TURN, **kwargs)
+    state.suppress_warnings(True)
+    firewall_types = [unit["shorthand"] for unit in config["unitInformation"][:3]]
+    locations = [location for location in state.game_map]
+    for x, y in rng.sample(locations, num_firewalls):
+        player_index = 0 if y < state.HALF_ARENA else 1
+        state.game_map.add_unit(rng.choice(firewall_types), [x, y], player_index)
+    return state
+
+
+def load_replay(path):
+    """Reads a .replay file into its config and the raw json line of every frame
+
+    The config is the line holding the "debug" settings, every other non empty line is a frame.
+    """
+    config = None
+    frames = []
+    with open(path) as replay_file:
+        for line in replay_file:
+            line = line.strip()
+            if not line:
+                continue
+            data = json.loads(line)
+            if "debug" in data:
+                config = data
+            else:
+                frames.append(line)
+    return config, frames
+
+
+def turn_states(frames):
+    """The frames sent to algos at the start of each turn
+    """
+    return [frame for frame in frames if json.loads(frame)["turnInfo"][0] == 0]
+
+
+def late_game_turn(config, num_firewalls=240, num_information=40, seed=0):
+    """A serialized turn state with a crowded board, for replay free benchmarks
+    """
+    rng = random.Random(seed)
+    units = [[[] for _ in config["unitInformation"]], [[] for _ in config["unitInformation"]]]
+    state = gamelib.GameState(config, EMPTY_TURN)
+    locations = [location for location in state.game_map]
+    firewalls = rng.sample(locations, num_firewalls)
+    for x, y in firewalls:
+        player_index = 0 if y < state.HALF_ARENA else 1
+        units[player_index][rng.randrange(3)].append([x, y, 60.0, str(rng.randrange(10**6))])
+    # Information units never share a tile with a firewall
+    open_locations = [location for location in locations if location not in firewalls]
+    for x, y in rng.sample(open_locations, num_information):
+        player_index = 0 if y < state.HALF_ARENA else 1
+        units[player_index][3 + rng.randrange(3)].append([x, y, 15.0, str(rng.randrange(10**6))])
+    turn = json.loads(EMPTY_TURN)
+    turn["turnInfo"] = [0, 40, -1]
+    turn["p1Units"], turn["p2Units"] = units
+    return json.dumps(turn)
+
+
+def friendly_edge_locations(state):
+    """The bottom edge locations a friendly information unit could be deployed on
+    """
+    game_map = state.game_map
+    edges = game_map.get_edge_locations(game_map.BOTTOM_LEFT) + game_map.get_edge_locations(game_map.BOTTOM_RIGHT)
+    return [location for location in edges if not state.contains_stationary_unit(location)]
+
+
+def time_call(func, repeat=5, number=None):
+    """Best wall time of a single call to func, in seconds
+    """
+    timer = timeit.Timer(func)
+    if number is None:
+        number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def report(label, seconds, baseline=None):
+    """Prints a timing line, with the speedup over baseline when one is given
+    """
+    line = "{:<48} {:>10.1f} us".format(label, seconds * 1e6)
+    if baseline is not None:
+        line += "   x{:.1f}".format(baseline / seconds)
+    print(line)
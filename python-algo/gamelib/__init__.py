@@ -12,18 +12,28 @@ Investigating it is useful for any player that wants to access information about
 
 The AlgoCore class in algocore.py handles communication with the game engine, and forms the bones of an algo. AlgoStrategy inherits from it. 
 Investigating it is useful for advanced players interested in getting data from the action phase or communicating directly with the game engine. \n
+AlgoCore also gives every turn a Deadline, and runs the AnytimeSearch of anytime.py until it with search_turn(). \n
+Set its profile attribute, or the GAMELIB_PROFILE environment variable, to time the major calls of every turn with profiling.py. \n
 
 The Navigation class in navigation.py contains functions related to pathfinding, which are used by GameState in pathing related functions. 
 Investigating it is useful for advanced player who want to optimize the slow default pathing algorithm we provide. \n 
 
+The ThreatMap class in threat_map.py tracks destructor damage and encryptor shielding on every tile. 
+GameState keeps it up to date and exposes it through get_damage_map() and get_shield_map(). \n
+
+The Simulator class in simulator.py predicts the outcome of an action phase, such as how much damage an attack would deal, without the game engine. \n
+replay.py reads the .replay files of the game engine, and checks the simulator against them with python -m gamelib.replay REPLAY_DIR. \n
+offline_engine.py runs an algo on the turns of a .replay file without the game engine, with python -m gamelib.offline_engine REPLAY ALGO. \n
+
 util.py contains a small handful of functions that help with communication, including the debug-printing function, debug_write().
+Messages with the game engine are parsed with orjson or ujson when one is installed, see set_json_codec().
 """
 
 from .algocore import AlgoCore
-from .util import debug_write
+from .util import debug_write, debug_log, DEBUG, INFO, WARNING, ERROR
 from .game_state import GameState
 from .unit import GameUnit
 from .game_map import GameMap
 
-__all__ = ["algocore", "game_state", "game_map", "navigation", "unit", "util"]
+__all__ = ["algocore", "anytime", "game_state", "game_map", "navigation", "offline_engine", "profiling", "replay", "simulator", "threat_map", "unit", "util"]
  
\ No newline at end of file
@@ -1,7 +1,12 @@
-import json
+import os
+import threading
+import time
 
+from .anytime import Deadline, AnytimeSearch
 from .game_state import GameState
-from .util import get_command, debug_write, BANNER_TEXT, send_command
+from .profiling import Profiler, GAME_STATE_METHODS, default_report_path
+from .simulator import Simulator
+from .util import get_command, debug_write, get_debug_log, BANNER_TEXT, send_command, get_state_type, parse_fields, get_json_codec, json_loads
 
 class AlgoCore(object):
     """
@@ -10,10 +15,42 @@ class AlgoCore(object):
 
     Attributes :
         * config (JSON): json object containing information about the game
+        * deadline (:obj: Deadline): When the current turn has to be submitted by. Set before each on_turn, see turn_deadline
+        * safety_margin (float): The seconds kept free at the end of each turn, to submit it and for the time the engine
+          counts but the algo can not see, such as reading the game state
+        * background_precompute (bool): Opt in to running precompute_next_turn in a background thread during each action phase.
+          False by default
+        * precomputed: What precompute_next_turn returned during the last action phase, set before each on_turn.
+          None on the first turn, when background_precompute is off, or when the precomputation failed or was not done in time
+        * precompute_timeout (float): The most seconds the start of a turn waits for precompute_next_turn to return once asked
+          to stop. Past it the precomputation is left to finish on its own and its result is thrown away
+        * action_frame_format (str): What on_action_frame is passed. "string", the default, is the message as received.
+          "dict" is the message parsed once by AlgoCore. "events" is a dict of only the turnInfo and events of the frame,
+          which skips parsing the units and is the fastest when only events are needed
+        * profile (bool): Opt in to counting the calls and time of on_turn, on_action_frame and the major GameState methods
+          turn by turn. At the end of the game the breakdown is written to profile_path and a summary is debug printed.
+          False by default, unless the GAMELIB_PROFILE environment variable is set
+        * profile_path (str): The json file the profile is written to, a new file in the replays directory if None
+        * profiler (:obj: Profiler): The profiler of the game, None when profile is off
 
     """
     def __init__(self):
         self.config = None
+        self.deadline = None
+        self.safety_margin = 0.25
+        # The turn time the engine measured last turn beyond our own measure, learned from the time in p1Stats
+        self._overhead = 0
+        self._last_turn_seconds = None
+        self.action_frame_format = "string"
+        self.background_precompute = False
+        self.precomputed = None
+        self.precompute_timeout = 0.05
+        self._precompute_thread = None
+        self._precompute_stop = None
+        self._precompute_result = None
+        self.profile = bool(os.environ.get("GAMELIB_PROFILE"))
+        self.profile_path = None
+        self.profiler = None
 
     def on_game_start(self, config):
         """
@@ -34,15 +71,147 @@ class AlgoCore(object):
         send_command("")
         send_command("") 
     
+    def turn_deadline(self, received, time_spent=None):
+        """Creates the deadline of a turn
+
+        The turn is given waitTimeBotSoft from the game config, the limit past which the engine starts penalizing slow turns,
+        minus safety_margin and the overhead the engine measured on the previous turn beyond the algo's own measure.
+        Override it to spend more time on some turns, the engine ends the game for an algo past waitTimeBotMax.
+
+        Args:
+            * received (float): When the turn state was received, in time.perf_counter() seconds
+            * time_spent: The milliseconds the engine counted for the previous turn, as in GameState.my_time
+
+        Returns:
+            A Deadline
+
+        """
+        if time_spent is not None and self._last_turn_seconds is not None:
+            self._overhead = max(0, time_spent / 1000 - self._last_turn_seconds)
+        soft_limit = self.config["timingAndReplay"]["waitTimeBotSoft"] / 1000 if self.config else 2
+        return Deadline(max(0, soft_limit - self.safety_margin - self._overhead), received)
+
+    def search_turn(self, game_state, search, apply_candidate):
+        """Runs an anytime search until the turn deadline, then plays the best candidate and submits the turn
+
+        Args:
+            * game_state (:obj: GameState): The state of this turn
+            * search (:obj: AnytimeSearch): A search with its generators and evaluators added, see new_search
+            * apply_candidate: A callable taking game_state and the best candidate, that makes its attempt_spawn
+              and attempt_remove calls. Not called if no candidate was found.
+
+        Returns:
+            The candidate that was played, or None
+
+        """
+        best = search.run()
+        debug_write("Searched {} candidates, {}".format(search.evaluated, search.deadline))
+        if best is not None:
+            apply_candidate(game_state, best)
+        game_state.submit_turn()
+        return best
+
+    def new_search(self):
+        """Creates an AnytimeSearch that stops at the deadline of the current turn, or of a turn starting now outside the game loop
+        """
+        if self.deadline is None:
+            self.deadline = self.turn_deadline(time.perf_counter())
+        return AnytimeSearch(self.deadline)
+
+    def precompute_next_turn(self, action_frame_game_state, stop):
+        """
+        Called in a background thread at the first frame of every action phase when background_precompute is True.
+        Its return value is handed to the next on_turn as self.precomputed. \n
+        By default it simulates the action phase to predict the board of the next turn, then computes the path fields
+        of every edge and the threat maps of that board, and returns the predicted GameState. Path fields are remembered
+        by firewall layout, so path queries of the next turn are faster if the prediction was right. \n
+        You can override it to precompute anything likely to be needed next turn, such as candidate placements.
+        Runs while the engine streams action frames and while on_action_frame is called. Check stop.is_set() between steps:
+        it is set when the next turn arrives, and on_turn waits at most precompute_timeout for this function to return.
+
+        Args:
+            * action_frame_game_state (str): The first frame of the action phase
+            * stop (:obj: threading.Event): Set when the result is needed
+
+        """
+        game_state = GameState(self.config, action_frame_game_state)
+        game_state.suppress_warnings(True)
+        result = Simulator(self.config).simulate(game_state, stop=stop)
+        if result.stopped:
+            # Half an action phase predicts nothing
+            return None
+        predicted = result.game_state
+        if stop.is_set():
+            return predicted
+        predicted.precompute_paths()
+        if stop.is_set():
+            return predicted
+        predicted.get_damage_map(0)
+        predicted.get_damage_map(1)
+        return predicted
+
+    def __start_precompute(self, action_frame_game_state):
+        stop = self._precompute_stop = threading.Event()
+        # Each run has its own result, so a run given up on can not overwrite the result of the next one
+        result = self._precompute_result = [None]
+
+        def run():
+            try:
+                result[0] = self.precompute_next_turn(action_frame_game_state, stop)
+            except Exception as error:
+                debug_write("precompute_next_turn failed: {!r}".format(error))
+        self._precompute_thread = threading.Thread(target=run, name="precompute_next_turn", daemon=True)
+        self._precompute_thread.start()
+
+    def __finish_precompute(self):
+        if self._precompute_thread is None:
+            return None
+        self._precompute_stop.set()
+        self._precompute_thread.join(self.precompute_timeout)
+        finished = not self._precompute_thread.is_alive()
+        self._precompute_thread = None
+        if not finished:
+            debug_write("precompute_next_turn did not stop within {}s, its result is thrown away".format(self.precompute_timeout))
+            return None
+        return self._precompute_result[0]
+
+    def __start_profiling(self):
+        self.profiler = Profiler()
+        self.profiler.patch(self, "on_turn")
+        self.profiler.patch(self, "on_action_frame")
+        for name in GAME_STATE_METHODS:
+            self.profiler.patch(GameState, name)
+
+    def __finish_profiling(self):
+        if self.profiler is None:
+            return
+        self.profiler.restore()
+        path = self.profile_path or default_report_path()
+        if self.profiler.write(path):
+            debug_write("Wrote the profile to {}".format(path))
+        debug_write(self.profiler.summary())
+
     def on_action_frame(self, action_frame_game_state):
         """
         After each deploy phase, the game engine will run the action phase of the round.
         The action phase is made up of a sequence of distinct frames. 
         Each of these frames is sent to the algo in order. 
         They can be handled in this function. 
+        The frame is a string, or a dict depending on action_frame_format.
         """
         pass
 
+    def __parse_action_frame(self, action_frame_game_state):
+        if self.action_frame_format == "events":
+            # orjson and ujson parse a whole frame faster than the stdlib decodes just its events
+            if get_json_codec() == "stdlib":
+                return parse_fields(action_frame_game_state, "turnInfo", "events")
+            state = json_loads(action_frame_game_state)
+            return {"turnInfo": state["turnInfo"], "events": state["events"]}
+        if self.action_frame_format == "dict":
+            return json_loads(action_frame_game_state)
+        return action_frame_game_state
+
 
     def start(self):
         """ 
@@ -52,36 +221,52 @@ class AlgoCore(object):
         The algo continues this loop until it recieves the "End" turn message from the game.
         """
         debug_write(BANNER_TEXT)
+        if self.profile:
+            self.__start_profiling()
 
         while True:
             # Note: Python blocks and hangs on stdin. Can cause issues if connections aren't setup properly and may need to
             # manually kill this Python program.
             game_state_string = get_command()
+            received = time.perf_counter()
             if "replaySave" in game_state_string:
                 """
                 This means this must be the config file. So, load in the config file as a json and add it to your AlgoStrategy class.
                 """
-                parsed_config = json.loads(game_state_string)
+                parsed_config = json_loads(game_state_string)
                 self.on_game_start(parsed_config)
             elif "turnInfo" in game_state_string:
-                state = json.loads(game_state_string)
-                stateType = int(state.get("turnInfo")[0])
+                # Only the type is read here, each message is parsed at most once, by whoever needs it
+                stateType = get_state_type(game_state_string)
                 if stateType == 0:
                     """
                     This is the game turn game state message. Algo must now print to stdout 2 lines, one for build phase one for
                     deploy phase. Printing is handled by the provided functions.
                     """
+                    fields = parse_fields(game_state_string, "turnInfo", "p1Stats")
+                    time_spent = fields.get("p1Stats", [0] * 4)[3]
+                    self.deadline = self.turn_deadline(received, time_spent)
+                    self.precomputed = self.__finish_precompute()
+                    get_debug_log().new_turn()
+                    if self.profiler is not None:
+                        self.profiler.new_turn(fields.get("turnInfo", [0, None])[1], time_spent)
                     self.on_turn(game_state_string)
+                    self._last_turn_seconds = time.perf_counter() - received
                 elif stateType == 1:
                     """
                     If stateType == 1, this game_state_string string represents a single frame of an action phase
                     """
-                    self.on_action_frame(game_state_string)
+                    if self.background_precompute and self._precompute_thread is None:
+                        self.__start_precompute(game_state_string)
+                    self.on_action_frame(self.__parse_action_frame(game_state_string))
                 elif stateType == 2:
                     """
                     This is the end game message. This means the game is over so break and finish the program.
                     """
                     debug_write("Got end state, game over. Stopping algo.")
+                    self.__finish_precompute()
+                    self.__finish_profiling()
+                    get_debug_log().flush()
                     break
                 else:
                     """
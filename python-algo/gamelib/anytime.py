@@ -0,0 +1,128 @@
+import time
+
+from .util import debug_write
+
+
+class Deadline:
+    """A point in time a turn has to be submitted by
+
+    Attributes :
+        * start (float): When the deadline started, in time.perf_counter() seconds
+        * seconds (float): How long after start the deadline expires
+
+    """
+    def __init__(self, seconds, start=None):
+        """Starts a deadline
+
+        Args:
+            * seconds (float): The time allowed, in seconds
+            * start (float): When the time started counting, in time.perf_counter() seconds. Now if None.
+
+        """
+        self.start = time.perf_counter() if start is None else start
+        self.seconds = seconds
+
+    def elapsed(self):
+        """The seconds spent since the deadline started
+        """
+        return time.perf_counter() - self.start
+
+    def remaining(self):
+        """The seconds left before the deadline expires, negative once it has
+        """
+        return self.seconds - self.elapsed()
+
+    def expired(self):
+        """Whether the deadline has passed
+        """
+        return self.remaining() <= 0
+
+    def __str__(self):
+        return "{:.3f}s of {:.3f}s left".format(self.remaining(), self.seconds)
+
+
+class AnytimeSearch:
+    """Looks for the best candidate it can find before a deadline
+
+    Candidates come from generators, callables returning an iterable of candidates, which may be endless.
+    Generators are drawn from in turn, one candidate each, so cheap generators do not starve the others.
+    Every candidate is scored by the weighted sum of the evaluators, callables returning a number, higher is better.
+    The best candidate so far is kept, so stopping at any point gives a usable answer. Evaluations are not interrupted:
+    a new one is only started if the time left is longer than the slowest evaluation so far.
+
+    Attributes :
+        * deadline (:obj: Deadline): When to stop searching
+        * best: The best candidate found, None until one was evaluated
+        * best_score (float): The score of best
+        * evaluated (int): The number of candidates evaluated
+
+    """
+    def __init__(self, deadline):
+        """Creates a search with no generators or evaluators
+
+        Args:
+            * deadline (:obj: Deadline): When to stop searching, see AlgoCore.deadline
+
+        """
+        self.deadline = deadline
+        self.best = None
+        self.best_score = float("-inf")
+        self.evaluated = 0
+        self.__generators = []
+        self.__evaluators = []
+
+    def add_generator(self, generator):
+        """Registers a source of candidates
+
+        Args:
+            * generator: A callable returning an iterable of candidates
+
+        """
+        self.__generators.append(generator)
+
+    def add_evaluator(self, evaluator, weight=1.0):
+        """Registers a scoring function
+
+        Args:
+            * evaluator: A callable taking a candidate and returning a number, higher is better
+            * weight (float): What the evaluator's score is multiplied by in the total score
+
+        """
+        self.__evaluators.append((evaluator, weight))
+
+    def score(self, candidate):
+        """The weighted sum of the evaluators' scores of a candidate
+        """
+        return sum(weight * evaluator(candidate) for evaluator, weight in self.__evaluators)
+
+    def run(self):
+        """Evaluates candidates until the deadline or until every generator is exhausted
+
+        Can be called again to keep searching with a later deadline, the best candidate is kept.
+
+        Returns:
+            The best candidate found, None if there was none
+
+        """
+        if not self.__evaluators:
+            debug_write("AnytimeSearch has no evaluators, call add_evaluator first")
+            return self.best
+        sources = [iter(generator()) for generator in self.__generators]
+        slowest = 0
+        while sources and self.deadline.remaining() > slowest:
+            for source in list(sources):
+                try:
+                    candidate = next(source)
+                except StopIteration:
+                    sources.remove(source)
+                    continue
+                started = time.perf_counter()
+                score = self.score(candidate)
+                slowest = max(slowest, time.perf_counter() - started)
+                self.evaluated += 1
+                if score > self.best_score:
+                    self.best = candidate
+                    self.best_score = score
+                if self.deadline.remaining() <= slowest:
+                    break
+        return self.best
@@ -1,13 +1,90 @@
+import copy
 import math
-from .unit import GameUnit
-from .util import debug_write
+import os
+import random
+from collections.abc import MutableSequence
+from .unit import GameUnit, get_unit_type
+from .util import debug_write, debug_log, WARNING
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# How many wall changes GameMap remembers for get_wall_changes
+WALL_JOURNAL_SIZE = 256
+
+ARENA_SIZE = 28
+HALF_ARENA = ARENA_SIZE // 2
+
+
+def _compute_in_arena_bounds(x, y):
+    """The arithmetic behind GameMap.in_arena_bounds, used to build the lookup tables
+    """
+    row_size = y + 1
+    startx = HALF_ARENA - row_size
+    endx = startx + (2 * row_size) - 1
+    top_half_check = (y < HALF_ARENA and x >= startx and x <= endx)
+
+    row_size = (ARENA_SIZE - 1 - y) + 1
+    startx = HALF_ARENA - row_size
+    endx = startx + (2 * row_size) - 1
+    bottom_half_check = (y >= HALF_ARENA and x >= startx and x <= endx)
+
+    return bottom_half_check or top_half_check
+
+
+# Built once per process: IN_ARENA_BOUNDS[x][y] tells if a tile is on the board, TILE_LOCATIONS lists the
+# board tiles row by row from the bottom, and TILE_IDS[x][y] is the position of a tile in TILE_LOCATIONS or -1
+IN_ARENA_BOUNDS = [[_compute_in_arena_bounds(x, y) for y in range(ARENA_SIZE)] for x in range(ARENA_SIZE)]
+TILE_LOCATIONS = [(x, y) for y in range(ARENA_SIZE) for x in range(ARENA_SIZE) if IN_ARENA_BOUNDS[x][y]]
+TILE_IDS = [[-1] * ARENA_SIZE for _ in range(ARENA_SIZE)]
+for _tile_id, (_x, _y) in enumerate(TILE_LOCATIONS):
+    TILE_IDS[_x][_y] = _tile_id
+TILE_COUNT = len(TILE_LOCATIONS)
+
+# Shared by every GameMap: the (dx, dy) offsets within each radius used so far, in the order
+# get_locations_in_range lists them, and per radius the in-bounds locations around each tile id
+_RANGE_STENCILS = {}
+_RANGE_TABLES = {}
+
+
+def _get_range_stencil(radius):
+    """The offsets of the tiles within radius of a tile, built once per radius
+    """
+    stencil = _RANGE_STENCILS.get(radius)
+    if stencil is None:
+        search_radius = math.ceil(radius)
+        offsets = range(-search_radius, search_radius + 1)
+        # A unit with a given range affects all locations who's centers are within that range + 0.51 so we add 0.51 here
+        stencil = tuple((dx, dy) for dx in offsets for dy in offsets if math.sqrt(dx**2 + dy**2) < radius + 0.51)
+        _RANGE_STENCILS[radius] = stencil
+    return stencil
+
+# Zobrist keys, for every unit type a random 64 bit key per tile and owner (0, 1 or None).
+# They are derived from the unit type alone, so hashes agree between processes and turns
+ZOBRIST_MASK = (1 << 64) - 1
+_ZOBRIST_KEYS = {}
+
+
+def _get_zobrist_keys(unit_type):
+    """The Zobrist keys of a unit type, indexed by tile_id * 3 + owner, with owner 2 standing for None
+    """
+    keys = _ZOBRIST_KEYS.get(unit_type)
+    if keys is None:
+        rng = random.Random("zobrist {}".format(unit_type))
+        keys = tuple(rng.getrandbits(64) for _ in range(3 * TILE_COUNT))
+        _ZOBRIST_KEYS[unit_type] = keys
+    return keys
+
 
 class GameMap:
     """Holds data about the current game map and provides functions
     useful for getting information related to the map.
 
     game_map[x, y] will return a list of Units located at that location, 
-    or an empty list if there are no units at the location
+    or an empty list if there are no units at the location.
+    The list may be shared with forks of the map, use edit_tile to change it in place
 
     Attributes :
         * config (JSON): Contains information about the current game rules
@@ -18,6 +95,17 @@ class GameMap:
         * TOP_LEFT (int): A constant that represents the top left edge
         * BOTTOM_LEFT (int): Hidden challenge! Can you guess what this constant represents???
         * BOTTOM_RIGHT (int): A constant that represents the bottom right edge
+        * TILE_COUNT (int): The number of tiles on the board. Each tile has a dense id between 0 and TILE_COUNT - 1,
+          see get_tile_id and get_tile_location. Iterating over the map yields the tiles in id order.
+        * walls_version (int): Incremented whenever add_unit, remove_unit, item assignment or rollback changes the firewalls on the map.
+          Results that depend on the walls, such as paths, can be cached until it changes.
+          Changes made directly to the lists returned by game_map[x, y] are not tracked.
+          The most recent changes can be retrieved with get_wall_changes.
+        * zobrist_hash (int): A 64 bit hash of the (tile, unit type, owner) of every unit on the map, kept up to date by
+          add_unit, remove_unit, item assignment and rollback. Equal boards have equal hashes, in any process and on any turn,
+          so it can key results reused across search branches and turns. Call rehash after changing the lists returned
+          by game_map[x, y] directly.
+        * firewall_hash (int): The same hash over the firewalls only, enough to key results that only depend on the walls such as paths
 
     """
     def __init__(self, config):
@@ -35,45 +123,204 @@ class GameMap:
         self.TOP_LEFT = 1
         self.BOTTOM_LEFT = 2
         self.BOTTOM_RIGHT = 3
-        self.__map = self.__empty_grid()
-        self.__start = [13,0]
+        self.TILE_COUNT = TILE_COUNT
+        for unit_information in config.get("unitInformation", []):
+            if "range" in unit_information:
+                _get_range_stencil(unit_information["range"])
+        self.walls_version = 0
+        self._wall_journal = []
+        self._wall_journal_base = 0
+        self.__tiles = [[] for _ in range(TILE_COUNT)]
+        # Set by fork, flags the tiles whose lists are still shared with another map
+        self.__shared = None
+        # Started by checkpoint, the (x, y, tile snapshot) of every tile before each change
+        self._undo_log = None
+        # The (token, undo log length) of every checkpoint that can still be rolled back to, oldest first
+        self._checkpoints = []
+        self._next_checkpoint = 0
+        self.zobrist_hash = 0
+        self.firewall_hash = 0
     
     def __getitem__(self, location):
         if len(location) == 2 and self.in_arena_bounds(location):
             x,y = location
-            return self.__map[x][y]
+            return self._read_tile(x, y)
         self._invalid_coordinates(location)
 
     def __setitem__(self, location, val):
         if type(location) == tuple and len(location) == 2 and self.in_arena_bounds(location):
-            self.__map[location[0]][location[1]] = val
+            x, y = location
+            if self._undo_log is not None:
+                self._undo_log.append((x, y, self._snapshot_tile(x, y)))
+            was_blocked = self.__has_stationary(self._read_tile(x, y))
+            old_hashes = self.__tile_hashes(x, y)
+            self._replace_tile(x, y, val)
+            self.__update_hashes(x, y, old_hashes)
+            self.__record_wall_change(x, y, was_blocked, self.__has_stationary(val))
             return
         self._invalid_coordinates(location)
 
     def __iter__(self):
-        self.__start = [13,0]
-        return self
-    
-    def __next__(self):
-        location = self.__start
-        if location == [15,27]:
-            raise StopIteration
-        new_location = [location[0]+1, location[1]]
-        while not self.in_arena_bounds(new_location) and not location == [14,27]:
-            if new_location[0] == self.ARENA_SIZE:
-                new_location = [0, new_location[1]+1]
-            else:
-                new_location = [new_location[0]+1, new_location[1]]
-        self.__start = new_location
-        return location 
-
-    def __empty_grid(self):
-        grid = []
-        for x in range(0, self.ARENA_SIZE):
-            grid.append([])
-            for _ in range(0, self.ARENA_SIZE):
-                grid[x].append([])
-        return grid
+        return ([x, y] for x, y in TILE_LOCATIONS)
+
+    def edit_tile(self, location):
+        """Gets the list of units at a location, to be changed in place
+
+        On a forked map the list is copied first, so the changes stay on this map. Like any direct change to the lists
+        of the map, they are not tracked by walls_version, the hashes or checkpoints, see rehash.
+
+        Args:
+            location: The location of the tile
+
+        Returns:
+            The list of units at location
+
+        """
+        if len(location) == 2 and self.in_arena_bounds(location):
+            x, y = location
+            return self._get_tile(x, y)
+        self._invalid_coordinates(location)
+
+    def _get_tile(self, x, y):
+        """The live list of units at an on-board tile, copied first if it is shared with a fork
+        """
+        tile_id = TILE_IDS[x][y]
+        if self.__shared is not None and self.__shared[tile_id]:
+            self.__tiles[tile_id] = list(self.__tiles[tile_id])
+            self.__shared[tile_id] = 0
+        return self.__tiles[tile_id]
+
+    def _read_tile(self, x, y):
+        """The units at an on-board tile, not to be modified
+        """
+        return self.__tiles[TILE_IDS[x][y]]
+
+    def _replace_tile(self, x, y, units):
+        """Replaces the units at an on-board tile, without recording any wall change
+        """
+        tile_id = TILE_IDS[x][y]
+        self.__tiles[tile_id] = units
+        if self.__shared is not None:
+            self.__shared[tile_id] = 0
+
+    def _snapshot_tile(self, x, y):
+        """What _restore_tile needs to put an on-board tile back as it is now
+        """
+        units = self.__tiles[TILE_IDS[x][y]]
+        return (units, len(units))
+
+    def _restore_tile(self, x, y, snapshot):
+        """Puts back a tile saved by _snapshot_tile, without recording any wall change
+        """
+        units, length = snapshot
+        # Units appended since the snapshot was taken are dropped, a replaced list was left untouched.
+        # The list is copied rather than cut short, a fork made after the snapshot may still share it
+        self._replace_tile(x, y, units[:length])
+
+    def checkpoint(self):
+        """Starts recording the changes made with add_unit, remove_unit and item assignment, so they can be undone
+
+        Changes made directly to the lists returned by game_map[x, y] or to the units are not recorded.
+
+        Changes are recorded until every checkpoint is rolled back to or released.
+
+        Returns:
+            A token to pass to rollback or release. Checkpoints can be nested, rolling back to a token
+            also undoes the changes made after any later checkpoint, and invalidates those later checkpoints.
+
+        """
+        if self._undo_log is None:
+            self._undo_log = []
+        token = self._next_checkpoint
+        self._next_checkpoint += 1
+        self._checkpoints.append((token, len(self._undo_log)))
+        return token
+
+    def rollback(self, token, keep=False):
+        """Undoes the changes recorded since a checkpoint
+
+        The undone firewall changes are recorded as new wall changes, so walls_version keeps increasing
+        and anything cached against it catches up as usual.
+
+        Args:
+            token: A token returned by checkpoint
+            keep: Whether the checkpoint stays valid, to try and undo other changes from it.
+              By default it is released, see release
+
+        Returns:
+            True if the map is back to the state it had at the checkpoint, False if the token is no longer valid,
+            because an earlier checkpoint was rolled back to since, or it was made on another map
+
+        """
+        index = self.__checkpoint_index(token)
+        if index is None:
+            self.warn("Rollback to checkpoint {} is not possible, it was already rolled back past".format(token))
+            return False
+        length = self._checkpoints[index][1]
+        del self._checkpoints[index + 1:]
+        while len(self._undo_log) > length:
+            x, y, snapshot = self._undo_log.pop()
+            was_blocked = self.__has_stationary(self._read_tile(x, y))
+            old_hashes = self.__tile_hashes(x, y)
+            self._restore_tile(x, y, snapshot)
+            self.__update_hashes(x, y, old_hashes)
+            is_blocked = self.__has_stationary(self._read_tile(x, y))
+            if was_blocked or is_blocked:
+                self.__record_wall_change(x, y, was_blocked, is_blocked)
+        if not keep:
+            self.__release_from(index)
+        return True
+
+    def release(self, token):
+        """Keeps the changes made since a checkpoint, which can no longer be rolled back to, nor any later checkpoint
+
+        Once no checkpoint is left, changes stop being recorded and the recorded ones are freed.
+
+        Args:
+            token: A token returned by checkpoint
+
+        Returns:
+            True if the checkpoint was released, False if the token is no longer valid
+
+        """
+        index = self.__checkpoint_index(token)
+        if index is None:
+            self.warn("Checkpoint {} can not be released, it was already rolled back past or released".format(token))
+            return False
+        self.__release_from(index)
+        return True
+
+    def __release_from(self, index):
+        del self._checkpoints[index:]
+        if not self._checkpoints:
+            self._undo_log = None
+
+    def __checkpoint_index(self, token):
+        for index, (checkpoint_token, _) in enumerate(self._checkpoints):
+            if checkpoint_token == token:
+                return index
+        return None
+
+    def fork(self):
+        """Creates a copy of the map that can be changed independently
+
+        The copy starts out sharing the unit lists of every tile with this map. Either map copies
+        a list the first time it is changed with add_unit, remove_unit, item assignment or edit_tile, so forking
+        and reading the map cost little more than copying a list of TILE_COUNT references. The units themselves are shared:
+        replace them with add_unit, remove_unit or item assignment rather than modifying their attributes.
+
+        Returns:
+            A new map with the same units, walls_version and wall changes
+
+        """
+        child = copy.copy(self)
+        child.__tiles = self.__tiles[:]
+        self.__shared = bytearray(b"\x01") * TILE_COUNT
+        child.__shared = bytearray(b"\x01") * TILE_COUNT
+        child._wall_journal = self._wall_journal[:]
+        child._undo_log = None
+        child._checkpoints = []
+        return child
 
     def _invalid_coordinates(self, location):
         self.warn("{} is out of bounds.".format(str(location)))
@@ -89,19 +336,37 @@ class GameMap:
         
         """
         x, y = location
-        half_board = self.HALF_ARENA
+        if type(x) == int and type(y) == int:
+            return 0 <= x < ARENA_SIZE and 0 <= y < ARENA_SIZE and IN_ARENA_BOUNDS[x][y]
+        return _compute_in_arena_bounds(x, y)
 
-        row_size = y + 1
-        startx = half_board - row_size
-        endx = startx + (2 * row_size) - 1
-        top_half_check = (y < self.HALF_ARENA and x >= startx and x <= endx)
+    def get_tile_id(self, location):
+        """Gets the dense id of a board tile
 
-        row_size = (self.ARENA_SIZE - 1 - y) + 1
-        startx = half_board - row_size
-        endx = startx + (2 * row_size) - 1
-        bottom_half_check = (y >= self.HALF_ARENA and x >= startx and x <= endx)
+        Args:
+            location: A map location
 
-        return bottom_half_check or top_half_check
+        Returns:
+            An integer between 0 and TILE_COUNT - 1 that can index flat per-tile arrays, or -1 if the location is not on the board
+
+        """
+        x, y = location
+        if not self.in_arena_bounds(location):
+            return -1
+        return TILE_IDS[int(x)][int(y)]
+
+    def get_tile_location(self, tile_id):
+        """Gets the location of a tile from its dense id
+
+        Args:
+            tile_id: An id returned by get_tile_id
+
+        Returns:
+            The [x, y] location of the tile
+
+        """
+        x, y = TILE_LOCATIONS[tile_id]
+        return [x, y]
 
     def get_edge_locations(self, quadrant_description):
         """Takes in an edge description and returns a list of locations.
@@ -167,11 +432,18 @@ class GameMap:
             self.warn("Player index {} is invalid. Player index should be 0 or 1.".format(player_index))
 
         x, y = location
+        if self._undo_log is not None:
+            self._undo_log.append((x, y, self._snapshot_tile(x, y)))
         new_unit = GameUnit(unit_type, self.config, player_index, None, location[0], location[1])
+        old_hashes = self.__tile_hashes(x, y)
         if not new_unit.stationary:
-            self.__map[x][y].append(new_unit)
+            self._get_tile(x, y).append(new_unit)
+            self.__update_hashes(x, y, old_hashes)
         else:
-            self.__map[x][y] = [new_unit]
+            was_blocked = self.__has_stationary(self._read_tile(x, y))
+            self._replace_tile(x, y, [new_unit])
+            self.__update_hashes(x, y, old_hashes)
+            self.__record_wall_change(x, y, was_blocked, True)
 
     def remove_unit(self, location):
         """Remove all units on the map in the given location.
@@ -186,7 +458,78 @@ class GameMap:
             self._invalid_coordinates(location)
         
         x, y = location
-        self.__map[x][y] = []
+        if self._undo_log is not None:
+            self._undo_log.append((x, y, self._snapshot_tile(x, y)))
+        was_blocked = self.__has_stationary(self._read_tile(x, y))
+        old_hashes = self.__tile_hashes(x, y)
+        self._replace_tile(x, y, [])
+        self.__update_hashes(x, y, old_hashes)
+        if was_blocked:
+            self.__record_wall_change(x, y, True, False)
+
+    def get_wall_changes(self, since_version):
+        """Gets the firewall changes made after walls_version was since_version
+
+        Args:
+            since_version: A previous value of walls_version
+
+        Returns:
+            A list of (x, y, was_blocked, is_blocked) tuples in the order the changes were made,
+            or None if the changes are no longer remembered.
+        """
+        if since_version < self._wall_journal_base or since_version > self.walls_version:
+            return None
+        if not self._wall_journal_base + len(self._wall_journal) == self.walls_version:
+            return None
+        return self._wall_journal[since_version - self._wall_journal_base:]
+
+    def rehash(self):
+        """Recomputes zobrist_hash and firewall_hash from every tile
+
+        Only needed after changing the lists returned by game_map[x, y] directly, as GameState does while parsing a turn.
+
+        Returns:
+            The new zobrist_hash
+
+        """
+        self.zobrist_hash = 0
+        self.firewall_hash = 0
+        for x, y in TILE_LOCATIONS:
+            self.__update_hashes(x, y, (0, 0))
+        return self.zobrist_hash
+
+    def __tile_hashes(self, x, y):
+        # Keys are added rather than xored, so stacked identical information units do not cancel out
+        tile_hash = 0
+        firewall_hash = 0
+        offset = 3 * TILE_IDS[x][y]
+        for unit in self._read_tile(x, y):
+            owner = unit.player_index if unit.player_index == 0 or unit.player_index == 1 else 2
+            key = _get_zobrist_keys(unit.unit_type)[offset + owner]
+            tile_hash += key
+            if unit.stationary:
+                firewall_hash += key
+        return tile_hash, firewall_hash
+
+    def __update_hashes(self, x, y, old_hashes):
+        tile_hash, firewall_hash = self.__tile_hashes(x, y)
+        self.zobrist_hash = (self.zobrist_hash + tile_hash - old_hashes[0]) & ZOBRIST_MASK
+        self.firewall_hash = (self.firewall_hash + firewall_hash - old_hashes[1]) & ZOBRIST_MASK
+
+    def __has_stationary(self, units):
+        return any(unit.stationary for unit in units)
+
+    def __record_wall_change(self, x, y, was_blocked, is_blocked):
+        if not self._wall_journal_base + len(self._wall_journal) == self.walls_version:
+            # walls_version was changed by hand, the journal can not be trusted anymore
+            self._wall_journal = []
+            self._wall_journal_base = self.walls_version
+        elif len(self._wall_journal) >= WALL_JOURNAL_SIZE:
+            dropped = WALL_JOURNAL_SIZE // 2
+            self._wall_journal = self._wall_journal[dropped:]
+            self._wall_journal_base += dropped
+        self._wall_journal.append((x, y, was_blocked, is_blocked))
+        self.walls_version += 1
 
     def get_locations_in_range(self, location, radius):
         """Gets locations in a circular area around a location
@@ -205,6 +548,20 @@ class GameMap:
             self._invalid_coordinates(location)
 
         x, y = location
+        if type(x) == int and type(y) == int:
+            tile_id = TILE_IDS[x][y] if self.in_arena_bounds(location) else -1
+            if tile_id == -1:
+                return [[x + dx, y + dy] for dx, dy in _get_range_stencil(radius) if self.in_arena_bounds([x + dx, y + dy])]
+            table = _RANGE_TABLES.get(radius)
+            if table is None:
+                table = [None] * TILE_COUNT
+                _RANGE_TABLES[radius] = table
+            neighborhood = table[tile_id]
+            if neighborhood is None:
+                neighborhood = tuple((x + dx, y + dy) for dx, dy in _get_range_stencil(radius) if self.in_arena_bounds([x + dx, y + dy]))
+                table[tile_id] = neighborhood
+            return [[i, j] for i, j in neighborhood]
+
         locations = []
         search_radius = math.ceil(radius)
         for i in range(int(x - search_radius), int(x + search_radius + 1)):
@@ -231,9 +588,373 @@ class GameMap:
 
         return math.sqrt((x1 - x2)**2 + (y1 - y2)**2)
 
+    def get_units(self, unit_type=None, player_index=None):
+        """Gets the units on the map
+
+        Args:
+            unit_type: Only get units of this type, or of any type if None
+            player_index: Only get units controlled by this player, or by either player if None
+
+        Returns:
+            A list of the matching units. Their order is not specified.
+
+        """
+        return [unit for x, y in TILE_LOCATIONS for unit in self._read_tile(x, y)
+            if (unit_type is None or unit.unit_type == unit_type) and (player_index is None or unit.player_index == player_index)]
+
+    def get_total_cost(self, player_index=None, unit_type=None):
+        """Gets the summed cost of the units on the map, for example the core value of the enemy defences
+
+        Args:
+            player_index: Only count units controlled by this player, or by either player if None
+            unit_type: Only count units of this type, or of any type if None
+
+        Returns:
+            The total cost of the matching units
+
+        """
+        return sum(unit.cost for unit in self.get_units(unit_type, player_index))
+
+    def get_units_in_range(self, location, radius, unit_type=None, player_index=None):
+        """Gets the units on the locations returned by get_locations_in_range
+
+        Args:
+            location: The center of our search area
+            radius: The radius of our search area
+            unit_type: Only get units of this type, or of any type if None
+            player_index: Only get units controlled by this player, or by either player if None
+
+        Returns:
+            A list of the matching units. Their order is not specified.
+
+        """
+        return [unit for x, y in self.get_locations_in_range(location, radius) for unit in self._read_tile(x, y)
+            if (unit_type is None or unit.unit_type == unit_type) and (player_index is None or unit.player_index == player_index)]
+
     def warn(self, message):
         """
         Used internally by game_map to print out default messaging
         """
         if(self.enable_warnings):
-            debug_write(message)
+            debug_log(WARNING, message)
+
+
+class UnitStore:
+    """The units of a ColumnarGameMap, stored as numpy columns with one row per unit
+
+    Rows of removed units are reused by the units added after them.
+
+    Attributes :
+        * config (JSON): Contains information about the game
+        * unit_types (list): The shorthand of every unit type in config order, the unit_type column holds indices into it
+        * costs (numpy.ndarray): The cost of every unit type, in the same order
+        * unit_type, player_index, x, y, health, pending_removal (numpy.ndarray): The unit attributes, player_index is -1 for None
+        * tile (numpy.ndarray): The tile id each unit is stored on
+        * alive (numpy.ndarray): False for rows that do not hold a unit
+        * tiles (list): tiles[tile_id] lists the rows of the units on that tile, in order
+        * size (int): The number of rows in use or freed, columns are only meaningful up to it
+
+    """
+    def __init__(self, config, capacity=64):
+        self.config = config
+        self.unit_types = [unit_information.get("shorthand") for unit_information in config["unitInformation"]]
+        self._type_indices = {unit_type: index for index, unit_type in enumerate(self.unit_types)}
+        self.costs = np.array([unit_information.get("cost", 0) for unit_information in config["unitInformation"]], dtype=float)
+        self.unit_type = np.zeros(capacity, dtype=np.int8)
+        self.player_index = np.full(capacity, -1, dtype=np.int8)
+        self.x = np.zeros(capacity, dtype=np.int16)
+        self.y = np.zeros(capacity, dtype=np.int16)
+        self.health = np.zeros(capacity, dtype=float)
+        self.pending_removal = np.zeros(capacity, dtype=bool)
+        self.tile = np.zeros(capacity, dtype=np.int16)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.tiles = [[] for _ in range(TILE_COUNT)]
+        self.size = 0
+        self._views = [None] * capacity
+        self._free = []
+
+    def add(self, unit, tile_id):
+        """Stores a copy of a unit on a tile and returns its row. The row still has to be listed in tiles[tile_id]
+        """
+        if self._free:
+            row = self._free.pop()
+        else:
+            if self.size == len(self.alive):
+                self.__grow()
+            row = self.size
+            self.size += 1
+        self.unit_type[row] = self._type_indices[unit.unit_type]
+        self.player_index[row] = -1 if unit.player_index is None else unit.player_index
+        self.x[row] = unit.x
+        self.y[row] = unit.y
+        self.health[row] = unit.health
+        self.pending_removal[row] = unit.pending_removal
+        self.tile[row] = tile_id
+        self.alive[row] = True
+        return row
+
+    def remove(self, row):
+        """Frees a row. A StoredUnit of the row keeps the values the unit had
+        """
+        view = self._views[row]
+        if view is not None:
+            view._detach()
+            self._views[row] = None
+        self.alive[row] = False
+        self._free.append(row)
+
+    def view(self, row):
+        """Gets the StoredUnit of a row, the same object until the row is removed
+        """
+        view = self._views[row]
+        if view is None:
+            view = StoredUnit(self, row)
+            self._views[row] = view
+        return view
+
+    def rows_matching(self, unit_type=None, player_index=None):
+        """Gets the rows of the stored units of a type and owner, None matching any
+        """
+        mask = self.alive[:self.size].copy()
+        if unit_type is not None:
+            mask &= self.unit_type[:self.size] == self._type_indices.get(unit_type, -1)
+        if player_index is not None:
+            mask &= self.player_index[:self.size] == player_index
+        return mask
+
+    def copy(self):
+        """Copies the stored units into a new store, which has its own StoredUnit views
+        """
+        store = copy.copy(self)
+        for name in ("unit_type", "player_index", "x", "y", "health", "pending_removal", "tile", "alive"):
+            setattr(store, name, getattr(self, name).copy())
+        store.tiles = [rows[:] for rows in self.tiles]
+        store._views = [None] * len(self._views)
+        store._free = self._free[:]
+        return store
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    def __grow(self):
+        capacity = 2 * len(self.alive)
+        for name in ("unit_type", "player_index", "x", "y", "health", "pending_removal", "tile", "alive"):
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+        self._views.extend([None] * (capacity - len(self._views)))
+
+
+def _stored_attribute(index, column, to_column=None, from_column=None):
+    def get(self):
+        if self._store is None:
+            return self._detached[index]
+        value = getattr(self._store, column)[self._row]
+        return from_column(value) if from_column else value.item()
+
+    def set(self, value):
+        if self._store is None:
+            self._detached[index] = value
+        else:
+            getattr(self._store, column)[self._row] = to_column(value) if to_column else value
+    return property(get, set, doc="Stored in the {} column of the UnitStore".format(column))
+
+
+class StoredUnit(GameUnit):
+    """A GameUnit whose per unit attributes live in a row of a UnitStore
+
+    Reading or assigning player_index, x, y, health or pending_removal goes through to the store.
+    Once the unit is removed from the map it keeps the values it had, like a removed GameUnit.
+    """
+    __slots__ = ("_store", "_row", "_detached")
+
+    def __init__(self, store, row):
+        self._stats = get_unit_type(store.unit_types[store.unit_type[row]], store.config)
+        self._store = store
+        self._row = row
+        self._detached = None
+
+    def __copy__(self):
+        unit = GameUnit(self.unit_type, self.config, self.player_index, self.health, self.x, self.y)
+        unit.pending_removal = self.pending_removal
+        return unit
+
+    def __deepcopy__(self, memo):
+        if self._store is None:
+            return self.__copy__()
+        return copy.deepcopy(self._store, memo).view(self._row)
+
+    def _detach(self):
+        self._detached = [self.player_index, self.x, self.y, self.health, self.pending_removal]
+        self._store = None
+
+    player_index = _stored_attribute(0, "player_index",
+        to_column=lambda value: -1 if value is None else value,
+        from_column=lambda value: None if value < 0 else int(value))
+    x = _stored_attribute(1, "x")
+    y = _stored_attribute(2, "y")
+    health = _stored_attribute(3, "health")
+    pending_removal = _stored_attribute(4, "pending_removal")
+
+
+class TileView(MutableSequence):
+    """The list-like view of the units on one tile of a ColumnarGameMap
+
+    Supports everything game code does with the lists of a GameMap: indexing, iteration, len,
+    append, del, slicing and comparison with lists. Units added to it are copied into the store.
+    """
+    __slots__ = ("_store", "_rows", "_tile_id")
+
+    def __init__(self, store, tile_id):
+        self._store = store
+        self._tile_id = tile_id
+        self._rows = store.tiles[tile_id]
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._store.view(row) for row in self._rows[index]]
+        return self._store.view(self._rows[index])
+
+    def __iter__(self):
+        view = self._store.view
+        return iter([view(row) for row in self._rows])
+
+    def __setitem__(self, index, value):
+        # New units are copied in before the old rows are freed, so units of this tile can be assigned back to it
+        if isinstance(index, slice):
+            old_rows = self._rows[index]
+            self._rows[index] = [self._store.add(unit, self._tile_id) for unit in list(value)]
+        else:
+            old_rows = [self._rows[index]]
+            self._rows[index] = self._store.add(value, self._tile_id)
+        for row in old_rows:
+            self._store.remove(row)
+
+    def __delitem__(self, index):
+        old_rows = self._rows[index] if isinstance(index, slice) else [self._rows[index]]
+        del self._rows[index]
+        for row in old_rows:
+            self._store.remove(row)
+
+    def insert(self, index, unit):
+        self._rows.insert(index, self._store.add(unit, self._tile_id))
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, TileView)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __deepcopy__(self, memo):
+        return TileView(copy.deepcopy(self._store, memo), self._tile_id)
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+if np is not None:
+    _TILE_X = np.array([x for x, _ in TILE_LOCATIONS], dtype=np.int16)
+    _TILE_Y = np.array([y for _, y in TILE_LOCATIONS], dtype=np.int16)
+
+
+class ColumnarGameMap(GameMap):
+    """A GameMap storing its units in the numpy columns of a UnitStore
+
+    game_map[x, y] returns a TileView, which behaves like the list a GameMap returns.
+    get_units, get_total_cost and get_units_in_range run as numpy operations over all units
+    instead of walking the tiles. Requires numpy, see create_game_map.
+    """
+    def __init__(self, config):
+        """Initializes constants and game map
+
+        Args:
+            config (JSON): Contains information about the game
+
+        """
+        super().__init__(config)
+        self._store = UnitStore(config)
+        self._tiles = [TileView(self._store, tile_id) for tile_id in range(TILE_COUNT)]
+
+    def __getitem__(self, location):
+        if len(location) == 2 and self.in_arena_bounds(location):
+            x, y = location
+            return self._tiles[TILE_IDS[x][y]]
+        self._invalid_coordinates(location)
+
+    def _get_tile(self, x, y):
+        return self._tiles[TILE_IDS[x][y]]
+
+    _read_tile = _get_tile
+
+    def _snapshot_tile(self, x, y):
+        return [copy.copy(unit) for unit in self._tiles[TILE_IDS[x][y]]]
+
+    def _restore_tile(self, x, y, snapshot):
+        self._tiles[TILE_IDS[x][y]][:] = snapshot
+
+    def _replace_tile(self, x, y, units):
+        self._tiles[TILE_IDS[x][y]][:] = units
+
+    def fork(self):
+        """Creates a copy of the map that can be changed independently
+
+        The numpy columns are copied right away, so unlike GameMap.fork the units are not shared.
+
+        Returns:
+            A new map with the same units, walls_version and wall changes
+
+        """
+        child = super().fork()
+        child._store = self._store.copy()
+        child._tiles = [TileView(child._store, tile_id) for tile_id in range(TILE_COUNT)]
+        return child
+
+    def get_units(self, unit_type=None, player_index=None):
+        view = self._store.view
+        return [view(row) for row in np.flatnonzero(self._store.rows_matching(unit_type, player_index)).tolist()]
+
+    def get_total_cost(self, player_index=None, unit_type=None):
+        store = self._store
+        mask = store.rows_matching(unit_type, player_index)
+        return float(store.costs[store.unit_type[:store.size][mask]].sum())
+
+    def get_units_in_range(self, location, radius, unit_type=None, player_index=None):
+        if radius < 0 or radius > self.ARENA_SIZE:
+            self.warn("Radius {} was passed to get_units_in_range. Expected integer between 0 and {}".format(radius, self.ARENA_SIZE))
+        if not self.in_arena_bounds(location):
+            self._invalid_coordinates(location)
+        store = self._store
+        tiles = store.tile[:store.size]
+        dx = _TILE_X[tiles] - location[0]
+        dy = _TILE_Y[tiles] - location[1]
+        # Same rule as get_locations_in_range, a tile is in range if its center is within radius + 0.51
+        mask = store.rows_matching(unit_type, player_index) & (np.sqrt(dx * dx + dy * dy) < radius + 0.51)
+        view = store.view
+        return [view(row) for row in np.flatnonzero(mask).tolist()]
+
+
+def create_game_map(config, storage=None):
+    """Creates the GameMap used by GameState
+
+    Args:
+        config (JSON): Contains information about the game
+        storage: "lists" for GameMap or "columns" for ColumnarGameMap.
+            If None, the GAMELIB_UNIT_STORAGE environment variable is used, defaulting to "lists".
+
+    Returns:
+        A new empty map. Falls back to GameMap if columns are requested but numpy is not installed.
+    """
+    if storage is None:
+        storage = os.environ.get("GAMELIB_UNIT_STORAGE", "lists")
+    if storage == "columns":
+        if np is not None:
+            return ColumnarGameMap(config)
+        debug_write("The columnar unit storage needs numpy, which is not installed. Using lists.")
+    elif not storage == "lists":
+        debug_write("Unknown unit storage '{}'. Using lists.".format(storage))
+    return GameMap(config)
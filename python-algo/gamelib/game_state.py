@@ -1,10 +1,16 @@
+import copy
 import math
-import json
+import sys
 
-from .navigation import ShortestPathFinder
-from .util import send_command, debug_write
+from .navigation import create_path_finder, EdgePaths
+from .util import send_command, debug_write, debug_log, WARNING, json_loads, json_dumps, Memo
 from .unit import GameUnit
-from .game_map import GameMap
+from .game_map import create_game_map, TILE_IDS
+from .threat_map import ThreatMap
+
+# Edge distance fields only depend on the walls, so they are shared by every GameState of the process,
+# keyed by (GameMap.firewall_hash, target edge). Static defences then cost one search for the whole game
+_EDGE_FIELD_MEMO = Memo(64)
 
 def is_stationary(unit_type):
     """
@@ -44,12 +50,17 @@ class GameState:
 
     """
 
-    def __init__(self, config, serialized_string):
+    def __init__(self, config, serialized_string, pathing_backend=None, unit_storage=None):
         """ Setup a turns variables using arguments passed
 
         Args:
             * config (JSON): A json object containing information about the game
             * serialized_string (string): A string containing information about the game state at the start of this turn
+            * pathing_backend (string): "python" or "numpy", the implementation used for pathfinding.
+              Defaults to the GAMELIB_PATHING_BACKEND environment variable, or "python" if it is not set.
+              "numpy" is an experimental reference backend, slower than "python", see create_path_finder.
+            * unit_storage (string): "lists" or "columns", how game_map stores its units, see create_game_map.
+              Defaults to the GAMELIB_UNIT_STORAGE environment variable, or "lists" if it is not set.
 
         """
         self.serialized_string = serialized_string
@@ -81,21 +92,106 @@ class GameState:
         self.BITS = 0
         self.CORES = 1
 
-        self.game_map = GameMap(self.config)
-        self._shortest_path_finder = ShortestPathFinder()
+        self.game_map = create_game_map(self.config, unit_storage)
+        self._shortest_path_finder = create_path_finder(pathing_backend)
+        self._edge_fields = {}
         self._build_stack = []
         self._deploy_stack = []
         self._player_resources = [
                 {'cores': 0, 'bits': 0},  # player 0, which is you
                 {'cores': 0, 'bits': 0}]  # player 1, which is the opponent
         self.__parse_state(serialized_string)
+        self._threat_map = ThreatMap(self.config, self.game_map)
+
+    def fork(self):
+        """Creates a copy of this GameState for hypothetical what-if evaluation
+
+        The copy shares the config and, until one of them changes a tile, the units of the map (see GameMap.fork).
+        It gets its own build and deploy stacks, resources, path caches and threat map, so spawns, removals and
+        game_map changes made on either state do not affect the other. Forking is cheap enough to branch
+        many times per turn.
+
+        Returns:
+            A new GameState in the same state as this one
+
+        """
+        child = copy.copy(self)
+        child.game_map = self.game_map.fork()
+        child._shortest_path_finder = self._shortest_path_finder.fork(self.game_map, child.game_map)
+        child._edge_fields = dict(self._edge_fields)
+        child._threat_map = self._threat_map.copy()
+        child._build_stack = self._build_stack[:]
+        child._deploy_stack = self._deploy_stack[:]
+        child._player_resources = [dict(resources) for resources in self._player_resources]
+        return child
+
+    def checkpoint(self):
+        """Marks the current state so that later changes can be undone with rollback
+
+        attempt_spawn, attempt_remove, game_map.add_unit, game_map.remove_unit and item assignment on game_map
+        are undone, along with the resources and the build and deploy stacks. This lets a search try moves on one
+        GameState and take them back, rather than forking a new state for every branch.
+
+        Changes are recorded until every checkpoint is rolled back to or released.
+
+        Returns:
+            A token to pass to rollback or release. Checkpoints can be nested, rolling back to one invalidates the later ones.
+
+        """
+        return (self.game_map.checkpoint(), self.game_map.walls_version, self.game_map.firewall_hash,
+            [dict(resources) for resources in self._player_resources],
+            len(self._build_stack), len(self._deploy_stack), dict(self._edge_fields))
+
+    def rollback(self, token, keep=False):
+        """Undoes every change made since a checkpoint
+
+        Paths and the threat map follow the restored walls. Edge distance fields that were
+        up to date at the checkpoint are reused as they are, without being repaired, once the map
+        confirms its walls are back to those of the checkpoint. Otherwise they are dropped.
+
+        Args:
+            token: A token returned by checkpoint
+            keep: Whether the checkpoint stays valid, to try and undo other changes from it. Released by default
+
+        Returns:
+            True if the state is back to the checkpoint, False if the token is no longer valid
+
+        """
+        map_token, walls_version, firewall_hash, saved_resources, build_length, deploy_length, edge_fields = token
+        if not self.game_map.rollback(map_token, keep):
+            return False
+        self._player_resources = [dict(resources) for resources in saved_resources]
+        del self._build_stack[build_length:]
+        del self._deploy_stack[deploy_length:]
+        # The walls match the checkpoint again, so fields computed for them are current.
+        # Without the wall changes in between, or with other walls, the map may have been changed by hand:
+        # a stale field would give paths through walls, so every field is computed again
+        if self.game_map.firewall_hash != firewall_hash or self.game_map.get_wall_changes(walls_version) is None:
+            self._edge_fields = {}
+            return True
+        current_version = self.game_map.walls_version
+        self._edge_fields = {target_edge: (current_version if version == walls_version else version, field)
+            for target_edge, (version, field) in edge_fields.items()}
+        return True
+
+    def release(self, token):
+        """Keeps the changes made since a checkpoint, see GameMap.release
+
+        Args:
+            token: A token returned by checkpoint
+
+        Returns:
+            True if the checkpoint was released, False if the token is no longer valid
+
+        """
+        return self.game_map.release(token[0])
 
     def __parse_state(self, state_line):
         """
         Fills in map based on the serialized game state so that self.game_map[x,y] is a list of GameUnits at that location.
         state_line is the game state as a json string.
         """
-        state = json.loads(state_line)
+        state = json_loads(state_line)
 
         turn_info = state["turnInfo"]
         self.turn_number = int(turn_info[1])
@@ -117,6 +213,7 @@ class GameState:
 
         self.__create_parsed_units(p1units, 0)
         self.__create_parsed_units(p2units, 1)
+        self.game_map.rehash()
 
     def __create_parsed_units(self, units, player_number):
         """
@@ -163,8 +260,8 @@ class GameState:
         """Submit and end your turn.
             Must be called at the end of your turn or the algo will hang.
         """
-        build_string = json.dumps(self._build_stack)
-        deploy_string = json.dumps(self._deploy_stack)
+        build_string = json_dumps(self._build_stack)
+        deploy_string = json_dumps(self._deploy_stack)
         send_command(build_string)
         send_command(deploy_string)
 
@@ -408,7 +505,140 @@ class GameState:
             target_edge = self.get_target_edge(start_location)
 
         end_points = self.game_map.get_edge_locations(target_edge)
-        return self._shortest_path_finder.navigate_multiple_endpoints(start_location, end_points, self)
+        edge_field = self._get_edge_field(target_edge, end_points)
+        return self._shortest_path_finder.navigate_multiple_endpoints(start_location, end_points, self, edge_field)
+
+    def precompute_paths(self):
+        """Computes the distance fields of all four edges, which path queries would otherwise compute on first use
+
+        Fields are remembered by game_map.firewall_hash for the whole process, so computing them ahead of time,
+        for example for a predicted board while the action phase plays out, also speeds up later game states with the same firewalls.
+        """
+        game_map = self.game_map
+        for target_edge in (game_map.TOP_RIGHT, game_map.TOP_LEFT, game_map.BOTTOM_LEFT, game_map.BOTTOM_RIGHT):
+            self._get_edge_field(target_edge, game_map.get_edge_locations(target_edge))
+
+    def _get_edge_field(self, target_edge, end_points):
+        """Gets the distance field of an edge, shared by every path query until the walls change
+
+        The field is cached per edge and brought up to date once game_map.walls_version changes,
+        which happens on any attempt_spawn of a firewall or game_map.add_unit/remove_unit call that changes the walls.
+        A few changes, such as a hypothetical firewall being placed and removed again, are repaired incrementally.
+        Fields are also remembered for the whole process by game_map.firewall_hash, so walls seen before, in another
+        search branch or on an earlier turn, do not need a search at all.
+        """
+        walls_version = self.game_map.walls_version
+        cached = self._edge_fields.get(target_edge)
+        if cached is not None and cached[0] == walls_version:
+            return cached[1]
+
+        memo_key = (self.game_map.firewall_hash, target_edge)
+        edge_field = _EDGE_FIELD_MEMO.get(memo_key)
+        if edge_field is None and cached is not None:
+            changes = self.game_map.get_wall_changes(cached[0])
+            # Past a handful of changes a full search is cheaper than repairing them one by one
+            if changes is not None and len(changes) <= 8:
+                edge_field = self._shortest_path_finder.repair_edge_field(cached[1], changes, end_points, self)
+        if edge_field is None:
+            edge_field = self._shortest_path_finder.get_edge_field(end_points, self)
+        _EDGE_FIELD_MEMO.put(memo_key, edge_field)
+        self._edge_fields[target_edge] = (walls_version, edge_field)
+        return edge_field
+
+    def find_paths_from_all_edges(self, player_index=0):
+        """Gets the path of every location an information unit could be deployed on
+
+        Starts sharing a target edge reuse the same cached edge distance field, so the whole batch
+        costs one search per edge plus a cheap walk per start. Locations blocked by firewalls are skipped.
+
+        Args:
+            player_index: The index corresponding to the deploying player, 0 for you 1 for the enemy
+
+        Returns:
+            An EdgePaths holding the start locations, their target edges, the edge each path reaches and the flattened paths
+
+        """
+        if not player_index == 0 and not player_index == 1:
+            self._invalid_player_index(player_index)
+            return
+
+        if player_index == 0:
+            deploy_edges = [self.game_map.BOTTOM_LEFT, self.game_map.BOTTOM_RIGHT]
+        else:
+            deploy_edges = [self.game_map.TOP_LEFT, self.game_map.TOP_RIGHT]
+
+        paths = EdgePaths()
+        for deploy_edge in deploy_edges:
+            for location in self.game_map.get_edge_locations(deploy_edge):
+                if self.contains_stationary_unit(location):
+                    continue
+                target_edge = self.get_target_edge(location)
+                end_points = self.game_map.get_edge_locations(target_edge)
+                edge_field = self._get_edge_field(target_edge, end_points)
+                path = self._shortest_path_finder.navigate_multiple_endpoints(location, end_points, self, edge_field)
+                paths.add(location, target_edge, path[-1] in end_points, path)
+        return paths
+
+    def score_paths(self, start_locations, unit_type, player_index=0):
+        """Scores the paths information units would take from a batch of start locations
+
+        All starts share the cached edge distance fields and the damage and shield maps,
+        so scoring every deploy location costs little more than finding their paths.
+        Damage assumes every destructor in range fires at the unit on every frame it spends there,
+        and each friendly encryptor the path comes within range of shields the unit once.
+
+        Args:
+            start_locations: A list of locations to score
+            unit_type: The type of information unit to deploy, its speed sets the frames spent on each tile
+            player_index: The index corresponding to the player deploying the units, 0 for you 1 for the enemy
+
+        Returns:
+            A list with an entry for each start location, None if the location is blocked, otherwise a dict with
+            the "path", the expected "damage" taken from enemy destructors, the "frames_in_range" of
+            at least one enemy destructor and the "shield" gained from friendly encryptors
+
+        """
+        if not player_index == 0 and not player_index == 1:
+            self._invalid_player_index(player_index)
+            return
+        if unit_type not in ALL_UNITS or is_stationary(unit_type):
+            self._invalid_unit(unit_type)
+            return
+
+        frames_per_tile = 1 / self.config["unitInformation"][UNIT_TYPE_TO_INDEX[unit_type]]["speed"]
+        damage_map = self.get_damage_map(player_index)
+        encryptor_info = self.config["unitInformation"][UNIT_TYPE_TO_INDEX[ENCRYPTOR]]
+        shield_amount = encryptor_info.get("shieldAmount", 0)
+
+        # Which friendly encryptors cover each tile, so every path can count each encryptor once
+        covered_by = {}
+        for encryptor_id in self._threat_map.get_firewall_tiles(ENCRYPTOR, player_index):
+            for x, y in self.game_map.get_locations_in_range(self.game_map.get_tile_location(encryptor_id), encryptor_info["range"]):
+                covered_by.setdefault(TILE_IDS[x][y], []).append(encryptor_id)
+
+        scores = []
+        for location in start_locations:
+            if self.contains_stationary_unit(location):
+                self.warn("Attempted to score a path from blocked starting location {}".format(location))
+                scores.append(None)
+                continue
+            path = self.find_path_to_edge(location)
+            damage = 0
+            tiles_in_range = 0
+            encryptors = set()
+            for x, y in path:
+                tile_id = TILE_IDS[x][y]
+                if damage_map[tile_id]:
+                    damage += damage_map[tile_id]
+                    tiles_in_range += 1
+                if tile_id in covered_by:
+                    encryptors.update(covered_by[tile_id])
+            scores.append({
+                "path": path,
+                "damage": damage * frames_per_tile,
+                "frames_in_range": tiles_in_range * frames_per_tile,
+                "shield": len(encryptors) * shield_amount})
+        return scores
 
     def contains_stationary_unit(self, location):
         """Check if a location is blocked
@@ -434,7 +664,7 @@ class GameState:
         """
 
         if(self.enable_warnings):
-            debug_write(message)
+            debug_log(WARNING, message)
 
     def suppress_warnings(self, suppress):
         """Suppress all warnings
@@ -556,3 +786,40 @@ class GameState:
                 if unit.unit_type == DESTRUCTOR and unit.player_index != player_index:
                     attackers.append(unit)
         return attackers
+
+    def get_damage_map(self, player_index=0):
+        """Gets the destructor damage per frame on every tile
+
+        The map is built once when the turn is parsed and updated incrementally as firewalls are
+        spawned, added or removed, so reading it is much cheaper than calling get_attackers per location.
+
+        Args:
+            player_index: The index corresponding to the defending player, 0 for you 1 for the enemy
+
+        Returns:
+            A list indexed by tile id (see GameMap.get_tile_id) of the damage per frame a unit controlled by
+            the given player would take on that tile. Do not modify it.
+
+        """
+        if not player_index == 0 and not player_index == 1:
+            self._invalid_player_index(player_index)
+            return
+        self._threat_map.update(self.game_map)
+        return self._threat_map.damage[player_index]
+
+    def get_shield_map(self, player_index=0):
+        """Gets the shielding provided by encryptors on every tile
+
+        Args:
+            player_index: The index corresponding to the player whose units are shielded, 0 for you 1 for the enemy
+
+        Returns:
+            A list indexed by tile id (see GameMap.get_tile_id) of the shield a unit controlled by
+            the given player would gain on that tile. Do not modify it.
+
+        """
+        if not player_index == 0 and not player_index == 1:
+            self._invalid_player_index(player_index)
+            return
+        self._threat_map.update(self.game_map)
+        return self._threat_map.shield[player_index]
@@ -1,24 +1,26 @@
+import copy
 import heapq
 import math
+import os
 import sys
-import queue
-from .util import debug_write
+from collections import deque
+from .util import debug_write, debug_log, INFO
 
-class Node:
-    """A pathfinding node
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+ARENA_SIZE = 28
+# The flat pathfinding buffers hold the arena plus a one tile border on every side,
+# so the neighbors of any arena tile always have a valid index
+GRID_STRIDE = ARENA_SIZE + 2
 
-    Attributes :
-        * visited_idealness (bool): Have we visited this node during the idealness search step?
-        * visited_validate (bool): Have we visited this node during the validation step?
-        * blocked (bool): Is there a firewall at this node's location
-        * pathlength: The distance between this node and the target location
 
+def _tile_index(location):
+    """Index of a location in the flat pathfinding buffers
     """
-    def __init__(self):
-        self.visited_idealness = False
-        self.visited_validate = False
-        self.blocked = False
-        self.pathlength = -1
+    return (location[0] + 1) * GRID_STRIDE + location[1] + 1
 
 """
 This class helps with pathfinding. We guarantee the results will
@@ -28,18 +30,42 @@ code to maximise time efficiency
 class ShortestPathFinder:
     """Handles pathfinding
 
+    The pathfinding grid is stored in flat lists indexed by _tile_index, and the search loops work on
+    these integer tile indices rather than [x, y] lists. The buffers, a table of the in-arena neighbors
+    of every tile and the coordinates of every index are allocated once and reused by every call.
+    Tiles outside of the arena are marked as blocked. The blocked mask is only refilled when the walls of the map change.
+    Instead of clearing the visited flags between calls, each call bumps a generation number and any entry
+    stamped with an older generation counts as unvisited.
+
+    The validation step writes its pathlengths into a new distance field, a flat list where unreached
+    tiles are -1. Fields seeded from a whole edge do not depend on the start location, so they can be
+    computed once with get_edge_field and passed back to navigate_multiple_endpoints for any start.
+
     Attributes :
         * HORIZONTAL (int): A constant representing a horizontal movement
         * VERTICAL (int): A constant representing a vertical movement
 
         * game_state (:obj: GameState): The current gamestate
-        * game_map (:obj: GameMap): The current gamemap
 
     """
     def __init__(self):
         self.HORIZONTAL = 1
         self.VERTICAL = 2
         self.initialized = False
+        size = GRID_STRIDE * GRID_STRIDE
+        self._generation = 0
+        self._off_board = None
+        self._arena_locations = None
+        self._neighbors = None
+        self._x = [index // GRID_STRIDE - 1 for index in range(size)]
+        self._y = [index % GRID_STRIDE - 1 for index in range(size)]
+        self._idealness_tables = {}
+        self._walls_map = None
+        self._walls_version = None
+        self._blocked = [True] * size
+        self._visited_idealness = [0] * size
+        self._unreached = [-1] * size
+        self._pathlength = self._unreached
 
     def initialize_map(self, game_state):
         """Initializes the map
@@ -50,15 +76,68 @@ class ShortestPathFinder:
         #Initialize map 
         self.initialized = True
         self.game_state = game_state
-        self.game_map = [[Node() for x in range(self.game_state.ARENA_SIZE)] for y in range(self.game_state.ARENA_SIZE)]
+        self._generation += 1
+        if self._off_board is None:
+            self._arena_locations = [location for location in game_state.game_map]
+            self._off_board = [True] * len(self._blocked)
+            for location in self._arena_locations:
+                self._off_board[_tile_index(location)] = False
+            #Neighbors are listed in the order units consider them: up, down, right, left
+            self._neighbors = [()] * len(self._blocked)
+            for location in self._arena_locations:
+                index = _tile_index(location)
+                self._neighbors[index] = tuple(neighbor for neighbor in (index + 1, index - 1, index + GRID_STRIDE, index - GRID_STRIDE)
+                                               if not self._off_board[neighbor])
+
+        game_map = game_state.game_map
+        if self._walls_map is game_map and self._walls_version == game_map.walls_version:
+            return
+        changes = game_map.get_wall_changes(self._walls_version) if self._walls_map is game_map else None
+        if changes is not None:
+            #Only update the tiles that changed since the last fill
+            for x, y, _, is_blocked in changes:
+                self._blocked[_tile_index([x, y])] = is_blocked
+        else:
+            #Fill in walls
+            self._blocked[:] = self._off_board
+            for location in self._arena_locations:
+                if game_state.contains_stationary_unit(location):
+                    self._blocked[_tile_index(location)] = True
+        self._walls_map = game_map
+        self._walls_version = game_map.walls_version
 
-    def navigate_multiple_endpoints(self, start_point, end_points, game_state):
+    def fork(self, game_map, forked_map):
+        """Copies the pathfinder for a forked GameState
+
+        The copy shares the tables that never change and keeps its own buffers.
+        If the blocked mask was last filled from game_map, the copy keeps it for forked_map,
+        so it only has to apply the wall changes made after the fork.
+
+        Args:
+            * game_map: The map of the GameState being forked
+            * forked_map: The map of the forked GameState, created by game_map.fork()
+
+        Returns:
+            A new pathfinder
+
+        """
+        path_finder = copy.copy(self)
+        path_finder._blocked = self._blocked[:]
+        path_finder._visited_idealness = [0] * len(self._visited_idealness)
+        path_finder._generation = 0
+        if self._walls_map is game_map:
+            path_finder._walls_map = forked_map
+        return path_finder
+
+    def navigate_multiple_endpoints(self, start_point, end_points, game_state, edge_field=None):
         """Finds the path a unit would take to reach a set of endpoints
 
         Args:
             * start_point: The starting location of the unit
             * end_points: The end points of the unit, should be a list of edge locations
             * game_state: The current game state
+            * edge_field: Optional distance field returned by get_edge_field for the same end points and walls.
+              If the start point can reach the edge, the path is read from it without searching the map again.
 
         Returns:
             The path a unit at start_point would take when trying to reach end_points given the current game state.
@@ -70,50 +149,166 @@ class ShortestPathFinder:
 
         #Initialize map 
         self.initialize_map(game_state)
-        #Fill in walls
-        for location in self.game_state.game_map:
-            if self.game_state.contains_stationary_unit(location):
-                self.game_map[location[0]][location[1]].blocked = True
+        #A start point reached from the edge can reach the edge, so the idealness search would pick the edge too
+        if edge_field is not None and not edge_field[_tile_index(start_point)] == -1:
+            self._pathlength = edge_field
+            path = self._get_path(start_point, end_points)
+            if path is not None:
+                return path
+            debug_write("The distance field does not match the walls at {}, searching the map again".format(start_point))
         #Do pathfinding
         ideal_endpoints = self._idealness_search(start_point, end_points)
         self._validate(ideal_endpoints, end_points)
         return self._get_path(start_point, end_points)
 
+    def get_edge_field(self, end_points, game_state):
+        """Computes the distance field of a whole edge
+
+        Args:
+            * end_points: The end points of the unit, should be a list of edge locations
+            * game_state: The current game state
+
+        Returns:
+            A flat list indexed like the pathfinding buffers holding the pathlength from each tile to the edge, -1 for unreachable tiles.
+            It stays valid until the walls of the map change.
+
+        """
+        self.initialize_map(game_state)
+        return self._validate(end_points[0], end_points)
+
+    def repair_edge_field(self, edge_field, changes, end_points, game_state):
+        """Updates an edge distance field for a few firewall changes instead of recomputing it
+
+        Only the tiles whose pathlength can change are visited: the region behind a new firewall that lost
+        its shortest paths, or the region that a removed firewall opens a shorter path to.
+
+        Args:
+            * edge_field: A distance field returned by get_edge_field or repair_edge_field
+            * changes: The (x, y, was_blocked, is_blocked) firewall changes made since edge_field was computed, see GameMap.get_wall_changes
+            * end_points: The end points edge_field was computed for
+            * game_state: The current game state, its walls must be the walls of edge_field with changes applied
+
+        Returns:
+            A new distance field equal to get_edge_field(end_points, game_state)
+
+        """
+        self.initialize_map(game_state)
+        field = edge_field[:]
+        sources = set(_tile_index(location) for location in end_points)
+        #Rewind a copy of the blocked mask to the walls of edge_field, then replay the changes one tile at a time
+        blocked = self._blocked[:]
+        for x, y, was_blocked, _ in reversed(changes):
+            blocked[_tile_index([x, y])] = was_blocked
+        for x, y, was_blocked, is_blocked in changes:
+            if not was_blocked == is_blocked:
+                index = _tile_index([x, y])
+                blocked[index] = is_blocked
+                self._repair_field(field, blocked, index, sources)
+        return field
+
+    def _repair_field(self, field, blocked, index, sources):
+        """Repairs field in place after the tile at index was blocked or unblocked. blocked already holds the new state.
+        """
+        if not blocked[index]:
+            #A freed tile can only shorten paths, spread the shorter pathlengths out from it
+            if index not in sources:
+                field[index] = -1
+                for neighbor in self._neighbors[index]:
+                    if not blocked[neighbor] and not field[neighbor] == -1 and (field[index] == -1 or field[neighbor] + 1 < field[index]):
+                        field[index] = field[neighbor] + 1
+                if field[index] == -1:
+                    return
+            current = deque([index])
+            while current:
+                tile = current.popleft()
+                pathlength = field[tile] + 1
+                for neighbor in self._neighbors[tile]:
+                    if not blocked[neighbor] and (field[neighbor] == -1 or field[neighbor] > pathlength):
+                        field[neighbor] = pathlength
+                        current.append(neighbor)
+            return
+
+        #A new wall only lengthens paths. Blocked edge tiles keep a pathlength of 0 but stop spreading it
+        old_pathlength = field[index]
+        field[index] = 0 if index in sources else -1
+        if old_pathlength == -1:
+            return
+
+        #Find the tiles that lost every neighbor one step closer to the edge, level by level
+        affected = set()
+        current = deque()
+        for neighbor in self._neighbors[index]:
+            if not blocked[neighbor] and field[neighbor] == old_pathlength + 1:
+                current.append(neighbor)
+        seen = set(current)
+        while current:
+            tile = current.popleft()
+            pathlength = field[tile]
+            neighbors = self._neighbors[tile]
+            if any(not blocked[neighbor] and field[neighbor] == pathlength - 1 and neighbor not in affected for neighbor in neighbors):
+                continue
+            affected.add(tile)
+            for neighbor in neighbors:
+                if not blocked[neighbor] and field[neighbor] == pathlength + 1 and neighbor not in seen:
+                    seen.add(neighbor)
+                    current.append(neighbor)
+
+        #Recompute the affected region from its boundary, closest tiles first
+        for tile in affected:
+            field[tile] = -1
+        frontier = []
+        for tile in affected:
+            best = -1
+            for neighbor in self._neighbors[tile]:
+                if not blocked[neighbor] and not field[neighbor] == -1 and (best == -1 or field[neighbor] + 1 < best):
+                    best = field[neighbor] + 1
+            if not best == -1:
+                heapq.heappush(frontier, (best, tile))
+        while frontier:
+            pathlength, tile = heapq.heappop(frontier)
+            if not field[tile] == -1:
+                continue
+            field[tile] = pathlength
+            for neighbor in self._neighbors[tile]:
+                if neighbor in affected and field[neighbor] == -1:
+                    heapq.heappush(frontier, (pathlength + 1, neighbor))
+
     def _idealness_search(self, start, end_points):
         """
         Finds the most ideal tile in our 'pocket' of pathable space. 
         The edge if it is available, or the best self destruct location otherwise
         """
-        current = queue.Queue()
-        current.put(start)
-        best_idealness = self._get_idealness(start, end_points)
-        self.game_map[start[0]][start[1]].visited_idealness = True
-        most_ideal = start
-
-        while not current.empty():
-            search_location = current.get()
-            for neighbor in self._get_neighbors(search_location):
-                if not self.game_state.game_map.in_arena_bounds(neighbor) or self.game_map[neighbor[0]][neighbor[1]].blocked:
+        generation = self._generation
+        blocked = self._blocked
+        visited = self._visited_idealness
+        neighbors = self._neighbors
+        idealness = self._get_idealness_table(end_points)
+
+        start_index = _tile_index(start)
+        current = deque([start_index])
+        best_idealness = idealness[start_index]
+        visited[start_index] = generation
+        most_ideal = start_index
+
+        while current:
+            search_index = current.popleft()
+            for neighbor in neighbors[search_index]:
+                if blocked[neighbor]:
                     continue
 
-                x, y = neighbor
-                current_idealness = self._get_idealness(neighbor, end_points)
+                current_idealness = idealness[neighbor]
 
                 if current_idealness > best_idealness:
                     best_idealness = current_idealness
                     most_ideal = neighbor
 
-                if not self.game_map[x][y].visited_idealness and not self.game_map[x][y].blocked:
-                    self.game_map[x][y].visited_idealness = True
-                    current.put(neighbor)
+                if not visited[neighbor] == generation:
+                    visited[neighbor] = generation
+                    current.append(neighbor)
 
-        return most_ideal
-
-    def _get_neighbors(self, location):
-        """Get the locations adjacent to a location
-        """
-        x, y = location
-        return [[x, y + 1], [x, y - 1], [x + 1, y], [x - 1, y]]
+        if most_ideal == start_index:
+            return start
+        return [self._x[most_ideal], self._y[most_ideal]]
 
     def _get_direction_from_endpoints(self, end_points):
         """Prints a message to the games debug output
@@ -158,133 +353,151 @@ class ShortestPathFinder:
 
         return idealness
 
+    def _get_idealness_table(self, end_points):
+        """The idealness of every arena tile for a set of end points, stored in a flat list indexed like the other buffers.
+        Tables are built once per set of end points and reused by later calls.
+        """
+        key = tuple(map(tuple, end_points))
+        table = self._idealness_tables.get(key)
+        if table is None:
+            table = [0] * len(self._blocked)
+            for location in self._arena_locations:
+                table[_tile_index(location)] = self._get_idealness(location, end_points)
+            self._idealness_tables[key] = table
+        return table
+
     def _validate(self, ideal_tile, end_points):
         """Breadth first search of the grid, setting the pathlengths of each node
 
+        Returns:
+            The new distance field
+
         """
+        blocked = self._blocked
+        neighbors = self._neighbors
+        pathlength = self._unreached[:]
+        self._pathlength = pathlength
+
         #VALDIATION
         #Add our most ideal tiles to current
-        current = queue.Queue()
         if ideal_tile in end_points:
-            for location in end_points:
-               current.put(location)
-               #Set current pathlength to 0
-               self.game_map[location[0]][location[1]].pathlength = 0
-               self.game_map[location[0]][location[1]].visited_validate = True
+            current = deque(_tile_index(location) for location in end_points)
         else:
-            current.put(ideal_tile)
-            self.game_map[ideal_tile[0]][ideal_tile[1]].pathlength = 0
-            self.game_map[ideal_tile[0]][ideal_tile[1]].visited_validate = True
+            current = deque([_tile_index(ideal_tile)])
+        #Set current pathlength to 0
+        for index in current:
+            pathlength[index] = 0
 
         #While current is not empty
-        while not current.empty():
-            current_location = current.get()
-            current_node = self.game_map[current_location[0]][current_location[1]]
-            for neighbor in self._get_neighbors(current_location):
-                if not self.game_state.game_map.in_arena_bounds(neighbor) or self.game_map[neighbor[0]][neighbor[1]].blocked:
-                    continue
-
-                neighbor_node = self.game_map[neighbor[0]][neighbor[1]]
-                if not neighbor_node.visited_validate and not current_node.blocked:
-                    neighbor_node.pathlength = current_node.pathlength + 1
-                    neighbor_node.visited_validate = True
-                    current.put(neighbor)
+        while current:
+            current_index = current.popleft()
+            #Blocked end points are reached but do not lead anywhere
+            if blocked[current_index]:
+                continue
+            next_pathlength = pathlength[current_index] + 1
+            for neighbor in neighbors[current_index]:
+                if pathlength[neighbor] == -1 and not blocked[neighbor]:
+                    pathlength[neighbor] = next_pathlength
+                    current.append(neighbor)
 
         #debug_write("Print after validate")
         #self.print_map()
-        return
+        return pathlength
+
+    def _get_pathlength(self, location):
+        """The pathlength of a location in the current distance field, or -1 if it was not reached
+        """
+        return self._pathlength[_tile_index(location)]
 
     def _get_path(self, start_point, end_points):
         """Once all nodes are validated, and a target is found, the unit can path to its target
 
+        Returns:
+            The path, or None if the distance field is inconsistent with the walls, when a step does not get closer
+
         """
         #GET THE PATH
+        pathlength = self._pathlength
+        x_of, y_of = self._x, self._y
+        direction = self._get_direction_from_endpoints(end_points)
         path = [start_point]
-        current = start_point
+        current = _tile_index(start_point)
         move_direction = 0
 
-        while not self.game_map[current[0]][current[1]].pathlength == 0:
-            #debug_write("current tile {} has cost {}".format(current, self.game_map[current[0]][current[1]].pathlength))
-            next_move = self._choose_next_move(current, move_direction, end_points)
-            #debug_write(next_move)
+        while not pathlength[current] == 0:
+            next_move = self._choose_next_move(current, move_direction, direction)
+            #Every step of a valid field gets one closer, so the walk always ends
+            if not 0 <= pathlength[next_move] < pathlength[current]:
+                return None
 
-            if current[0] == next_move[0]:
+            #Moving to the next or previous x changes the index by a whole column
+            if current // GRID_STRIDE == next_move // GRID_STRIDE:
                 move_direction = self.VERTICAL
             else:
                 move_direction = self.HORIZONTAL
-            path.append(next_move)
+            path.append([x_of[next_move], y_of[next_move]])
             current = next_move
-        
-        #debug_write(path)
+
         return path
-  
-    def _choose_next_move(self, current_point, previous_move_direction, end_points):
-        """Given the current location and adjacent locations, return the best 'next step' for a given unit to take
+
+    def _choose_next_move(self, current_index, previous_move_direction, direction):
+        """Given the current tile index and adjacent tiles, return the index of the best 'next step' for a given unit to take
         """
-        neighbors = self._get_neighbors(current_point)
-        #debug_write("Unit at {} previously moved {} and has these neighbors {}".format(current_point, previous_move_direction, neighbors))
-
-        ideal_neighbor = current_point
-        best_pathlength = self.game_map[current_point[0]][current_point[1]].pathlength
-        for neighbor in neighbors:
-            #debug_write("Comparing champ {} and contender {}".format(ideal_neighbor, neighbor))
-            if not self.game_state.game_map.in_arena_bounds(neighbor) or self.game_map[neighbor[0]][neighbor[1]].blocked:
+        blocked = self._blocked
+        pathlength = self._pathlength
+
+        ideal_neighbor = current_index
+        best_pathlength = pathlength[current_index]
+        for neighbor in self._neighbors[current_index]:
+            if blocked[neighbor]:
                 continue
 
-            new_best = False
-            x, y = neighbor
-            current_pathlength = self.game_map[x][y].pathlength
+            current_pathlength = pathlength[neighbor]
 
             #Filter by pathlength
             if current_pathlength > best_pathlength:
                 continue
-            elif current_pathlength < best_pathlength:
-                #debug_write("Contender has better pathlength at {} vs champs {}".format(current_pathlength, best_pathlength))
-                new_best = True
-
             #Filter by direction based on prev move
-            if not new_best and not self._better_direction(current_point, neighbor, ideal_neighbor, previous_move_direction, end_points):
+            if current_pathlength == best_pathlength and not self._better_direction(current_index, neighbor, ideal_neighbor, previous_move_direction, direction):
                 continue
 
             ideal_neighbor = neighbor
             best_pathlength = current_pathlength
 
-        #debug_write("Gave unit at {} new tile {}".format(current_point, ideal_neighbor))
         return ideal_neighbor
 
-    def _better_direction(self, prev_tile, new_tile, prev_best, previous_move_direction, end_points):
-        """Compare two tiles and return True if the unit would rather move to the new one
+    def _better_direction(self, prev_tile, new_tile, prev_best, previous_move_direction, direction):
+        """Compare two tile indices and return True if the unit would rather move to the new one
 
         """
+        x_of, y_of = self._x, self._y
         #True if we are moving in a different direction than prev move and prev is not
         #If we previously moved horizontal, and now one of our options has a different x position then the other (the two options are not up/down)
-        if previous_move_direction == self.HORIZONTAL and not new_tile[0] == prev_best[0]:
+        if previous_move_direction == self.HORIZONTAL and not x_of[new_tile] == x_of[prev_best]:
             #We want to go up now. If we have not changed our y, we are not going up
-            if prev_tile[1] == new_tile[1]:
+            if y_of[prev_tile] == y_of[new_tile]:
                 return False 
             return True
-        if previous_move_direction == self.VERTICAL and not new_tile[1] == prev_best[1]:
-            if prev_tile[0] == new_tile[0]:
-                #debug_write("contender {} has the same x coord as prev tile {} so we will keep best move {}".format(new_tile, prev_tile, prev_best))
+        if previous_move_direction == self.VERTICAL and not y_of[new_tile] == y_of[prev_best]:
+            if x_of[prev_tile] == x_of[new_tile]:
                 return False
             return True
         if previous_move_direction == 0: 
-            if prev_tile[1] == new_tile[1]: 
+            if y_of[prev_tile] == y_of[new_tile]: 
                 return False
             return True
         
         #To make it here, both moves are on the same axis 
-        direction = self._get_direction_from_endpoints(end_points)
-        if new_tile[1] == prev_best[1]: #If they both moved horizontal...
-            if direction[0] == 1 and new_tile[0] > prev_best[0]: #If we moved right and right is our direction, we moved towards our direction
+        if y_of[new_tile] == y_of[prev_best]: #If they both moved horizontal...
+            if direction[0] == 1 and x_of[new_tile] > x_of[prev_best]: #If we moved right and right is our direction, we moved towards our direction
                 return True 
-            if direction[0] == -1 and new_tile[0] < prev_best[0]: #If we moved left and left is our direction, we moved towards our direction
+            if direction[0] == -1 and x_of[new_tile] < x_of[prev_best]: #If we moved left and left is our direction, we moved towards our direction
                 return True 
             return False 
-        if new_tile[0] == prev_best[0]: #If they both moved vertical...
-            if direction[1] == 1 and new_tile[1] > prev_best[1]: #If we moved up and up is our direction, we moved towards our direction
+        if x_of[new_tile] == x_of[prev_best]: #If they both moved vertical...
+            if direction[1] == 1 and y_of[new_tile] > y_of[prev_best]: #If we moved up and up is our direction, we moved towards our direction
                 return True
-            if direction[1] == -1 and new_tile[1] < prev_best[1]: #If we moved down and down is our direction, we moved towards our direction
+            if direction[1] == -1 and y_of[new_tile] < y_of[prev_best]: #If we moved down and down is our direction, we moved towards our direction
                 return True
             return False
         return True
@@ -298,19 +511,199 @@ class ShortestPathFinder:
             return
 
         for y in range(28):
+            row = []
             for x in range(28):
-                node = self.game_map[x][28 - y - 1]
-                if not node.blocked and not node.pathlength == -1:
-                    self._print_justified(node.pathlength)
+                location = [x, 28 - y - 1]
+                pathlength = self._get_pathlength(location)
+                if not self._blocked[_tile_index(location)] and not pathlength == -1:
+                    row.append(self._print_justified(pathlength))
                 else:
-                    sys.stderr.write("   ")
-            debug_write("")
+                    row.append("   ")
+            # One message per row, the debug log may write it later
+            debug_log(INFO, "".join(row))
 
     def _print_justified(self, number):
-        """Prints a number between 100 and -10 in 3 spaces
+        """Justifies a number between 100 and -10 in 3 spaces
+
+        Returns:
+            The 3 characters to print
 
         """
         if number < 10 and number > -1:
-            sys.stderr.write(" ")
-        sys.stderr.write(str(number))
-        sys.stderr.write(" ")
+            return " {} ".format(number)
+        return "{} ".format(number)
+
+
+class NumpyShortestPathFinder(ShortestPathFinder):
+    """Handles pathfinding with numpy, an experimental reference backend
+
+    Same results as ShortestPathFinder, but the idealness search and the validation step
+    expand a whole wavefront at once with boolean array operations, instead of one tile at a time.
+    The flat buffers are viewed as GRID_STRIDE x GRID_STRIDE arrays indexed by [x + 1, y + 1].
+    Requires numpy, see create_path_finder.
+
+    It is not faster: the arena is too small for the array operations of each step of the wavefront to make up
+    for their overhead, and it runs 3 to 10 times slower than ShortestPathFinder, see benchmarks/bench_backends.py.
+    Do not choose it for speed.
+
+    """
+    def __init__(self):
+        super().__init__()
+        self._open_array = None
+        self._open_array_key = None
+        self._idealness_arrays = {}
+
+    def _get_open_array(self):
+        """The unblocked tiles as a boolean array, rebuilt only when the walls change
+        """
+        key = (self._walls_map, self._walls_version)
+        if not self._open_array_key == key:
+            blocked = np.array(self._blocked, dtype=bool).reshape(GRID_STRIDE, GRID_STRIDE)
+            self._open_array = ~blocked
+            self._open_array_key = key
+        return self._open_array
+
+    def _expand(self, frontier):
+        """The tiles adjacent to any tile of frontier
+        """
+        spread = np.zeros_like(frontier)
+        spread[1:, :] |= frontier[:-1, :]
+        spread[:-1, :] |= frontier[1:, :]
+        spread[:, 1:] |= frontier[:, :-1]
+        spread[:, :-1] |= frontier[:, 1:]
+        return spread
+
+    def _idealness_search(self, start, end_points):
+        """
+        Finds the most ideal tile in our 'pocket' of pathable space.
+        The edge if it is available, or the best self destruct location otherwise
+        """
+        open_tiles = self._get_open_array()
+        reached = np.zeros_like(open_tiles)
+        reached[start[0] + 1, start[1] + 1] = True
+        frontier = reached
+        while frontier.any():
+            frontier = self._expand(frontier) & open_tiles & ~reached
+            reached |= frontier
+
+        for location in end_points:
+            if reached[location[0] + 1, location[1] + 1]:
+                return location
+
+        key = tuple(map(tuple, end_points))
+        idealness = self._idealness_arrays.get(key)
+        if idealness is None:
+            idealness = np.array(self._get_idealness_table(end_points)).reshape(GRID_STRIDE, GRID_STRIDE)
+            self._idealness_arrays[key] = idealness
+        #Tiles outside of the arena are never reached, and every other tile has a distinct idealness
+        index = int(np.where(reached, idealness, -1).argmax())
+        return [index // GRID_STRIDE - 1, index % GRID_STRIDE - 1]
+
+    def _validate(self, ideal_tile, end_points):
+        """Breadth first search of the grid, setting the pathlengths of each node
+
+        Returns:
+            The new distance field
+
+        """
+        open_tiles = self._get_open_array()
+        pathlength = np.full(open_tiles.shape, -1, dtype=np.int32)
+        frontier = np.zeros_like(open_tiles)
+        seeds = end_points if ideal_tile in end_points else [ideal_tile]
+        for location in seeds:
+            frontier[location[0] + 1, location[1] + 1] = True
+        pathlength[frontier] = 0
+        reached = frontier.copy()
+
+        distance = 0
+        #Blocked seeds keep their pathlength of 0 but do not spread it
+        frontier &= open_tiles
+        while frontier.any():
+            distance += 1
+            frontier = self._expand(frontier) & open_tiles & ~reached
+            pathlength[frontier] = distance
+            reached |= frontier
+
+        field = pathlength.ravel().tolist()
+        self._pathlength = field
+        return field
+
+
+def create_path_finder(backend=None):
+    """Creates the pathfinder used by GameState
+
+    Args:
+        backend: "python" for ShortestPathFinder, the fastest, or "numpy" for NumpyShortestPathFinder,
+            an experimental reference backend several times slower.
+            If None, the GAMELIB_PATHING_BACKEND environment variable is used, defaulting to "python".
+
+    Returns:
+        A new pathfinder. Falls back to ShortestPathFinder if numpy is requested but not installed.
+    """
+    if backend is None:
+        backend = os.environ.get("GAMELIB_PATHING_BACKEND", "python")
+    if backend == "numpy":
+        if np is not None:
+            return NumpyShortestPathFinder()
+        debug_write("The numpy pathing backend needs numpy, which is not installed. Using the python backend.")
+    elif not backend == "python":
+        debug_write("Unknown pathing backend '{}'. Using the python backend.".format(backend))
+    return ShortestPathFinder()
+
+
+class EdgePaths:
+    """The paths of a batch of start locations, stored as flat lists
+
+    The tiles of every path are concatenated into path_x and path_y. The path of the i-th start
+    covers the entries from offsets[i] up to offsets[i + 1], so per path totals can be computed in one
+    pass over the flat lists, for example with numpy.add.reduceat(values, offsets[:-1]).
+
+    Attributes :
+        * starts (list): The start locations, in the order their paths are stored
+        * target_edges (list): The edge each start location is trying to reach
+        * end_edges (list): The edge each path ends on, or -1 if the unit cannot reach its target edge and self destructs
+        * path_x (list): The x coordinates of the tiles of every path
+        * path_y (list): The y coordinates of the tiles of every path
+        * offsets (list): Where each path starts in path_x and path_y, with the total number of tiles as the last entry
+
+    """
+    def __init__(self):
+        self.starts = []
+        self.target_edges = []
+        self.end_edges = []
+        self.path_x = []
+        self.path_y = []
+        self.offsets = [0]
+
+    def __len__(self):
+        return len(self.starts)
+
+    def add(self, start, target_edge, reaches_edge, path):
+        """Appends the path of a start location
+
+        Args:
+            * start: The start location
+            * target_edge: The edge the unit is trying to reach
+            * reaches_edge: True if the path ends on target_edge
+            * path: The path returned by the pathfinder
+
+        """
+        self.starts.append(start)
+        self.target_edges.append(target_edge)
+        self.end_edges.append(target_edge if reaches_edge else -1)
+        for x, y in path:
+            self.path_x.append(x)
+            self.path_y.append(y)
+        self.offsets.append(len(self.path_x))
+
+    def path(self, index):
+        """Gets a single path as a list of [x, y] locations
+
+        Args:
+            index: The position of the start location in starts
+
+        Returns:
+            The path of that start location
+        """
+        begin, end = self.offsets[index], self.offsets[index + 1]
+        return [[x, y] for x, y in zip(self.path_x[begin:end], self.path_y[begin:end])]
@@ -0,0 +1,156 @@
+"""
+Stands in for engine.jar to run an algo on the turns of a recorded game, without Java.
+
+The algo is sent the messages of a .replay file over stdin, as the engine sent them to player 1: the config, then
+every turn state and action frame, then the end of game message. Its two lines of every turn are recorded with the
+wall time it took to send them. The states come from the replay whatever the algo plays, so runs are repeatable,
+which makes them suited to benchmarking and profiling algos, with GAMELIB_PROFILE set for example.
+
+From the python-algo directory, run an algo on a replay with:
+    python -m gamelib.offline_engine REPLAY algo_strategy.py
+"""
+import argparse
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+
+from .replay import Replay
+from .util import json_loads, json_dumps
+
+
+def algo_command(algo):
+    """The command running an algo: a python file is run with this interpreter, a directory with its run.sh,
+    anything else is run as is
+    """
+    if algo.endswith(".py"):
+        return [sys.executable, "-u", algo]
+    if os.path.isdir(algo):
+        return [os.path.join(algo, "run.sh")]
+    return [algo]
+
+
+class OfflineEngine:
+    """Plays the messages of a replay to an algo process
+
+    Attributes :
+        * replay (:obj: Replay): The game sent to the algo
+        * command (list): The command starting the algo process
+        * timeout (float): The seconds the algo is given to submit a turn before it is stopped
+        * stderr: Where the algo's debug output goes, as for subprocess.Popen. Inherited from this process if None
+
+    """
+    def __init__(self, replay, command, timeout=None, stderr=None):
+        """Prepares a run, the algo is only started by run
+
+        Args:
+            * replay: A Replay, or the path of a .replay file
+            * command: The command starting the algo, see algo_command
+            * timeout (float): Seconds per turn, waitTimeBotMax of the replay's config if None
+            * stderr: Where the algo's debug output goes, subprocess.DEVNULL to silence it
+
+        """
+        self.replay = replay if isinstance(replay, Replay) else Replay(replay)
+        self.command = command
+        if timeout is None:
+            timeout = self.replay.config["timingAndReplay"]["waitTimeBotMax"] / 1000
+        self.timeout = timeout
+        self.stderr = stderr
+
+    def messages(self):
+        """The messages sent to the algo after the config, ending with an end of game message
+
+        When the replay was cut short and has none, the last frame is sent again as the end of game message.
+        """
+        messages = list(self.replay.messages)
+        if messages and messages[-1]["turnInfo"][0] != 2:
+            end = dict(messages[-1])
+            end["turnInfo"] = [2] + list(end["turnInfo"][1:])
+            messages.append(end)
+        return messages
+
+    def run(self):
+        """Runs the algo through the replay
+
+        Returns:
+            A dict with the list of turns, each with its turn number, the two lines the algo sent, parsed,
+            and the wall time to send them in seconds, then the total wall time, the algo's exit code and
+            an error message, None if the algo played every turn and exited
+
+        """
+        # Set iteration order is the same on every run of the algo
+        env = dict(os.environ, PYTHONHASHSEED=os.environ.get("PYTHONHASHSEED", "0"))
+        started = time.perf_counter()
+        process = subprocess.Popen(self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=self.stderr,
+            env=env, universal_newlines=True, bufsize=1)
+        lines = queue.Queue()
+
+        def read():
+            for line in process.stdout:
+                lines.put(line)
+            lines.put(None)
+        threading.Thread(target=read, name="algo stdout", daemon=True).start()
+
+        result = {"turns": [], "seconds": 0, "exit_code": None, "error": None}
+        try:
+            process.stdin.write(json_dumps(self.replay.config) + "\n")
+            for message in self.messages():
+                process.stdin.write(json_dumps(message) + "\n")
+                process.stdin.flush()
+                if message["turnInfo"][0] != 0:
+                    continue
+                sent = time.perf_counter()
+                submitted = [lines.get(timeout=self.timeout)]
+                if submitted[0] is not None:
+                    submitted.append(lines.get(timeout=self.timeout))
+                if None in submitted:
+                    result["error"] = "The algo stopped during turn {}".format(message["turnInfo"][1])
+                    break
+                result["turns"].append({"turn": message["turnInfo"][1], "seconds": time.perf_counter() - sent,
+                    "build": json_loads(submitted[0]), "deploy": json_loads(submitted[1])})
+            process.stdin.close()
+            result["exit_code"] = process.wait(timeout=self.timeout)
+        except queue.Empty:
+            result["error"] = "The algo took longer than {}s to submit turn {}".format(self.timeout, message["turnInfo"][1])
+        except subprocess.TimeoutExpired:
+            result["error"] = "The algo did not exit {}s after the end of the game".format(self.timeout)
+        except (BrokenPipeError, ValueError) as error:
+            result["error"] = result["error"] or "Could not send the algo its messages: {}".format(error)
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            result["exit_code"] = process.returncode
+            result["seconds"] = time.perf_counter() - started
+        return result
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Runs an algo on the turns of a .replay file, without the game engine")
+    parser.add_argument("replay", help="the .replay file, the algo plays player 1")
+    parser.add_argument("algo", help="a python file, a directory with a run.sh, or a command")
+    parser.add_argument("-t", "--timeout", type=float, default=None, help="seconds per turn, waitTimeBotMax by default")
+    parser.add_argument("-q", "--quiet", action="store_true", help="hide the algo's debug output")
+    parser.add_argument("-o", "--output", help="write the turns and their times to this json file")
+    args = parser.parse_args(args)
+
+    engine = OfflineEngine(args.replay, algo_command(args.algo), args.timeout, subprocess.DEVNULL if args.quiet else None)
+    result = engine.run()
+    for turn in result["turns"]:
+        print("turn {:>3} {:>9.1f} ms".format(turn["turn"], turn["seconds"] * 1000))
+    times = [turn["seconds"] for turn in result["turns"]]
+    if times:
+        print("{} turns, {:.1f} ms mean, {:.1f} ms max, {:.2f}s in all".format(len(times), sum(times) * 1000 / len(times),
+            max(times) * 1000, result["seconds"]))
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(json_dumps(result))
+    if result["error"]:
+        print(result["error"])
+    return 0 if result["error"] is None and result["exit_code"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
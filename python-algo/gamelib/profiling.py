@@ -0,0 +1,147 @@
+import functools
+import json
+import os
+import threading
+import time
+
+from .util import debug_write
+
+# The GameState methods AlgoCore times when profiling, by attribute name
+GAME_STATE_METHODS = ["_GameState__parse_state", "find_path_to_edge", "get_target", "get_attackers", "attempt_spawn"]
+
+_MISSING = object()
+
+
+class Profiler:
+    """Counts the calls of functions and the time spent in them, turn by turn
+
+    Functions are timed by replacing them with a wrapper, see patch. Times are inclusive: a timed function calling
+    another one counts the time of both. Calls made by other threads than the one that created the profiler,
+    such as AlgoCore.precompute_next_turn, are counted apart, with " (background)" appended to their label.
+
+    Attributes :
+        * turns (list): A dict for every turn, with its turn number, the calls by label as [count, seconds],
+          and engine_ms, the time the engine counted for the turn, once the next turn state told it
+
+    """
+    def __init__(self):
+        self.turns = []
+        self.__current = None
+        self.__patched = []
+        self.__thread = threading.get_ident()
+
+    def new_turn(self, turn_number, time_spent=None):
+        """Starts counting the calls of a turn. Calls made before the first turn are not counted
+
+        Args:
+            * turn_number (int): The turn starting
+            * time_spent: The milliseconds the engine counted for the previous turn, as in GameState.my_time
+
+        """
+        if self.turns and time_spent is not None:
+            self.turns[-1]["engine_ms"] = time_spent
+        self.__current = {"turn": turn_number, "calls": {}}
+        self.turns.append(self.__current)
+
+    def timed(self, label, func):
+        """Wraps a function to count its calls and time under label
+        """
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            turn = self.__current
+            if turn is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                key = label if threading.get_ident() == self.__thread else label + " (background)"
+                entry = turn["calls"].get(key)
+                if entry is None:
+                    entry = turn["calls"][key] = [0, 0.0]
+                entry[0] += 1
+                entry[1] += elapsed
+        return wrapper
+
+    def patch(self, owner, name, label=None):
+        """Replaces an attribute of a class or an object with a timed wrapper, until restore is called
+
+        Args:
+            * owner: The class, to time every instance, or the object
+            * name (str): The attribute name, mangled for private methods, like "_GameState__parse_state"
+            * label (str): The name the calls are reported under, owner and name if None
+
+        """
+        if label is None:
+            owner_name = owner.__name__ if isinstance(owner, type) else type(owner).__name__
+            label = "{}.{}".format(owner_name, name.replace("_{}__".format(owner_name), "__"))
+        original = vars(owner).get(name, _MISSING)
+        setattr(owner, name, self.timed(label, getattr(owner, name)))
+        self.__patched.append((owner, name, original))
+
+    def restore(self):
+        """Puts back every attribute replaced by patch
+        """
+        for owner, name, original in reversed(self.__patched):
+            if original is _MISSING:
+                delattr(owner, name)
+            else:
+                setattr(owner, name, original)
+        self.__patched = []
+
+    def totals(self):
+        """The calls of every turn added up, by label as [count, seconds]
+        """
+        totals = {}
+        for turn in self.turns:
+            for label, (count, seconds) in turn["calls"].items():
+                entry = totals.setdefault(label, [0, 0.0])
+                entry[0] += count
+                entry[1] += seconds
+        return totals
+
+    def report(self):
+        """The per turn breakdown and the totals, in milliseconds, as a json serializable dict
+        """
+        def calls(by_label):
+            return {label: {"calls": count, "ms": round(seconds * 1000, 3)} for label, (count, seconds) in by_label.items()}
+        turns = []
+        for turn in self.turns:
+            entry = {"turn": turn["turn"], "calls": calls(turn["calls"])}
+            if "engine_ms" in turn:
+                entry["engine_ms"] = turn["engine_ms"]
+            turns.append(entry)
+        return {"turns": turns, "totals": calls(self.totals())}
+
+    def write(self, path):
+        """Writes report() to a json file
+
+        Returns:
+            True if it was written, False if the file could not be written
+
+        """
+        try:
+            with open(path, "w") as report_file:
+                json.dump(self.report(), report_file, indent=1)
+        except OSError as error:
+            debug_write("Could not write the profile to {}: {}".format(path, error))
+            return False
+        return True
+
+    def summary(self):
+        """The totals as a table, slowest first, with the time per call and per turn
+        """
+        num_turns = max(1, len(self.turns))
+        lines = ["{:<40} {:>8} {:>10} {:>10} {:>10}".format("Profile of {} turns".format(len(self.turns)), "calls", "total ms", "ms/call", "ms/turn")]
+        for label, (count, seconds) in sorted(self.totals().items(), key=lambda item: -item[1][1]):
+            lines.append("{:<40} {:>8} {:>10.1f} {:>10.3f} {:>10.1f}".format(label, count, seconds * 1000, seconds * 1000 / count, seconds * 1000 / num_turns))
+        return "\n".join(lines)
+
+
+def default_report_path():
+    """Where AlgoCore writes the profile by default: the replays directory the engine saves replays in when there is one
+    in the working directory, the working directory otherwise, in a file named after the time and the process id
+    """
+    directory = "replays" if os.path.isdir("replays") else "."
+    return os.path.join(directory, "profile_{}_{}.json".format(time.strftime("%Y-%m-%d_%H-%M-%S"), os.getpid()))
@@ -0,0 +1,208 @@
+"""
+Reads the .replay files written by engine.jar and measures how closely gamelib.simulator
+reproduces the action phases recorded in them.
+
+From the python-algo directory, validate every replay of a directory on all cores with:
+    python -m gamelib.replay REPLAY_DIR
+"""
+import argparse
+import glob
+import multiprocessing
+import os
+from collections import Counter
+
+from .game_state import GameState
+from .simulator import Simulator
+from .util import json_loads, json_dumps
+
+
+class Replay:
+    """The frames of a game, as recorded by the game engine
+
+    Attributes :
+        * path (str): The .replay file the game was read from
+        * config (JSON): The config the game was played with
+        * frames (dict): Every frame, by (turn_number, frame_number). Frame number -1 is the state sent to the algos at the
+          start of a turn, frames 0 and up are the frames of its action phase
+        * messages (list): Every frame in the order it was recorded, the end of game message included
+
+    """
+    def __init__(self, path):
+        """Reads a .replay file
+
+        Args:
+            * path (str): The replay file to read, one json object per line
+
+        """
+        self.path = path
+        self.config = None
+        self.frames = {}
+        self.messages = []
+        with open(path) as replay_file:
+            for line in replay_file:
+                line = line.strip()
+                if not line:
+                    continue
+                data = json_loads(line)
+                # The config is the only line with debug settings, like in scripts/contributions/get_results.py
+                if "debug" in data:
+                    self.config = data
+                else:
+                    self.messages.append(data)
+                    state_type, turn_number, frame_number = data["turnInfo"][:3]
+                    # The end of game message would take the place of a frame of the last turn
+                    if state_type != 2:
+                        self.frames[(turn_number, frame_number)] = data
+
+    def turns(self):
+        """The turn numbers that have both a turn start state and an action phase, in order
+        """
+        return sorted(turn for turn, frame in self.frames if frame == -1 and (turn, 0) in self.frames)
+
+    def action_frames(self, turn_number):
+        """The recorded frames of the action phase of a turn, in order
+        """
+        return [self.frames[key] for key in sorted(key for key in self.frames if key[0] == turn_number and key[1] >= 0)]
+
+    def seed_state(self, turn_number):
+        """The GameState at the start of the action phase of a turn
+
+        The state sent to the algos at the start of the turn, with the units of the spawn events of the first action frame
+        added to it: built and deployed units, and firewalls marked for removal.
+
+        Args:
+            * turn_number (int): The turn to seed
+
+        Returns:
+            A GameState whose information units are ready to be simulated
+
+        """
+        game_state = GameState(self.config, json_dumps(self.frames[(turn_number, -1)]))
+        game_state.suppress_warnings(True)
+        unit_types = [unit["shorthand"] for unit in self.config["unitInformation"]]
+        # Spawn events are [[x, y], unit type index, unit id, player number 1 or 2]
+        for location, type_index, _, player in self.frames[(turn_number, 0)]["events"]["spawn"]:
+            unit_type = unit_types[type_index]
+            if unit_type == unit_types[-1]:
+                for unit in game_state.game_map[location]:
+                    if unit.stationary:
+                        unit.pending_removal = True
+            else:
+                game_state.game_map.add_unit(unit_type, location, player - 1)
+        return game_state
+
+
+def units_of_frame(frame, config):
+    """Counts the units of a recorded frame by (unit_type, x, y, player_index), removal markers excluded
+    """
+    unit_types = [unit["shorthand"] for unit in config["unitInformation"]]
+    units = Counter()
+    for player_index, key in enumerate(("p1Units", "p2Units")):
+        for type_index, unit_list in enumerate(frame[key][:len(unit_types) - 1]):
+            for unit in unit_list:
+                units[(unit_types[type_index], int(unit[0]), int(unit[1]), player_index)] += 1
+    return units
+
+
+def units_of_state(game_state):
+    """Counts the units of a GameState by (unit_type, x, y, player_index)
+    """
+    return Counter((unit.unit_type, unit.x, unit.y, unit.player_index) for unit in game_state.game_map.get_units())
+
+
+def validate_turn(replay, turn_number, simulator=None):
+    """Simulates one turn of a replay and compares every frame with the recorded one
+
+    Frame n of the simulation is compared with action frame n of the replay, the last simulated frame
+    standing in for any later recorded frame. A frame diverges when the units differ in type, location or owner,
+    or when the health of either player differs.
+
+    Args:
+        * replay (:obj: Replay): The game to validate against
+        * turn_number (int): The turn to simulate
+        * simulator (:obj: Simulator): The simulator to validate, a default Simulator if None
+
+    Returns:
+        A dict with the turn, the number of frames compared and diverged, the first diverged frame or None,
+        the largest number of mismatched units of any frame and the error on each player's health after the turn
+
+    """
+    simulator = simulator or Simulator(replay.config)
+    game_state = replay.seed_state(turn_number)
+    snapshots = [(units_of_state(game_state), game_state.my_health, game_state.enemy_health)]
+
+    def snapshot(frame, state):
+        snapshots.append((units_of_state(state), state.my_health, state.enemy_health))
+    simulator.simulate(game_state, frame_callback=snapshot)
+
+    report = {"turn": turn_number, "frames": 0, "diverged": 0, "first_divergence": None, "max_unit_mismatch": 0}
+    for recorded in replay.action_frames(turn_number):
+        frame_number = recorded["turnInfo"][2]
+        units, my_health, enemy_health = snapshots[min(frame_number, len(snapshots) - 1)]
+        recorded_units = units_of_frame(recorded, replay.config)
+        mismatch = sum(((units - recorded_units) + (recorded_units - units)).values())
+        health_error = [my_health - recorded["p1Stats"][0], enemy_health - recorded["p2Stats"][0]]
+        report["frames"] += 1
+        report["max_unit_mismatch"] = max(report["max_unit_mismatch"], mismatch)
+        if mismatch or any(health_error):
+            report["diverged"] += 1
+            if report["first_divergence"] is None:
+                report["first_divergence"] = frame_number
+        report["health_error"] = health_error
+    return report
+
+
+def validate_replay(path):
+    """Validates the simulator on every turn of a replay, see validate_turn
+
+    Returns:
+        The path and the list of turn reports
+
+    """
+    replay = Replay(path)
+    simulator = Simulator(replay.config)
+    return path, [validate_turn(replay, turn_number, simulator) for turn_number in replay.turns()]
+
+
+def validate_replays(paths, processes=None):
+    """Validates the simulator on many replays in parallel, one process per core by default
+
+    Args:
+        * paths: The .replay files to validate against
+        * processes: The number of worker processes, os.cpu_count() if None
+
+    Returns:
+        A list of (path, turn reports) in the order of paths
+
+    """
+    if processes == 1 or len(paths) < 2:
+        return [validate_replay(path) for path in paths]
+    with multiprocessing.Pool(processes) as pool:
+        return pool.map(validate_replay, paths)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Compares the action phases simulated by gamelib.simulator with recorded replays")
+    parser.add_argument("replays", nargs="+", help=".replay files, or directories holding them")
+    parser.add_argument("-j", "--processes", type=int, default=None, help="worker processes, one per core by default")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print a line for every turn")
+    args = parser.parse_args(args)
+
+    paths = []
+    for path in args.replays:
+        paths += sorted(glob.glob(os.path.join(path, "*.replay"))) if os.path.isdir(path) else [path]
+    total_turns = total_exact = 0
+    for path, reports in validate_replays(paths, args.processes):
+        exact = sum(1 for report in reports if not report["diverged"])
+        total_turns += len(reports)
+        total_exact += exact
+        print("{}: {} of {} turns reproduced exactly".format(path, exact, len(reports)))
+        for report in reports:
+            if args.verbose or report["diverged"]:
+                print("  turn {turn}: {diverged} of {frames} frames diverged, first at frame {first_divergence}, "
+                    "up to {max_unit_mismatch} units off, health error {health_error}".format(**report))
+    print("{} of {} turns reproduced exactly".format(total_exact, total_turns))
+
+
+if __name__ == "__main__":
+    main()
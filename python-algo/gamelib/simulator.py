@@ -0,0 +1,507 @@
+import copy
+
+from .game_map import ColumnarGameMap
+from .util import debug_write
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class SimulationResult:
+    """The outcome of a simulated action phase
+
+    Attributes :
+        * frames (int): The number of frames simulated
+        * my_health (float): Your health at the end of the action phase
+        * enemy_health (float): Your opponents health at the end of the action phase
+        * resources (list): The resources each player gained during the action phase, [{'cores': c, 'bits': b}] for player 0 and 1
+        * breaches (list): The (x, y, player_index) location and owner of every information unit that scored
+        * self_destructs (list): The (x, y, player_index) location and owner of every information unit that self destructed
+        * destroyed (list): The units destroyed by attacks or self destructs, with the location they died on
+        * game_state (:obj: GameState): A fork of the simulated state, as the board is left at the end of the action phase
+        * stopped (bool): True if the simulation was stopped before the end of the action phase, see Simulator.simulate
+
+    """
+    def __init__(self, game_state):
+        self.frames = 0
+        self.my_health = game_state.my_health
+        self.enemy_health = game_state.enemy_health
+        self.resources = [{'cores': 0, 'bits': 0}, {'cores': 0, 'bits': 0}]
+        self.breaches = []
+        self.self_destructs = []
+        self.destroyed = []
+        self.game_state = game_state
+        self.stopped = False
+
+    def __str__(self):
+        return "{} frames, health {} / {}, {} breaches, {} self destructs, {} units destroyed".format(
+            self.frames, self.my_health, self.enemy_health, len(self.breaches), len(self.self_destructs), len(self.destroyed))
+
+
+class _Mover:
+    """An information unit making its way through the simulation
+    """
+    __slots__ = ("unit", "target_edge", "end_points", "path", "path_index", "walls_version", "steps", "frames_to_move", "move_interval", "shielded_by")
+
+    def __init__(self, unit, target_edge, end_points):
+        self.unit = unit
+        self.target_edge = target_edge
+        self.end_points = end_points
+        self.path = None
+        self.path_index = 0
+        self.walls_version = None
+        self.steps = 0
+        self.move_interval = max(1, int(round(1 / unit.speed)))
+        self.frames_to_move = self.move_interval
+        self.shielded_by = set()
+
+
+class Simulator:
+    """Predicts the action phase of a turn without the game engine
+
+    Every frame, in order:
+        1. Information units that are due move one tile along their path. Paths are computed with the GameState
+           pathfinder and recomputed whenever a firewall was destroyed, as units reroute mid round.
+           A unit at the end of its path scores if the path reached its target edge, otherwise it self destructs,
+           damaging enemy firewalls within selfDestructRadius by its starting health if it moved at least
+           stepsRequiredSelfDestruct tiles.
+        2. Each encryptor shields every friendly information unit in its range, once per unit.
+        3. Every information unit and every destructor attacks the unit chosen by GameState.get_target.
+           All targets are chosen before any damage is dealt.
+        4. Units with no health left are removed.
+
+    Scoring deals damageToPlayer to the opponent and gives the scoring player coresForPlayerDamage cores per point of damage.
+    Firewalls pending removal are refunded at the end of the action phase, destroyOwnUnitRefund of their cost scaled by their
+    remaining health. This follows the published rules of the game, details of the engine such as the exact frame a unit
+    scores on may differ.
+
+    Attributes :
+        * config (JSON): Contains information about the game
+        * max_frames (int): The simulation stops after this many frames, even if units are still moving
+
+    """
+    def __init__(self, config, max_frames=1000):
+        """Reads the rules of the game from config
+
+        Args:
+            * config (JSON): A json object containing information about the game
+            * max_frames (int): The simulation stops after this many frames
+
+        """
+        self.config = config
+        self.max_frames = max_frames
+        unit_information = config["unitInformation"]
+        self.ENCRYPTOR = unit_information[1]["shorthand"]
+        self.DESTRUCTOR = unit_information[2]["shorthand"]
+        self.shield_amount = unit_information[1].get("shieldAmount", 0)
+        self.encryptor_range = unit_information[1].get("range", 0)
+        self.destructor_range = unit_information[2].get("range", 0)
+        self.damage_to_player = {unit["shorthand"]: unit.get("damageToPlayer", 1) for unit in unit_information}
+        mechanics = config.get("mechanics", {})
+        self.steps_required_self_destruct = mechanics.get("stepsRequiredSelfDestruct", 5)
+        self.self_destruct_radius = mechanics.get("selfDestructRadius", 1.5)
+        self.refund = mechanics.get("destroyOwnUnitRefund", 0.75)
+        self.cores_for_player_damage = config.get("resources", {}).get("coresForPlayerDamage", 1)
+
+    def simulate(self, game_state, deploys=None, enemy_deploys=None, frame_callback=None, stop=None):
+        """Simulates the action phase that follows a game state
+
+        The information units on the map, such as the ones spawned with attempt_spawn, take part in the simulation.
+        game_state is not changed, the simulation runs on a fork of it.
+
+        Args:
+            * game_state (:obj: GameState): The state at the end of the deploy phase
+            * deploys: Extra [unit_type, x, y] information units to deploy for you
+            * enemy_deploys: [unit_type, x, y] information units to deploy for your opponent
+            * frame_callback: Called as frame_callback(frame, state) at the end of every frame with the simulated GameState,
+              which must not be changed
+            * stop (:obj: threading.Event): Checked before every frame, once it is set the simulation stops
+              and the result, marked stopped, holds the frames simulated so far
+
+        Returns:
+            A SimulationResult
+
+        """
+        state = game_state.fork()
+        state.suppress_warnings(True)
+        for player_index, extra_deploys in ((0, deploys), (1, enemy_deploys)):
+            for unit_type, x, y in extra_deploys or []:
+                state.game_map.add_unit(unit_type, [x, y], player_index)
+
+        # The units of a forked GameMap are shared with game_state, they are copied before the simulation changes them
+        owned = None if isinstance(state.game_map, ColumnarGameMap) else {}
+        result = SimulationResult(state)
+        movers = []
+        for location in state.game_map:
+            for unit in list(state.game_map[location]):
+                if not unit.stationary:
+                    unit = self.__own(state, unit, owned)
+                    target_edge = state.get_target_edge(location)
+                    end_points = set(tuple(end_point) for end_point in state.game_map.get_edge_locations(target_edge))
+                    movers.append(_Mover(unit, target_edge, end_points))
+
+        while movers and result.frames < self.max_frames:
+            if stop is not None and stop.is_set():
+                result.stopped = True
+                return result
+            result.frames += 1
+            damages = []
+            movers = self.__move(state, movers, result, damages)
+            self.__shield(state, movers)
+            self.__attack(state, movers, damages)
+            movers = self.__remove_dead(state, movers, damages, result, owned)
+            if frame_callback is not None:
+                frame_callback(result.frames, state)
+        if movers:
+            debug_write("Simulation stopped after {} frames with {} units still moving".format(result.frames, len(movers)))
+
+        for location in state.game_map:
+            units = state.game_map[location]
+            if units and units[0].stationary and units[0].pending_removal:
+                firewall = units[0]
+                result.resources[firewall.player_index]['cores'] += firewall.cost * self.refund * firewall.health / firewall.max_health
+                state.game_map.remove_unit(location)
+        return result
+
+    def __move(self, state, movers, result, damages):
+        still_moving = []
+        for mover in movers:
+            mover.frames_to_move -= 1
+            if mover.frames_to_move > 0:
+                still_moving.append(mover)
+                continue
+            mover.frames_to_move = mover.move_interval
+            unit = mover.unit
+            location = [unit.x, unit.y]
+            if not mover.walls_version == state.game_map.walls_version:
+                # A unit standing on a firewall has nowhere to go
+                mover.path = state.find_path_to_edge(location, mover.target_edge) or [location]
+                mover.path_index = 0
+                mover.walls_version = state.game_map.walls_version
+
+            if mover.path_index + 1 < len(mover.path):
+                mover.path_index += 1
+                x, y = mover.path[mover.path_index]
+                tile = state.game_map.edit_tile(location)
+                tile.remove(unit)
+                unit.x = x
+                unit.y = y
+                tile = state.game_map.edit_tile([x, y])
+                tile.append(unit)
+                # Columnar maps store a copy of the unit
+                mover.unit = tile[-1]
+                mover.steps += 1
+                still_moving.append(mover)
+                continue
+
+            owner = unit.player_index
+            state.game_map.edit_tile(location).remove(unit)
+            if tuple(location) in mover.end_points:
+                damage = self.damage_to_player[unit.unit_type]
+                if owner == 0:
+                    state.enemy_health -= damage
+                else:
+                    state.my_health -= damage
+                result.resources[owner]['cores'] += self.cores_for_player_damage * damage
+                result.breaches.append((unit.x, unit.y, owner))
+            else:
+                result.self_destructs.append((unit.x, unit.y, owner))
+                if mover.steps >= self.steps_required_self_destruct:
+                    for target in state.game_map.get_units_in_range(location, self.self_destruct_radius, player_index=1 - owner):
+                        if target.stationary:
+                            damages.append((target, unit.max_health))
+        result.my_health = state.my_health
+        result.enemy_health = state.enemy_health
+        return still_moving
+
+    def __shield(self, state, movers):
+        if not self.shield_amount:
+            return
+        for mover in movers:
+            unit = mover.unit
+            for encryptor in state.game_map.get_units_in_range([unit.x, unit.y], self.encryptor_range, self.ENCRYPTOR, unit.player_index):
+                key = (encryptor.x, encryptor.y)
+                if key not in mover.shielded_by:
+                    mover.shielded_by.add(key)
+                    unit.health += self.shield_amount
+
+    def __attack(self, state, movers, damages):
+        destructors = {}
+        for mover in movers:
+            unit = mover.unit
+            damages_taken = state.get_damage_map(unit.player_index)[state.game_map.get_tile_id([unit.x, unit.y])]
+            if damages_taken:
+                for destructor in state.game_map.get_units_in_range([unit.x, unit.y], self.destructor_range, self.DESTRUCTOR, 1 - unit.player_index):
+                    destructors[(destructor.x, destructor.y)] = destructor
+
+        for destructor in destructors.values():
+            target = state.get_target(destructor)
+            if target is not None and not target.stationary:
+                damages.append((target, destructor.damage))
+        for mover in movers:
+            unit = mover.unit
+            target = state.get_target(unit)
+            if target is not None:
+                damage = unit.damage_f if target.stationary else unit.damage_i
+                if damage:
+                    damages.append((target, damage))
+
+    def __own(self, state, unit, owned):
+        if owned is None:
+            return unit
+        if id(unit) not in owned:
+            tile = state.game_map.edit_tile([unit.x, unit.y])
+            index = next(index for index, other in enumerate(tile) if other is unit)
+            tile[index] = owned[id(unit)] = copy.copy(unit)
+            owned[id(tile[index])] = tile[index]
+        return owned[id(unit)]
+
+    def __remove_dead(self, state, movers, damages, result, owned):
+        if not damages:
+            return movers
+        damages = [(self.__own(state, target, owned), damage) for target, damage in damages]
+        for target, damage in damages:
+            target.health -= damage
+        destroyed = set()
+        for target, _ in damages:
+            if target.health <= 0 and id(target) not in destroyed:
+                destroyed.add(id(target))
+                location = [target.x, target.y]
+                result.destroyed.append(target)
+                if target.stationary:
+                    state.game_map.remove_unit(location)
+                else:
+                    state.game_map.edit_tile(location).remove(target)
+        return [mover for mover in movers if id(mover.unit) not in destroyed]
+
+
+def simulate(game_state, deploys=None, enemy_deploys=None):
+    """Simulates the action phase that follows a game state, see Simulator.simulate
+
+    Args:
+        * game_state (:obj: GameState): The state at the end of the deploy phase
+        * deploys: Extra [unit_type, x, y] information units to deploy for you
+        * enemy_deploys: [unit_type, x, y] information units to deploy for your opponent
+
+    Returns:
+        A SimulationResult
+
+    """
+    return Simulator(game_state.config).simulate(game_state, deploys, enemy_deploys)
+
+
+class BatchResult:
+    """The outcomes of the plans simulated by BatchSimulator, numpy arrays with one entry per plan
+
+    Attributes :
+        * damage (numpy.ndarray): The health each plan took from the opponent
+        * breaches (numpy.ndarray): How many information units of each plan scored
+        * self_destructs (numpy.ndarray): How many information units of each plan self destructed
+        * units_lost (numpy.ndarray): How many information units of each plan were destroyed
+        * firewall_damage (numpy.ndarray): The damage each plan dealt to enemy firewalls, with attacks and self destructs
+        * firewalls_destroyed (numpy.ndarray): How many enemy firewalls each plan destroyed
+        * frames (numpy.ndarray): The frame the last unit of each plan scored, self destructed or was destroyed on
+
+    """
+    def __init__(self, num_plans):
+        self.damage = np.zeros(num_plans)
+        self.breaches = np.zeros(num_plans, dtype=np.int64)
+        self.self_destructs = np.zeros(num_plans, dtype=np.int64)
+        self.units_lost = np.zeros(num_plans, dtype=np.int64)
+        self.firewall_damage = np.zeros(num_plans)
+        self.firewalls_destroyed = np.zeros(num_plans, dtype=np.int64)
+        self.frames = np.zeros(num_plans, dtype=np.int64)
+
+
+class BatchSimulator:
+    """Simulates many candidate attacks against the same board in lockstep, with numpy
+
+    A plan is a list of information units deployed by one player. All plans advance together, frame by frame,
+    as numpy arrays over (plan, unit) for positions, health and targets, so simulating 50 plans costs far less
+    than 50 runs of Simulator. The board, the paths and the encryptor shields are shared between plans and
+    read-only, only the health of the units of each plan and of the enemy firewalls it attacks are per plan.
+    Compared with Simulator this means:
+        * Paths are computed once, units do not reroute when a plan destroys a firewall
+        * The information units already on the map and the ones of the opponent are not simulated
+
+    The frame order and the rules are otherwise the ones of Simulator, targets are chosen like GameState.get_target.
+    Requires numpy.
+
+    Attributes :
+        * config (JSON): Contains information about the game
+        * max_frames (int): The simulation stops after this many frames, even if units are still moving
+
+    """
+    def __init__(self, config, max_frames=1000):
+        """Reads the rules of the game from config
+
+        Args:
+            * config (JSON): A json object containing information about the game
+            * max_frames (int): The simulation stops after this many frames
+
+        """
+        self.config = config
+        self.max_frames = max_frames
+        unit_information = config["unitInformation"]
+        self.ENCRYPTOR = unit_information[1]["shorthand"]
+        self.DESTRUCTOR = unit_information[2]["shorthand"]
+        self.shield_amount = unit_information[1].get("shieldAmount", 0)
+        self.encryptor_range = unit_information[1].get("range", 0)
+        self.destructor_range = unit_information[2].get("range", 0)
+        self.destructor_damage = unit_information[2].get("damage", 0)
+        # Per information unit type: frames per tile, health, damage to firewalls, range and damage to the opponent
+        self.unit_stats = {}
+        for unit in unit_information[3:6]:
+            self.unit_stats[unit["shorthand"]] = (max(1, int(round(1 / unit["speed"]))), unit["stability"],
+                unit.get("damageF", 0), unit.get("range", 0), unit.get("damageToPlayer", 1))
+        mechanics = config.get("mechanics", {})
+        self.steps_required_self_destruct = mechanics.get("stepsRequiredSelfDestruct", 5)
+        self.self_destruct_radius = mechanics.get("selfDestructRadius", 1.5)
+
+    def simulate(self, game_state, plans, player_index=0):
+        """Simulates the action phase of every plan against the board of game_state
+
+        Args:
+            * game_state (:obj: GameState): The board the plans are played against, it is not changed
+            * plans: A list of plans, each a list of [unit_type, x, y] information units to deploy
+            * player_index: The player deploying the plans, 0 for you 1 for the enemy
+
+        Returns:
+            A BatchResult, or None if numpy is not installed
+
+        """
+        if np is None:
+            debug_write("BatchSimulator needs numpy, which is not installed")
+            return None
+        game_map = game_state.game_map
+        num_plans = len(plans)
+        plan_size = max([len(plan) for plan in plans] + [1])
+        result = BatchResult(num_plans)
+
+        # Paths, and the shield a unit has collected by each step of them, are shared by every unit deployed on a tile
+        path_indices = {}
+        paths = []
+        on_edge = []
+        encryptors = game_map.get_units(self.ENCRYPTOR, player_index)
+        path_id = np.zeros((num_plans, plan_size), dtype=np.int64)
+        stats = np.zeros((5, num_plans, plan_size))
+        # Padding after the end of shorter plans never moves
+        stats[0] = 1
+        alive = np.zeros((num_plans, plan_size), dtype=bool)
+        for plan_index, plan in enumerate(plans):
+            for unit_index, (unit_type, x, y) in enumerate(plan):
+                if (x, y) not in path_indices:
+                    path_indices[(x, y)] = len(paths)
+                    target_edge = game_state.get_target_edge([x, y])
+                    path = game_state.find_path_to_edge([x, y], target_edge) or [[x, y]]
+                    paths.append(path)
+                    on_edge.append(path[-1] in game_map.get_edge_locations(target_edge))
+                path_id[plan_index, unit_index] = path_indices[(x, y)]
+                stats[:, plan_index, unit_index] = self.unit_stats[unit_type]
+                alive[plan_index, unit_index] = True
+        if not paths:
+            return result
+        interval, max_health, damage_f, unit_range, to_player = stats
+        interval = interval.astype(np.int64)
+
+        path_length = max(len(path) for path in paths)
+        path_x = np.array([[x for x, _ in path] + [path[-1][0]] * (path_length - len(path)) for path in paths])
+        path_y = np.array([[y for _, y in path] + [path[-1][1]] * (path_length - len(path)) for path in paths])
+        shield = np.zeros(path_x.shape)
+        for index, path in enumerate(paths):
+            shielded_by = set()
+            for step, location in enumerate(path):
+                for encryptor in encryptors:
+                    if _in_range(location[0] - encryptor.x, location[1] - encryptor.y, self.encryptor_range):
+                        shielded_by.add((encryptor.x, encryptor.y))
+                shield[index, step:] = len(shielded_by) * self.shield_amount
+        length = np.array([len(path) for path in paths])[path_id]
+        on_edge = np.array(on_edge)[path_id]
+
+        # Only the enemy firewalls some path passes close to can be attacked
+        reach = max(float(unit_range.max()), self.self_destruct_radius)
+        firewalls = [unit for unit in game_map.get_units(player_index=1 - player_index) if unit.stationary and
+            _in_range(path_x - unit.x, path_y - unit.y, reach).any()]
+        firewall_x = np.array([unit.x for unit in firewalls], dtype=np.int64)
+        firewall_y = np.array([unit.y for unit in firewalls], dtype=np.int64)
+        firewall_health = np.tile(np.array([unit.health for unit in firewalls], dtype=float), (num_plans, 1))
+        destructors = np.array([index for index, unit in enumerate(firewalls) if unit.unit_type == self.DESTRUCTOR], dtype=np.int64)
+        # get_target prefers low targets when attacking as player 0 and high targets as player 1
+        sign = 1 if player_index == 0 else -1
+
+        damage_taken = np.zeros((num_plans, plan_size))
+        frame = 0
+        while frame < self.max_frames and alive.any():
+            frame += 1
+            step = np.minimum(frame // interval, length - 1)
+            x = path_x[path_id, step]
+            y = path_y[path_id, step]
+            unit_damage = np.zeros((num_plans, plan_size))
+            firewall_damage = np.zeros(firewall_health.shape)
+            firewall_alive = firewall_health > 0
+
+            finished = alive & (frame == interval * length)
+            if finished.any():
+                scored = finished & on_edge
+                result.damage += (scored * to_player).sum(axis=1)
+                result.breaches += scored.sum(axis=1)
+                exploded = finished & ~on_edge
+                result.self_destructs += exploded.sum(axis=1)
+                exploded &= length - 1 >= self.steps_required_self_destruct
+                if exploded.any() and len(firewalls):
+                    in_blast = _in_range(x[:, :, None] - firewall_x, y[:, :, None] - firewall_y, self.self_destruct_radius)
+                    firewall_damage += (in_blast * (exploded * max_health)[:, :, None]).sum(axis=1)
+                result.frames[finished.any(axis=1)] = frame
+                alive &= ~finished
+
+            health = max_health + shield[path_id, step] - damage_taken
+            if len(destructors):
+                dx = x[:, :, None] - firewall_x[destructors]
+                dy = y[:, :, None] - firewall_y[destructors]
+                candidates = alive[:, :, None] & _in_range(dx, dy, self.destructor_range) & firewall_alive[:, None, destructors]
+                target, attacks = _choose_targets(candidates, 1, (dx * dx + dy * dy, health[:, :, None], -sign * y[:, :, None],
+                    -np.abs(game_map.HALF_ARENA - 0.5 - x[:, :, None])))
+                plan_index, destructor = np.nonzero(attacks)
+                np.add.at(unit_damage, (plan_index, target[plan_index, destructor]), self.destructor_damage)
+
+            if len(firewalls):
+                dx = x[:, :, None] - firewall_x
+                dy = y[:, :, None] - firewall_y
+                candidates = (alive & (damage_f > 0))[:, :, None] & _in_range(dx, dy, unit_range[:, :, None]) & firewall_alive[:, None, :]
+                target, attacks = _choose_targets(candidates, 2, (dx * dx + dy * dy, firewall_health[:, None, :], sign * firewall_y,
+                    -np.abs(game_map.HALF_ARENA - 0.5 - firewall_x)))
+                plan_index, unit_index = np.nonzero(attacks)
+                np.add.at(firewall_damage, (plan_index, target[plan_index, unit_index]), damage_f[plan_index, unit_index])
+
+            damage_taken += unit_damage
+            dead = alive & (health - unit_damage <= 0)
+            result.units_lost += dead.sum(axis=1)
+            result.frames[dead.any(axis=1)] = frame
+            alive &= ~dead
+            firewall_health -= firewall_damage
+            result.firewall_damage += firewall_damage.sum(axis=1)
+        if alive.any():
+            debug_write("Batch simulation stopped after {} frames with {} units still moving".format(frame, int(alive.sum())))
+        result.firewalls_destroyed += (firewall_health <= 0).sum(axis=1)
+        return result
+
+
+def _in_range(dx, dy, radius):
+    # Same rule as GameMap.get_locations_in_range, a tile is in range if its center is within radius + 0.51
+    return np.sqrt(dx * dx + dy * dy) < radius + 0.51
+
+
+def _choose_targets(candidates, axis, keys):
+    """Picks a target along axis among the candidates, by the lowest of each key in turn
+
+    Returns:
+        The index of the target along axis, and whether there was any candidate
+
+    """
+    for key in keys:
+        key = np.broadcast_to(key, candidates.shape)
+        best = np.where(candidates, key, np.inf).min(axis=axis, keepdims=True)
+        candidates = candidates & (key == best)
+    return candidates.argmax(axis=axis), candidates.any(axis=axis)
@@ -1,11 +1,32 @@
 import unittest
+import unittest.mock
+import contextlib
+import copy
+import io
+import glob
 import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
 from .game_state import GameState
 from .unit import GameUnit
+from .navigation import ShortestPathFinder, NumpyShortestPathFinder, np
+from .game_map import GameMap, ColumnarGameMap
+from .simulator import simulate, Simulator, BatchSimulator
+from .replay import validate_replays
+from .offline_engine import OfflineEngine, algo_command
+from .algocore import AlgoCore
+from .anytime import Deadline, AnytimeSearch
+from .util import Memo, DebugLog, get_debug_log, debug_write, DEBUG, INFO, WARNING, get_state_type, parse_fields, set_json_codec, get_json_codec, json_loads, json_dumps, JSON_CODECS
 
 class BasicTests(unittest.TestCase):
 
-    def make_turn_0_map(self):
+    def make_turn_0_map(self, **kwargs):
         config = """
         {
             "debug":{
@@ -128,7 +149,7 @@ class BasicTests(unittest.TestCase):
         """
         turn_0 = """{"p2Units":[[],[],[],[],[],[],[]],"turnInfo":[0,0,-1],"p1Stats":[30.0,25.0,5.0,0],"p1Units":[[],[],[],[],[],[],[]],"p2Stats":[30.0,25.0,5.0,0],"events":{"selfDestruct":[],"breach":[],"damage":[],"shield":[],"move":[],"spawn":[],"death":[],"attack":[],"melee":[]}}"""
         
-        state = GameState(json.loads(config), turn_0)
+        state = GameState(json.loads(config), turn_0, **kwargs)
         state.suppress_warnings(True)
         return state
 
@@ -175,11 +196,838 @@ class BasicTests(unittest.TestCase):
             game.game_map.add_unit("FF", [13,13])
         self.assertEqual(1, len(game.game_map[13,13]), "Towers seem to be stacking")
         
+    def test_tile_ids(self):
+        game = self.make_turn_0_map()
+        game_map = game.game_map
+        self.assertEqual(420, game_map.TILE_COUNT, "The board should have 420 tiles")
+        for tile_id, location in enumerate(game_map):
+            self.assertEqual(tile_id, game_map.get_tile_id(location), "Iteration should follow tile id order")
+            self.assertEqual(location, game_map.get_tile_location(tile_id), "Tile ids should map back to their location")
+        self.assertEqual(-1, game_map.get_tile_id([0, 0]), "Off board tiles should not have an id")
+        self.assertEqual(False, game_map.in_arena_bounds([-1, 13]), "Negative coordinates should be out of bounds")
+        self.assertEqual(False, game_map.in_arena_bounds([13, 28]), "Coordinates past the board should be out of bounds")
+        self.assertEqual(True, game_map.in_arena_bounds([13.0, 0.0]), "Float coordinates should still be checked")
+
     def test_get_units_in_range(self):
         game = self.make_turn_0_map()
         self.assertEqual(1, len(game.game_map.get_locations_in_range([13,13], 0)), "We should be in 0 range of ourself")
         self.assertEqual(37, len(game.game_map.get_locations_in_range([13,13], 3)), "Wrong number of tiles in range")
 
+    def test_find_path_to_edge(self):
+        game = self.make_turn_0_map()
+        for x in range(4, 27):
+            game.game_map.add_unit("FF", [x, 12], 0)
+        game.game_map.add_unit("FF", [27, 13], 0)
+        expected_path = [[3, 10], [3, 11], [3, 12], [3, 13], [4, 13], [4, 14], [5, 14], [5, 15], [6, 15], [6, 16], [7, 16], [7, 17], [8, 17], [8, 18], [9, 18], [9, 19], [10, 19], [10, 20], [11, 20], [11, 21], [12, 21], [12, 22], [13, 22], [13, 23], [14, 23], [14, 24], [15, 24], [15, 25], [16, 25]]
+        self.assertEqual(expected_path, game.find_path_to_edge([3, 10]), "Path around the wall is wrong")
+        expected_path = [[24, 10], [24, 11], [23, 11], [22, 11], [21, 11], [20, 11], [19, 11], [18, 11], [17, 11], [16, 11], [15, 11], [14, 11], [13, 11], [12, 11], [11, 11], [10, 11], [9, 11], [8, 11], [7, 11], [6, 11], [5, 11], [4, 11], [3, 11], [3, 12], [2, 12], [2, 13], [1, 13], [1, 14], [0, 14]]
+        self.assertEqual(expected_path, game.find_path_to_edge([24, 10]), "Path along the wall is wrong")
+
+        # Seal the wall so units must self destruct, reusing the same pathfinder
+        for x in range(1, 4):
+            game.game_map.add_unit("FF", [x, 12], 0)
+        expected_path = [[20, 6], [20, 7], [19, 7], [19, 8], [18, 8], [18, 9], [17, 9], [17, 10], [16, 10], [16, 11], [15, 11], [14, 11], [13, 11], [12, 11], [11, 11], [10, 11], [9, 11], [8, 11], [7, 11], [6, 11], [5, 11], [4, 11], [3, 11], [2, 11]]
+        self.assertEqual(expected_path, game.find_path_to_edge([20, 6]), "Path to the best self destruct location is wrong")
+        self.assertEqual(None, game.find_path_to_edge([10, 12]), "Pathing from a blocked location should fail")
+
+        # A field that does not match the walls, with no step getting closer, falls back to a search instead of walking forever
+        finder = ShortestPathFinder()
+        end_points = game.game_map.get_edge_locations(game.get_target_edge([20, 6]))
+        stale_field = [5] * len(finder.get_edge_field(end_points, game))
+        with unittest.mock.patch.object(get_debug_log(), "stream", io.StringIO()):
+            self.assertEqual(game.find_path_to_edge([20, 6]), finder.navigate_multiple_endpoints([20, 6], end_points, game, stale_field))
+            get_debug_log().flush()
+
+        output = io.StringIO()
+        with unittest.mock.patch.object(get_debug_log(), "stream", output):
+            game._shortest_path_finder.print_map()
+            get_debug_log().flush()
+        rows = output.getvalue().splitlines()
+        self.assertEqual(28, len(rows), "print_map should print one line per row")
+        self.assertEqual(str(game._shortest_path_finder._get_pathlength([20, 6])), rows[27 - 6][60:63].strip())
+
+    def test_path_cache_follows_walls(self):
+        game = self.make_turn_0_map()
+        self.assertEqual([13, 1], game.find_path_to_edge([13, 0])[1], "Path should start by moving up")
+        game.attempt_spawn("FF", [13, 1])
+        self.assertEqual([14, 0], game.find_path_to_edge([13, 0])[1], "Path should go around the new filter")
+        game.game_map.remove_unit([13, 1])
+        self.assertEqual([13, 1], game.find_path_to_edge([13, 0])[1], "Path should use the removed filter's tile again")
+        game.game_map.add_unit("EI", [13, 1], 0)
+        self.assertEqual([13, 1], game.find_path_to_edge([13, 0])[1], "Information units should not block paths")
+
+    def test_find_paths_from_all_edges(self):
+        game = self.make_turn_0_map()
+        game.attempt_spawn("FF", [13, 0])
+        for x in range(1, 27):
+            game.game_map.add_unit("FF", [x, 12], 0)
+        paths = game.find_paths_from_all_edges(0)
+        self.assertEqual(25, len(paths), "Blocked edge locations should be skipped")
+        self.assertNotIn([13, 0], paths.starts, "Blocked edge locations should be skipped")
+        self.assertEqual(len(paths.path_x), paths.offsets[-1], "Offsets should cover every path tile")
+        for i, start in enumerate(paths.starts):
+            self.assertEqual(game.find_path_to_edge(start), paths.path(i), "Batched path differs for {}".format(start))
+        expected_edges = [-1] * 11 + [game.game_map.TOP_RIGHT] + [-1] * 12 + [game.game_map.TOP_LEFT]
+        self.assertEqual(expected_edges, paths.end_edges, "Only the corners outside the wall can reach their edge")
+
+    def test_fork(self):
+        for storage in ("lists", "columns") if np is not None else ("lists",):
+            game = self.make_turn_0_map(unit_storage=storage)
+            game.game_map.add_unit("DF", [12, 16], 1)
+            self.assertEqual([13, 1], game.find_path_to_edge([13, 0])[1])
+            damage = game.get_damage_map(0)[:]
+            cores = game.get_resource(game.CORES)
+
+            child = game.fork()
+            child.attempt_spawn("FF", [13, 1])
+            child.attempt_spawn("DF", [12, 13])
+            child.game_map.remove_unit([12, 16])
+            self.assertEqual([14, 0], child.find_path_to_edge([13, 0])[1], "The fork should path around its own filter")
+            self.assertEqual([], child.game_map[12, 16])
+            self.assertEqual([0] * len(damage), child.get_damage_map(0), "The fork removed the only enemy destructor")
+
+            self.assertEqual([13, 1], game.find_path_to_edge([13, 0])[1], "Forks should not change the parent's paths")
+            self.assertEqual([], game.game_map[13, 1])
+            self.assertEqual(1, len(game.game_map[12, 16]))
+            self.assertEqual(damage, game.get_damage_map(0))
+            self.assertEqual(cores, game.get_resource(game.CORES))
+            self.assertEqual([], game._build_stack)
+            self.assertEqual(2, len(child._build_stack))
+
+            grandchild = game.fork()
+            game.game_map.add_unit("EI", [13, 1], 0)
+            game.game_map.edit_tile([12, 16]).append(GameUnit("PI", game.config, 1, None, 12, 16))
+            self.assertEqual([], grandchild.game_map[13, 1], "Parent changes should not leak into forks")
+            self.assertEqual(1, len(grandchild.game_map[12, 16]), "Parent changes should not leak into forks")
+            self.assertEqual(["FF", "DF"], [child.game_map[13, 1][0].unit_type, child.game_map[12, 13][0].unit_type])
+
+        game = self.make_turn_0_map()
+        for x in range(4, 24):
+            game.game_map.add_unit("DF" if x % 3 else "FF", [x, 14 + x % 2], 1)
+        game.game_map.add_unit("PI", [13, 0], 0)
+        child = game.fork()
+        for location in child.game_map:
+            child.contains_stationary_unit(location)
+            child.get_attackers(location, 0)
+            for unit in child.game_map[location]:
+                child.get_target(unit)
+        child.score_paths(child.game_map.get_edge_locations(child.game_map.BOTTOM_LEFT), "PI")
+        child.get_damage_map(0)
+        tile_count = child.game_map.TILE_COUNT
+        self.assertEqual(tile_count, sum(child.game_map._GameMap__shared), "Reading a fork should not copy its tiles")
+        self.assertEqual(tile_count, sum(game.game_map._GameMap__shared))
+
+    def test_checkpoint_rollback(self):
+        for storage in ("lists", "columns") if np is not None else ("lists",):
+            game = self.make_turn_0_map(unit_storage=storage)
+            rng = random.Random(14)
+            locations = [location for location in game.game_map if location[1] < 14]
+            game.game_map.add_unit("DF", [12, 16], 1)
+            game.attempt_spawn("EF", [5, 10])
+
+            def describe():
+                units = [(unit.unit_type, unit.player_index, unit.x, unit.y, unit.health) for location in game.game_map for unit in game.game_map[location]]
+                return (units, game.get_resource(game.CORES), game.get_resource(game.BITS), game._build_stack[:], game._deploy_stack[:],
+                    game.find_path_to_edge([13, 0]), game.get_damage_map(0)[:], game.get_shield_map(0)[:])
+
+            expected = [describe()]
+            tokens = [game.checkpoint()]
+            for depth in range(3):
+                for _ in range(4):
+                    location = rng.choice(locations)
+                    action = rng.random()
+                    if action < 0.4:
+                        game.attempt_spawn(rng.choice(["FF", "EF", "DF"]), location)
+                    elif action < 0.6:
+                        game.attempt_spawn("PI", [13, 0], 2)
+                    elif action < 0.8:
+                        game.attempt_remove(location)
+                        game.game_map.remove_unit(location)
+                    else:
+                        game.game_map[tuple(location)] = [GameUnit("FF", game.config, 0, None, location[0], location[1])]
+                game.find_path_to_edge([13, 0])
+                game.get_damage_map(0)
+                expected.append(describe())
+                tokens.append(game.checkpoint())
+            game.attempt_spawn("DF", [13, 1])
+
+            for depth in reversed(range(len(tokens))):
+                self.assertTrue(game.rollback(tokens[depth]))
+                self.assertEqual(expected[depth], describe(), "Rollback to depth {} did not restore the state".format(depth))
+            self.assertIsNone(game.game_map._undo_log, "Rolling back to the oldest checkpoint should free the undo log")
+            game.suppress_warnings(True)
+            self.assertFalse(game.rollback(tokens[-1]), "Tokens rolled back past should be refused")
+
+            before = describe()
+            outer = game.checkpoint()
+            game.game_map.add_unit("FF", [13, 1], 0)
+            inner = game.checkpoint()
+            self.assertTrue(game.rollback(outer, keep=True))
+            game.game_map.add_unit("FF", [10, 5], 0)
+            game.game_map.add_unit("FF", [11, 5], 0)
+            after = describe()
+            self.assertFalse(game.rollback(inner), "Tokens rolled back past should stay refused once the changes outgrow them")
+            self.assertEqual(after, describe(), "A refused rollback should leave the state alone")
+            self.assertTrue(game.rollback(outer), "A kept checkpoint can be rolled back to again")
+            self.assertEqual(before, describe())
+            self.assertFalse(game.rollback(outer), "Rolling back releases the checkpoint by default")
+            self.assertIsNone(game.game_map._undo_log, "Changes should stop being recorded once no checkpoint is left")
+
+            token = game.checkpoint()
+            game.game_map.add_unit("FF", [13, 1], 0)
+            kept = describe()
+            self.assertTrue(game.release(token))
+            self.assertIsNone(game.game_map._undo_log)
+            self.assertFalse(game.rollback(token))
+            self.assertEqual(kept, describe())
+            game.game_map.remove_unit([13, 1])
+
+            # Walls the map can not vouch for, as if a rollback had gone wrong, never revive cached fields
+            token = game.checkpoint()
+            game.game_map.add_unit("FF", [13, 1], 0)
+            game.find_path_to_edge([13, 0])
+            game.game_map.firewall_hash ^= 1
+            self.assertTrue(game.rollback(token))
+            self.assertEqual({}, game._edge_fields)
+            game.game_map.firewall_hash ^= 1
+            self.assertEqual(before, describe())
+
+            token = game.checkpoint()
+            game.game_map.add_unit("PI", [13, 0], 0)
+            units_at_start = len(game.game_map[13, 0])
+            child = game.fork()
+            self.assertTrue(game.rollback(token))
+            self.assertEqual(units_at_start - 1, len(game.game_map[13, 0]))
+            self.assertEqual(units_at_start, len(child.game_map[13, 0]), "Rolling back should not change a fork made after the checkpoint")
+
+    def test_zobrist_hash(self):
+        for storage in ("lists", "columns") if np is not None else ("lists",):
+            game = self.make_turn_0_map(unit_storage=storage)
+            game_map = game.game_map
+            empty_hash = game_map.zobrist_hash
+            rng = random.Random(15)
+            locations = list(game_map)
+            token = game.checkpoint()
+            for step in range(200):
+                location = rng.choice(locations)
+                action = rng.random()
+                if action < 0.5:
+                    game_map.add_unit(rng.choice(["FF", "EF", "DF", "PI", "PI", "SI"]), location, rng.randint(0, 1))
+                elif action < 0.8:
+                    game_map.remove_unit(location)
+                else:
+                    game_map[tuple(location)] = [GameUnit("DF", game.config, 1, None, location[0], location[1])]
+                incremental = (game_map.zobrist_hash, game_map.firewall_hash)
+                self.assertEqual(incremental[0], game_map.rehash(), "Incremental hash drifted at step {}".format(step))
+                self.assertEqual(incremental[1], game_map.firewall_hash)
+
+            other = self.make_turn_0_map(unit_storage=storage)
+            for location in reversed(locations):
+                for unit in game_map[location]:
+                    other.game_map.add_unit(unit.unit_type, location, unit.player_index)
+            self.assertEqual(game_map.zobrist_hash, other.game_map.zobrist_hash, "Equal boards should hash equal")
+            self.assertEqual(game_map.firewall_hash, other.game_map.firewall_hash)
+            other.game_map.add_unit("PI", [13, 0], 0)
+            self.assertNotEqual(game_map.zobrist_hash, other.game_map.zobrist_hash, "An extra unit should change the hash")
+            self.assertEqual(game_map.firewall_hash, other.game_map.firewall_hash, "Information units are not walls")
+
+            game.rollback(token)
+            self.assertEqual(empty_hash, game_map.zobrist_hash, "Rollback should restore the hash")
+
+    def test_edge_field_repair(self):
+        game = self.make_turn_0_map()
+        locations = [location for location in game.game_map]
+        rng = random.Random(4)
+        for edge in range(4):
+            end_points = game.game_map.get_edge_locations(edge)
+            game._get_edge_field(edge, end_points)
+            for _ in range(60):
+                for location in rng.sample(locations, rng.randint(1, 3)):
+                    if game.contains_stationary_unit(location):
+                        game.game_map.remove_unit(location)
+                    else:
+                        game.game_map.add_unit("FF", location, 0)
+                repaired = game._get_edge_field(edge, end_points)
+                recomputed = game._shortest_path_finder.get_edge_field(end_points, game)
+                self.assertEqual(recomputed, repaired, "Repaired edge field differs from a full recompute")
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_numpy_pathing_backend(self):
+        game = self.make_turn_0_map()
+        locations = [location for location in game.game_map]
+        rng = random.Random(5)
+        python_finder = ShortestPathFinder()
+        numpy_finder = NumpyShortestPathFinder()
+        for num_firewalls in (0, 50, 150, 250):
+            for location in locations:
+                game.game_map.remove_unit(location)
+            for location in rng.sample(locations, num_firewalls):
+                game.game_map.add_unit("DF", location, 0)
+            for edge in range(4):
+                end_points = game.game_map.get_edge_locations(edge)
+                self.assertEqual(python_finder.get_edge_field(end_points, game), numpy_finder.get_edge_field(end_points, game), "Edge fields differ between backends")
+                for start in rng.sample(locations, 10):
+                    self.assertEqual(python_finder.navigate_multiple_endpoints(start, end_points, game), numpy_finder.navigate_multiple_endpoints(start, end_points, game), "Paths differ between backends")
+
+    def test_range_stencils_match_search(self):
+        game = self.make_turn_0_map()
+        game_map = game.game_map
+        for radius in (0, 1.5, 3, 3.5, 4.5, 5):
+            search_radius = math.ceil(radius)
+            for x, y in list(game_map) + [[-2, 13], [30, 30]]:
+                expected = []
+                for i in range(x - search_radius, x + search_radius + 1):
+                    for j in range(y - search_radius, y + search_radius + 1):
+                        if game_map.in_arena_bounds([i, j]) and game_map.distance_between_locations([x, y], [i, j]) < radius + 0.51:
+                            expected.append([i, j])
+                self.assertEqual(expected, game_map.get_locations_in_range([x, y], radius), "Wrong tiles in range {} of {}".format(radius, [x, y]))
+
+    def test_threat_maps_follow_board(self):
+        game = self.make_turn_0_map()
+        game_map = game.game_map
+        rng = random.Random(9)
+        locations = list(game_map)
+        damage = game.config["unitInformation"][2]["damage"]
+        shield_amount = game.config["unitInformation"][1]["shieldAmount"]
+        shield_range = game.config["unitInformation"][1]["range"]
+        for step in range(40):
+            for _ in range(rng.randint(1, 12)):
+                location = rng.choice(locations)
+                if rng.random() < 0.3:
+                    game_map.remove_unit(location)
+                else:
+                    game_map.add_unit(rng.choice(["FF", "EF", "DF"]), location, rng.randint(0, 1))
+            if step % 10 == 9:
+                game_map.walls_version += 1
+            for player_index in (0, 1):
+                damage_map = game.get_damage_map(player_index)
+                shield_map = game.get_shield_map(player_index)
+                for location in locations:
+                    tile_id = game_map.get_tile_id(location)
+                    self.assertEqual(len(game.get_attackers(location, player_index)) * damage, damage_map[tile_id], "Wrong damage at {}".format(location))
+                    encryptors = sum(1 for near in game_map.get_locations_in_range(location, shield_range)
+                        for unit in game_map[near] if unit.unit_type == "EF" and unit.player_index == player_index)
+                    self.assertEqual(encryptors * shield_amount, shield_map[tile_id], "Wrong shield at {}".format(location))
+
+    def test_score_paths(self):
+        game = self.make_turn_0_map()
+        game_map = game.game_map
+        for location in ([10, 17], [12, 18], [16, 16]):
+            game_map.add_unit("DF", location, 1)
+        for location in ([5, 10], [6, 10], [22, 11]):
+            game_map.add_unit("EF", location, 0)
+        game_map.add_unit("EF", [20, 16], 1)
+        damage = game.config["unitInformation"][2]["damage"]
+        shield_amount = game.config["unitInformation"][1]["shieldAmount"]
+        shield_range = game.config["unitInformation"][1]["range"]
+
+        starts = [[13, 0], [5, 8], [20, 6], [24, 10]]
+        for unit_type, frames_per_tile in (("PI", 2), ("SI", 4)):
+            scores = game.score_paths(starts, unit_type)
+            for start, score in zip(starts, scores):
+                path = game.find_path_to_edge(start)
+                self.assertEqual(path, score["path"])
+                attackers = [len(game.get_attackers(location, 0)) for location in path]
+                self.assertEqual(sum(attackers) * damage * frames_per_tile, score["damage"], "Wrong damage from {}".format(start))
+                self.assertEqual(sum(1 for count in attackers if count) * frames_per_tile, score["frames_in_range"])
+                encryptors = set()
+                for location in path:
+                    for near in game_map.get_locations_in_range(location, shield_range):
+                        if any(unit.unit_type == "EF" and unit.player_index == 0 for unit in game_map[near]):
+                            encryptors.add(tuple(near))
+                self.assertEqual(len(encryptors) * shield_amount, score["shield"], "Wrong shield from {}".format(start))
+        self.assertGreater(max(score["damage"] for score in scores), 0, "No path went through destructor range")
+        self.assertGreater(max(score["shield"] for score in scores), 0, "No path was shielded")
+
+        game_map.add_unit("FF", [13, 0], 0)
+        self.assertIsNone(game.score_paths([[13, 0]], "PI")[0])
+
+    def test_simulator(self):
+        for storage in ("lists", "columns") if np is not None else ("lists",):
+            game = self.make_turn_0_map(unit_storage=storage)
+            game.attempt_spawn("PI", [13, 0], 3)
+            path = game.find_path_to_edge([13, 0])
+            result = simulate(game)
+            self.assertEqual(3, len(result.breaches))
+            self.assertEqual(27, result.enemy_health)
+            self.assertEqual(30, result.my_health)
+            self.assertEqual(3, result.resources[0]["cores"])
+            self.assertEqual(2 * len(path), result.frames, "Pings move a tile every 2 frames")
+            self.assertEqual(3, len(game.game_map[13, 0]), "Simulating should not change the game state")
+            self.assertEqual([[13, 0, 15]] * 3, [[unit.x, unit.y, unit.health] for unit in game.game_map[13, 0]])
+            stop = threading.Event()
+            stopped = Simulator(game.config).simulate(game, frame_callback=lambda frame, state: frame == 3 and stop.set(), stop=stop)
+            self.assertTrue(stopped.stopped)
+            self.assertEqual(3, stopped.frames, "The simulation should stop before the frame after stop is set")
+            self.assertFalse(result.stopped)
+            self.assertEqual(30, game.enemy_health)
+
+            game = self.make_turn_0_map(unit_storage=storage)
+            result = simulate(game, enemy_deploys=[["SI", 13, 27]])
+            self.assertEqual(4 * len(game.find_path_to_edge([13, 27])), result.frames, "Scramblers move a tile every 4 frames")
+            self.assertEqual(29, result.my_health)
+
+            # Destructors kill pings, more slowly when an encryptor shields them
+            healths = []
+            for encryptor in (None, [12, 2]):
+                game = self.make_turn_0_map(unit_storage=storage)
+                game.game_map.add_unit("DF", [24, 12], 1)
+                if encryptor:
+                    game.game_map.add_unit("EF", encryptor, 0)
+                game.attempt_spawn("PI", [13, 0])
+                result = simulate(game)
+                self.assertEqual([], result.breaches)
+                self.assertEqual(["PI"], [unit.unit_type for unit in result.destroyed])
+                healths.append(result.game_state.game_map[24, 12][0].health)
+                self.assertEqual(75, game.game_map[24, 12][0].health, "Simulating should not change the game state")
+            self.assertLess(healths[1], healths[0], "The shielded ping should have lived longer")
+
+            # A ping that can not reach its edge self destructs into the wall
+            game = self.make_turn_0_map(unit_storage=storage)
+            for x in range(28):
+                game.game_map.add_unit("FF", [x, 14], 1)
+            game.attempt_spawn("PI", [13, 0])
+            result = simulate(game)
+            self.assertEqual([], result.breaches)
+            self.assertEqual(1, len(result.self_destructs))
+            x, y, player_index = result.self_destructs[0]
+            self.assertEqual(0, player_index)
+            damaged = [location for location in result.game_state.game_map.get_locations_in_range([x, y], 1.5)
+                if result.game_state.contains_stationary_unit(location)]
+            self.assertTrue(damaged)
+            for location in damaged:
+                # The ping also shot at the wall on its way
+                self.assertLessEqual(result.game_state.game_map[location][0].health, 60 - 15)
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_batch_simulator(self):
+        plans = [[["PI", 13, 0]] * 3, [], [["SI", 5, 8], ["PI", 13, 0]], [["EI", 20, 6]] * 2]
+        for board in ("empty", "destructor", "shielded destructor", "wall"):
+            def make_game():
+                game = self.make_turn_0_map()
+                if "destructor" in board:
+                    game.game_map.add_unit("DF", [24, 12], 1)
+                if "shielded" in board:
+                    game.game_map.add_unit("EF", [12, 2], 0)
+                if board == "wall":
+                    for x in range(28):
+                        game.game_map.add_unit("FF", [x, 14], 1)
+                return game
+
+            game = make_game()
+            hash_before = game.game_map.zobrist_hash
+            batch = BatchSimulator(game.config).simulate(game, plans)
+            self.assertEqual(hash_before, game.game_map.zobrist_hash, "The board should be read-only")
+            for index, plan in enumerate(plans):
+                single = simulate(make_game(), deploys=plan)
+                expected = [30 - single.enemy_health, len(single.breaches), len(single.self_destructs),
+                    sum(1 for unit in single.destroyed if not unit.stationary), single.frames]
+                actual = [batch.damage[index], batch.breaches[index], batch.self_destructs[index], batch.units_lost[index], batch.frames[index]]
+                self.assertEqual(expected, actual, "Plan {} on the {} board".format(index, board))
+            if board == "wall":
+                self.assertTrue((batch.firewall_damage[[0, 2, 3]] > 0).all(), "Self destructs should damage the wall")
+        self.assertEqual(0, len(BatchSimulator(game.config).simulate(game, []).damage))
+
+    def test_replay_validation(self):
+        game = self.make_turn_0_map()
+        path = game.find_path_to_edge([13, 0])
+        empty_units = [[] for _ in range(7)]
+
+        def frame(turn_info, enemy_health, ping_location=None, spawn=()):
+            p1_units = [list(units) for units in empty_units]
+            if ping_location:
+                p1_units[3].append([ping_location[0], ping_location[1], 15.0, "1"])
+            return {"turnInfo": turn_info, "p1Stats": [30.0, 25.0, 5.0, 0], "p2Stats": [enemy_health, 25.0, 5.0, 0],
+                "p1Units": p1_units, "p2Units": empty_units, "events": {"spawn": list(spawn)}}
+
+        def write_replay(directory, name, final_enemy_health):
+            lines = [game.config, frame([0, 0, -1], 30.0)]
+            lines.append(frame([1, 0, 0], 30.0, [13, 0], spawn=[[[13, 0], 3, "1", 1]]))
+            for frame_number in range(1, 2 * len(path)):
+                lines.append(frame([1, 0, frame_number], 30.0, path[frame_number // 2]))
+            lines.append(frame([1, 0, 2 * len(path)], final_enemy_health))
+            replay_path = os.path.join(directory, name)
+            with open(replay_path, "w") as replay_file:
+                replay_file.write("\n".join(json.dumps(line) for line in lines))
+            return replay_path
+
+        with tempfile.TemporaryDirectory() as directory:
+            exact = write_replay(directory, "exact.replay", 29.0)
+            wrong = write_replay(directory, "wrong.replay", 30.0)
+            (exact_path, exact_reports), (wrong_path, wrong_reports) = validate_replays([exact, wrong], processes=2)
+
+        self.assertEqual([exact, wrong], [exact_path, wrong_path])
+        self.assertEqual([0], [report["turn"] for report in exact_reports])
+        self.assertEqual(2 * len(path) + 1, exact_reports[0]["frames"])
+        self.assertEqual(0, exact_reports[0]["diverged"], "The simulator should reproduce a lone ping")
+        self.assertIsNone(exact_reports[0]["first_divergence"])
+        self.assertEqual(1, wrong_reports[0]["diverged"])
+        self.assertEqual(2 * len(path), wrong_reports[0]["first_divergence"])
+        self.assertEqual([0, -1], wrong_reports[0]["health_error"])
+
+    def test_offline_engine(self):
+        game = self.make_turn_0_map()
+        empty_units = [[] for _ in range(7)]
+
+        def frame(turn_info):
+            return {"turnInfo": turn_info, "p1Stats": [30.0, 25.0, 5.0, 0], "p2Stats": [30.0, 25.0, 5.0, 0],
+                "p1Units": empty_units, "p2Units": empty_units, "events": {"spawn": []}}
+
+        algo_source = """
+import sys
+sys.path.insert(0, {!r})
+import gamelib
+
+class Algo(gamelib.AlgoCore):
+    def on_turn(self, turn_state):
+        game_state = gamelib.GameState(self.config, turn_state)
+        game_state.attempt_spawn("FF", [13, game_state.turn_number])
+        game_state.submit_turn()
+
+Algo().start()
+""".format(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        with tempfile.TemporaryDirectory() as directory:
+            replay_path = os.path.join(directory, "game.replay")
+            with open(replay_path, "w") as replay_file:
+                lines = [game.config, frame([0, 0, -1]), frame([1, 0, 0]), frame([1, 0, 1]), frame([0, 1, -1]), frame([1, 1, 0])]
+                replay_file.write("\n".join(json.dumps(line) for line in lines))
+            algo_path = os.path.join(directory, "algo_strategy.py")
+            with open(algo_path, "w") as algo_file:
+                algo_file.write(algo_source)
+            result = OfflineEngine(replay_path, algo_command(algo_path), timeout=20, stderr=subprocess.DEVNULL).run()
+            crashed = OfflineEngine(replay_path, [sys.executable, "-c", "input()"], timeout=20).run()
+
+        self.assertIsNone(result["error"])
+        self.assertEqual(0, result["exit_code"], "The algo should exit at the end message")
+        self.assertEqual([0, 1], [turn["turn"] for turn in result["turns"]])
+        self.assertEqual([[["FF", 13, 0]], [["FF", 13, 1]]], [turn["build"] for turn in result["turns"]])
+        self.assertEqual([[], []], [turn["deploy"] for turn in result["turns"]])
+        self.assertTrue(all(turn["seconds"] > 0 for turn in result["turns"]))
+        self.assertEqual([], crashed["turns"])
+        self.assertIn("turn 0", crashed["error"])
+
+    def test_simulator_matches_replays(self):
+        """Compares simulated action phases with the ones in the replays of GAMELIB_REPLAY_DIR"""
+        replay_dir = os.environ.get("GAMELIB_REPLAY_DIR")
+        replays = sorted(glob.glob(os.path.join(replay_dir, "*.replay"))) if replay_dir else []
+        if not replays:
+            self.skipTest("Set GAMELIB_REPLAY_DIR to a directory of .replay files")
+
+        reports = [report for _, replay_reports in validate_replays(replays) for report in replay_reports]
+        matches = sum(1 for report in reports if not any(report["health_error"]))
+        self.assertGreaterEqual(matches, 0.8 * len(reports), "Only {} of {} simulated turns ended with the right health".format(matches, len(reports)))
+
+    def test_anytime_search(self):
+        deadline = Deadline(10)
+        self.assertFalse(deadline.expired())
+        self.assertAlmostEqual(10, deadline.remaining(), 0)
+        self.assertTrue(Deadline(1, start=time.perf_counter() - 2).expired())
+
+        search = AnytimeSearch(Deadline(10))
+        search.add_generator(lambda: range(10))
+        search.add_generator(lambda: [-5, 25])
+        search.add_evaluator(lambda candidate: -abs(candidate - 20))
+        search.add_evaluator(lambda candidate: candidate % 2, weight=0.5)
+        self.assertEqual(25, search.run(), "Every candidate should have been evaluated")
+        self.assertEqual(12, search.evaluated)
+        self.assertEqual(-4.5, search.best_score)
+
+        def endless():
+            number = 0
+            while True:
+                number += 1
+                yield number
+        search = AnytimeSearch(Deadline(0.05))
+        search.add_generator(endless)
+        search.add_evaluator(lambda candidate: candidate)
+        started = time.perf_counter()
+        best = search.run()
+        self.assertLess(time.perf_counter() - started, 0.5, "The search should stop at the deadline")
+        self.assertEqual(search.evaluated, best)
+
+    def test_algocore_deadline(self):
+        game = self.make_turn_0_map()
+        algo = AlgoCore()
+        algo.on_game_start(game.config)
+        soft_limit = game.config["timingAndReplay"]["waitTimeBotSoft"] / 1000
+        received = time.perf_counter()
+        self.assertEqual(soft_limit - algo.safety_margin, algo.turn_deadline(received, 0).seconds)
+        # The engine counted 1.5 seconds for a turn we measured at 0.5
+        algo._last_turn_seconds = 0.5
+        self.assertAlmostEqual(soft_limit - algo.safety_margin - 1, algo.turn_deadline(received, 1500).seconds)
+
+        algo.deadline = Deadline(0.05)
+        search = algo.new_search()
+        search.add_generator(lambda: [[13, 0], [14, 0], [13, 13]])
+        search.add_evaluator(lambda location: -game.find_path_to_edge(location)[-1][1] if game.can_spawn("PI", location) else float("-inf"))
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            best = algo.search_turn(game, search, lambda game_state, location: game_state.attempt_spawn("PI", location))
+        self.assertIn(best, ([13, 0], [14, 0]))
+        self.assertEqual([[], [["PI"] + best]], [json.loads(line) for line in output.getvalue().splitlines()])
+
+    def test_background_precompute(self):
+        game = self.make_turn_0_map()
+        empty_units = [[] for _ in range(7)]
+
+        def frame(turn_info, units=empty_units):
+            return json.dumps({"turnInfo": turn_info, "p1Stats": [30.0, 25.0, 5.0, 0], "p2Stats": [30.0, 25.0, 5.0, 0],
+                "p1Units": units, "p2Units": empty_units, "events": {"spawn": []}})
+
+        pings = [list(units) for units in empty_units]
+        pings[3] = [[13, 0, 15.0, "1"], [13, 0, 15.0, "2"]]
+        messages = [json.dumps(game.config), frame([0, 0, -1]), frame([1, 0, 0], pings), frame([1, 0, 1], pings),
+            frame([0, 1, -1]), frame([2, 1, -1])]
+
+        class Algo(AlgoCore):
+            def __init__(self):
+                super().__init__()
+                self.background_precompute = True
+                self.seen = []
+
+            def on_action_frame(self, action_frame):
+                # The engine streams the frames of an action phase for a while, here the next turn comes right away
+                if self._precompute_thread is not None:
+                    self._precompute_thread.join(10)
+
+            def on_turn(self, turn_state):
+                self.seen.append(self.precomputed)
+                GameState(self.config, turn_state).submit_turn()
+
+        algo = Algo()
+        output = io.StringIO()
+        with unittest.mock.patch("sys.stdin", io.StringIO("\n".join(messages) + "\n")), contextlib.redirect_stdout(output), \
+                contextlib.redirect_stderr(io.StringIO()):
+            algo.start()
+        self.assertEqual(4, len(output.getvalue().splitlines()), "Both turns should have been submitted")
+        self.assertIsNone(algo.seen[0], "Nothing was precomputed before the first turn")
+        predicted = algo.seen[1]
+        self.assertEqual(28, predicted.enemy_health, "The predicted board should have the pings scored")
+        self.assertEqual([], predicted.game_map.get_units())
+        self.assertIsNone(algo._precompute_thread)
+
+        class SlowAlgo(AlgoCore):
+            def __init__(self):
+                super().__init__()
+                self.background_precompute = True
+                self.seen = []
+                self.waited = []
+
+            def precompute_next_turn(self, action_frame_game_state, stop):
+                time.sleep(1)
+                return "too late"
+
+            def on_turn(self, turn_state):
+                self.waited.append(time.perf_counter() - self.deadline.start)
+                self.seen.append(self.precomputed)
+                GameState(self.config, turn_state).submit_turn()
+
+        algo = SlowAlgo()
+        with unittest.mock.patch("sys.stdin", io.StringIO("\n".join(messages) + "\n")), contextlib.redirect_stdout(io.StringIO()), \
+                contextlib.redirect_stderr(io.StringIO()), unittest.mock.patch.object(get_debug_log(), "stream", io.StringIO()):
+            algo.start()
+        self.assertEqual([None, None], algo.seen, "A precomputation that does not stop in time should be thrown away")
+        self.assertLess(algo.waited[1], 0.5, "The turn should not wait for a precomputation that ignores stop")
+
+    def test_action_frame_parsing(self):
+        frame = {"p2Units": [[[14, 14, 60.0, "3"]], [], [], [], [], [], []], "turnInfo": [1, 4, 12], "p1Stats": [30.0, 5.0, 2.0, 1432],
+            "p1Units": [[], [], [], [[13, 1, 15.0, "7"]], [], [], []], "p2Stats": [29.0, 3.0, 1.0, 200],
+            "events": {"breach": [[[13, 27], 1.0, 3, "7", 1]], "spawn": []}}
+        message = json.dumps(frame)
+        self.assertEqual(1, get_state_type(message))
+        self.assertEqual(0, get_state_type('{"turnInfo": [0, 1, -1]}'))
+        self.assertIsNone(get_state_type('{"replaySave": 0}'))
+        self.assertEqual({"turnInfo": frame["turnInfo"], "events": frame["events"]}, parse_fields(message, "turnInfo", "events"))
+        self.assertEqual({"p1Stats": frame["p1Stats"]}, parse_fields(message, "p1Stats", "missing"))
+
+        class Algo(AlgoCore):
+            def __init__(self, action_frame_format):
+                super().__init__()
+                self.action_frame_format = action_frame_format
+                self.frames = []
+
+            def on_action_frame(self, action_frame):
+                self.frames.append(action_frame)
+
+        expected = {"string": message + "\n", "dict": frame, "events": {"turnInfo": frame["turnInfo"], "events": frame["events"]}}
+        for action_frame_format, parsed in expected.items():
+            algo = Algo(action_frame_format)
+            messages = [json.dumps(self.make_turn_0_map().config), message, json.dumps({"turnInfo": [2, 4, -1]})]
+            with unittest.mock.patch("sys.stdin", io.StringIO("\n".join(messages) + "\n")), contextlib.redirect_stderr(io.StringIO()):
+                algo.start()
+            self.assertEqual([parsed], algo.frames, "Wrong {} frame".format(action_frame_format))
+
+    def test_profiling(self):
+        game = self.make_turn_0_map()
+        empty_units = [[] for _ in range(7)]
+
+        def frame(turn_info, time_spent=0):
+            return json.dumps({"turnInfo": turn_info, "p1Stats": [30.0, 25.0, 5.0, time_spent], "p2Stats": [30.0, 25.0, 5.0, 0],
+                "p1Units": empty_units, "p2Units": empty_units, "events": {"spawn": []}})
+
+        messages = [json.dumps(game.config), frame([0, 0, -1]), frame([1, 0, 0]), frame([1, 0, 1]), frame([0, 1, -1], 120), frame([2, 1, -1])]
+
+        class Algo(AlgoCore):
+            def on_turn(self, turn_state):
+                game_state = GameState(self.config, turn_state)
+                game_state.find_path_to_edge([13, 0])
+                game_state.attempt_spawn("PI", [[13, 0], [14, 0]])
+                game_state.submit_turn()
+
+        original = GameState.find_path_to_edge
+        with tempfile.TemporaryDirectory() as directory:
+            algo = Algo()
+            algo.profile = True
+            algo.profile_path = os.path.join(directory, "profile.json")
+            log = io.StringIO()
+            with unittest.mock.patch("sys.stdin", io.StringIO("\n".join(messages) + "\n")), contextlib.redirect_stdout(io.StringIO()), \
+                    unittest.mock.patch.object(get_debug_log(), "stream", log):
+                algo.start()
+            with open(algo.profile_path) as profile_file:
+                profile = json.load(profile_file)
+        self.assertIs(original, GameState.find_path_to_edge, "The profiled methods should be restored at the end of the game")
+        self.assertNotIn("on_turn", vars(algo))
+        self.assertEqual([0, 1], [turn["turn"] for turn in profile["turns"]])
+        self.assertEqual(120, profile["turns"][0]["engine_ms"])
+        calls = profile["turns"][0]["calls"]
+        self.assertEqual(1, calls["Algo.on_turn"]["calls"])
+        self.assertEqual(2, calls["Algo.on_action_frame"]["calls"])
+        self.assertEqual(1, calls["GameState.__parse_state"]["calls"])
+        self.assertEqual(1, calls["GameState.find_path_to_edge"]["calls"])
+        self.assertEqual(1, calls["GameState.attempt_spawn"]["calls"])
+        self.assertGreaterEqual(calls["Algo.on_turn"]["ms"], calls["GameState.find_path_to_edge"]["ms"])
+        self.assertEqual(2, profile["totals"]["Algo.on_turn"]["calls"])
+        self.assertIn("GameState.find_path_to_edge", log.getvalue())
+
+    def test_json_codecs(self):
+        game = self.make_turn_0_map()
+        game.game_map.add_unit("DF", [3, 12], 1)
+        game.attempt_spawn("FF", [13, 2])
+        game.attempt_spawn("PI", [13, 0], 2)
+        message = json.dumps({"turnInfo": [1, 3, 7], "p1Stats": [29.0, 1.5, 3.25, 1432], "p2Units": [[[3, 12, 75.0, "12"]]],
+            "events": {"breach": [[[13, 27], 1.0, 3, "7", 1]], "spawn": []}})
+        default_codec = get_json_codec()
+        try:
+            for codec in JSON_CODECS:
+                self.assertEqual(codec, set_json_codec(codec))
+                self.assertEqual(json.loads(message), json_loads(message), "{} parsed differently".format(codec))
+                self.assertEqual(json.loads(message), json_loads(json_dumps(json.loads(message))))
+                output = io.StringIO()
+                with contextlib.redirect_stdout(output):
+                    game.submit_turn()
+                self.assertEqual([[["FF", 13, 2]], [["PI", 13, 0]] * 2], [json.loads(line) for line in output.getvalue().splitlines()])
+            with contextlib.redirect_stderr(io.StringIO()):
+                self.assertEqual(next(iter(JSON_CODECS)), set_json_codec("no such codec"))
+        finally:
+            set_json_codec(default_codec)
+
+    def test_memo_shared_between_threads(self):
+        memo = Memo(8)
+        errors = []
+
+        def hammer(offset):
+            try:
+                for index in range(20000):
+                    memo.put((index + offset) % 16, index)
+                    memo.get((index * 7 + offset) % 16)
+            except Exception as error:
+                errors.append(error)
+        threads = [threading.Thread(target=hammer, args=(offset,)) for offset in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([], errors)
+        self.assertEqual(8, sum(1 for key in range(16) if key in memo), "The memo should keep max_size entries")
+
+    def test_debug_log(self):
+        class Unprintable:
+            def __format__(self, spec):
+                raise AssertionError("Ignored messages should not be formatted")
+
+        stream = io.StringIO()
+        log = DebugLog(mode="turn", max_bytes_per_turn=40, stream=stream)
+        log.log(INFO, "Turn {} at {}", 3, [13, 0])
+        log.log(DEBUG, "Ignored {}", Unprintable())
+        self.assertEqual("", stream.getvalue(), "Turn mode should wait for the turn to end")
+        log.flush()
+        self.assertEqual("Turn 3 at [13, 0]\n", stream.getvalue())
+
+        for index in range(5):
+            log.log(WARNING, "Message number {}", index)
+        log.flush()
+        self.assertEqual(["Turn 3 at [13, 0]", "Message number 0"], stream.getvalue().splitlines(), "Only 40 bytes per turn")
+        self.assertEqual(4, log.dropped)
+        log.log(WARNING, "Over the limit")
+        self.assertEqual(5, log.dropped)
+        log.new_turn()
+        self.assertEqual(0, log.dropped)
+        self.assertIn("Dropped 5 debug messages", stream.getvalue().splitlines()[-1])
+
+        stream = io.StringIO()
+        log = DebugLog(mode="turn", buffer_size=2, stream=stream)
+        for index in range(3):
+            log.log(INFO, "{}", index)
+        log.flush()
+        self.assertEqual(["1", "2"], stream.getvalue().splitlines(), "A full buffer drops the oldest messages")
+        self.assertEqual(1, log.dropped)
+
+        stream = io.StringIO()
+        log = DebugLog(interval=0.01, stream=stream)
+        log.log(INFO, "From the thread")
+        for _ in range(100):
+            if stream.getvalue():
+                break
+            time.sleep(0.01)
+        self.assertEqual("From the thread\n", stream.getvalue())
+
+        class SlowPipe(io.StringIO):
+            def __init__(self):
+                super().__init__()
+                self.writing = threading.Event()
+                self.release = threading.Event()
+
+            def write(self, text):
+                self.writing.set()
+                self.release.wait(5)
+                return super().write(text)
+
+        stream = SlowPipe()
+        log = DebugLog(interval=0.01, max_bytes_per_turn=20, stream=stream)
+        try:
+            log.log(INFO, "Stuck in the pipe")
+            self.assertTrue(stream.writing.wait(5))
+            started = time.perf_counter()
+            log.log(INFO, "Over the limit of the first turn")
+            log.new_turn()
+            log.log(INFO, "Second turn")
+            self.assertLess(time.perf_counter() - started, 1, "A blocked stream should not hold up the turn")
+        finally:
+            stream.release.set()
+        for _ in range(100):
+            if "Second turn" in stream.getvalue():
+                break
+            time.sleep(0.01)
+        self.assertEqual(["Stuck in the pipe", "Dropped 1 debug messages last turn, over the buffer size or 20 bytes", "Second turn"],
+            stream.getvalue().splitlines())
+
+        shared_log = get_debug_log()
+        mode, stream = shared_log.mode, shared_log.stream
+        shared_log.flush()
+        try:
+            shared_log.mode = "sync"
+            shared_log.stream = io.StringIO()
+            debug_write("Location", [1, 2], "{braces}")
+            self.assertEqual("Location, [1, 2], {braces}\n", shared_log.stream.getvalue())
+            shared_log.mode = "turn"
+            changing = [1]
+            debug_write(changing)
+            changing.append(2)
+            shared_log.flush()
+            self.assertTrue(shared_log.stream.getvalue().endswith("\n[1]\n"), "debug_write should print its arguments as they were when called")
+        finally:
+            shared_log.mode, shared_log.stream = mode, stream
+
     def _test_get_attackers(self):
         game = self.make_turn_0_map()
         
@@ -204,6 +1052,88 @@ class BasicTests(unittest.TestCase):
         expected_string = "Enemy FF, health: 60.0 location: [14, 13] "
         self.assertEqual(got_string, expected_string, "Expected {} from print_unit test got {} ".format(expected_string, got_string))
 
+    def test_units_share_type_stats(self):
+        game = self.make_turn_0_map()
+
+        game.game_map.add_unit("DF", [13,13], 0)
+        game.game_map.add_unit("DF", [14,14], 1)
+        first = game.game_map[13,13][0]
+        second = game.game_map[14,14][0]
+        self.assertIs(first._stats, second._stats, "Units of a type should share their stats")
+        self.assertFalse(hasattr(first, "__dict__"), "Units should not carry a per instance dict")
+        self.assertEqual((4.0, 3.0, 0, True), (first.damage, first.range, first.speed, first.stationary))
+        self.assertEqual(([13, 13], [14, 14]), ([first.x, first.y], [second.x, second.y]))
+
+        ping = GameUnit("PI", game.config, 0, 5.0, 3, 10)
+        self.assertEqual((0.5, 5.0, 15.0), (ping.speed, ping.health, ping.max_health))
+        self.assertFalse(hasattr(ping, "damage"), "Information units have no firewall damage")
+
+    def test_unit_queries(self):
+        game = self.make_turn_0_map()
+        rng = random.Random(12)
+        locations = list(game.game_map)
+        for x, y in rng.sample(locations, 120):
+            game.game_map.add_unit(rng.choice(["FF", "EF", "DF", "PI", "EI", "SI"]), [x, y], 0 if y < 14 else 1)
+
+        def key(units):
+            return sorted((unit.x, unit.y, unit.unit_type, unit.player_index) for unit in units)
+
+        enemy_destructors = [unit for location in locations for unit in game.game_map[location] if unit.unit_type == "DF" and unit.player_index == 1]
+        self.assertEqual(key(enemy_destructors), key(game.game_map.get_units("DF", 1)))
+        self.assertEqual(sum(unit.cost for unit in game.game_map.get_units(player_index=1) if unit.stationary),
+            sum(game.game_map.get_total_cost(1, unit_type) for unit_type in ["FF", "EF", "DF"]))
+        nearby = [unit for near in game.game_map.get_locations_in_range([13, 13], 4.5) for unit in game.game_map[near] if unit.player_index == 0]
+        self.assertEqual(key(nearby), key(game.game_map.get_units_in_range([13, 13], 4.5, player_index=0)))
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_columnar_unit_storage(self):
+        config = self.make_turn_0_map().config
+        lists = GameMap(config)
+        columns = ColumnarGameMap(config)
+        rng = random.Random(4)
+        locations = list(lists)
+        for step in range(300):
+            x, y = rng.choice(locations)
+            action = rng.random()
+            for game_map in (lists, columns):
+                if action < 0.5:
+                    game_map.add_unit(["FF", "EF", "DF", "PI", "EI", "SI"][step % 6], [x, y], step % 2)
+                elif action < 0.7:
+                    game_map.remove_unit([x, y])
+                elif action < 0.8 and game_map[x, y]:
+                    game_map[x, y][0].pending_removal = True
+                    game_map[x, y][-1].health = 1.5
+                elif action < 0.9 and len(game_map[x, y]) > 1:
+                    del game_map[x, y][0]
+                else:
+                    game_map[x, y] = game_map[x, y][::-1]
+            self.assertEqual(lists.walls_version, columns.walls_version)
+
+        def describe(units):
+            return [(unit.unit_type, unit.player_index, unit.x, unit.y, unit.health, unit.pending_removal) for unit in units]
+
+        for location in locations:
+            self.assertEqual(describe(lists[location]), describe(columns[location]), "Units differ at {}".format(location))
+        for unit_type, player_index in ((None, None), ("DF", 1), ("PI", None), (None, 0)):
+            self.assertEqual(sorted(describe(lists.get_units(unit_type, player_index))), sorted(describe(columns.get_units(unit_type, player_index))))
+            self.assertAlmostEqual(lists.get_total_cost(player_index, unit_type), columns.get_total_cost(player_index, unit_type))
+            for center in ([13, 13], [3, 11], [20.5, 7]):
+                self.assertEqual(sorted(describe(lists.get_units_in_range(center, 3.5, unit_type, player_index))),
+                    sorted(describe(columns.get_units_in_range(center, 3.5, unit_type, player_index))))
+
+        clone = copy.deepcopy(columns)
+        for location in locations:
+            self.assertEqual(describe(columns[location]), describe(clone[location]), "Deep copies should keep the units")
+        clone.remove_unit([13, 13])
+
+        tile = columns[locations[0]]
+        tile[:] = []
+        self.assertEqual([], tile)
+        tile.append(GameUnit("EF", config, 1, None, 0, 13))
+        removed = tile[0]
+        del tile[0]
+        self.assertEqual((1, 0, 13, "EF"), (removed.player_index, removed.x, removed.y, removed.unit_type), "Removed units should keep their values")
+
     def test_future_bits(self):
         game = self.make_turn_0_map()
 
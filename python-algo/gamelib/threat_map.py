@@ -0,0 +1,138 @@
+import copy
+from .game_map import TILE_COUNT, TILE_IDS, TILE_LOCATIONS
+
+class ThreatMap:
+    """Per-tile destructor damage and encryptor shielding for both players
+
+    Every list is indexed by the dense tile ids of GameMap (see GameMap.get_tile_id).
+    The map is built once from the board and afterwards only the tiles around
+    firewalls that changed are updated, using the wall changes recorded by GameMap.
+
+    Attributes :
+        * damage (list): damage[p][tile_id] is the damage per frame that a unit of player p takes
+          on that tile from enemy destructors
+        * attackers (list): attackers[p][tile_id] is the number of enemy destructors that can attack
+          a unit of player p on that tile
+        * shield (list): shield[p][tile_id] is the shield a unit of player p gains on that tile
+          from friendly encryptors
+        * version (int): The walls_version of the game map the threat map was last brought up to date with
+
+    """
+    def __init__(self, config, game_map):
+        """Builds the threat map of a board
+
+        Args:
+            * config (JSON): A json object containing information about the game
+            * game_map (:obj: GameMap): The map to track
+
+        """
+        encryptor_info = config["unitInformation"][1]
+        destructor_info = config["unitInformation"][2]
+        self._encryptor = encryptor_info["shorthand"]
+        self._destructor = destructor_info["shorthand"]
+        self._shield_amount = encryptor_info.get("shieldAmount", 0)
+        self._destructor_damage = destructor_info.get("damage", 0)
+        self._ranges = {
+            self._encryptor: encryptor_info.get("range", 0),
+            self._destructor: destructor_info.get("range", 0)}
+        self.rebuild(game_map)
+
+    def rebuild(self, game_map):
+        """Rebuilds the threat map from scratch
+
+        Args:
+            game_map: The map to track
+
+        """
+        self.damage = [[0] * TILE_COUNT, [0] * TILE_COUNT]
+        self.attackers = [[0] * TILE_COUNT, [0] * TILE_COUNT]
+        self.shield = [[0] * TILE_COUNT, [0] * TILE_COUNT]
+        self._encryptors = [[0] * TILE_COUNT, [0] * TILE_COUNT]
+        self._firewalls = [None] * TILE_COUNT
+        for tile_id, (x, y) in enumerate(TILE_LOCATIONS):
+            self._track(game_map, x, y, tile_id)
+        self.version = game_map.walls_version
+
+    def copy(self):
+        """Copies the threat map, for a forked GameState
+
+        Returns:
+            A new ThreatMap with the same values, which can be updated independently
+
+        """
+        threat_map = copy.copy(self)
+        threat_map.damage = [values[:] for values in self.damage]
+        threat_map.attackers = [values[:] for values in self.attackers]
+        threat_map.shield = [values[:] for values in self.shield]
+        threat_map._encryptors = [values[:] for values in self._encryptors]
+        threat_map._firewalls = self._firewalls[:]
+        return threat_map
+
+    def update(self, game_map):
+        """Brings the threat map up to date with the firewalls of game_map
+
+        Args:
+            game_map: The map the threat map was built from
+
+        """
+        if self.version == game_map.walls_version:
+            return
+        changes = game_map.get_wall_changes(self.version)
+        if changes is None:
+            self.rebuild(game_map)
+            return
+        for x, y, _, _ in changes:
+            tile_id = TILE_IDS[x][y]
+            self._untrack(game_map, x, y, tile_id)
+            self._track(game_map, x, y, tile_id)
+        self.version = game_map.walls_version
+
+    def get_firewall_tiles(self, unit_type, player_index):
+        """Gets the tiles holding a given kind of firewall
+
+        Args:
+            unit_type: The type of firewall to look for
+            player_index: The index corresponding to the player controlling the firewalls
+
+        Returns:
+            The tile ids of the matching firewalls
+
+        """
+        firewall = (unit_type, player_index)
+        return [tile_id for tile_id, tracked in enumerate(self._firewalls) if tracked == firewall]
+
+    def _track(self, game_map, x, y, tile_id):
+        """Adds the firewall currently at a tile, if any
+        """
+        for unit in game_map[x, y]:
+            if unit.stationary:
+                self._firewalls[tile_id] = (unit.unit_type, unit.player_index)
+                self._spread(game_map, x, y, unit.unit_type, unit.player_index, 1)
+                return
+
+    def _untrack(self, game_map, x, y, tile_id):
+        """Removes the firewall last seen at a tile, if any
+        """
+        firewall = self._firewalls[tile_id]
+        if firewall is not None:
+            self._firewalls[tile_id] = None
+            self._spread(game_map, x, y, firewall[0], firewall[1], -1)
+
+    def _spread(self, game_map, x, y, unit_type, player_index, count):
+        """Adds count firewalls of a type to the tiles in their range
+        """
+        if unit_type == self._destructor:
+            # Destructors threaten units of the other player
+            attackers = self.attackers[1 - player_index]
+            damage = self.damage[1 - player_index]
+            for i, j in game_map.get_locations_in_range([x, y], self._ranges[unit_type]):
+                tile_id = TILE_IDS[i][j]
+                attackers[tile_id] += count
+                damage[tile_id] = attackers[tile_id] * self._destructor_damage
+        elif unit_type == self._encryptor:
+            encryptors = self._encryptors[player_index]
+            shield = self.shield[player_index]
+            for i, j in game_map.get_locations_in_range([x, y], self._ranges[unit_type]):
+                tile_id = TILE_IDS[i][j]
+                encryptors[tile_id] += count
+                shield[tile_id] = encryptors[tile_id] * self._shield_amount
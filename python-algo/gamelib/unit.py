@@ -1,3 +1,5 @@
+from operator import attrgetter
+
 def is_stationary(unit_type, firewall_types):
     """
         Args:
@@ -8,9 +10,82 @@ def is_stationary(unit_type, firewall_types):
     """
     return unit_type in firewall_types
 
+class UnitType:
+    """Holds the stats shared by every unit of a type, built once from the config
+
+    Attributes :
+        * unit_type (string): The type's shorthand
+        * config (JSON): Contains information about the game
+        * stationary (bool): Whether or not this type is a firewall
+        * speed (float): A unit will move once every 1/speed frames
+        * damage (int): The amount of damage this firewall unit will deal to enemy information, or the shield an encryptor gives.
+          Only set for firewalls.
+        * damage_f (int): The amount of damage this information unit will deal to enemy firewalls. Only set for information units.
+        * damage_i (int): The amount of damage this information unit will deal to enemy information. Only set for information units.
+        * range (float): The effective range of this unit
+        * max_health (float): The starting health of this unit
+        * cost (int): The resource cost of this unit
+
+    """
+    __slots__ = ("unit_type", "config", "stationary", "speed", "damage", "damage_f", "damage_i", "range", "max_health", "cost")
+
+    def __init__(self, unit_type, config):
+        from .game_state import FIREWALL_TYPES, UNIT_TYPE_TO_INDEX, ENCRYPTOR
+        self.unit_type = unit_type
+        self.config = config
+        self.stationary = is_stationary(unit_type, FIREWALL_TYPES)
+        type_config = config["unitInformation"][UNIT_TYPE_TO_INDEX[unit_type]]
+        if self.stationary:
+            self.speed = 0
+            if unit_type == ENCRYPTOR:
+                self.damage = type_config["shieldAmount"]
+            else:
+                self.damage = type_config["damage"]
+        else:
+            self.speed = type_config["speed"]
+            self.damage_f = type_config["damageF"]
+            self.damage_i = type_config["damageI"]
+        self.range = type_config["range"]
+        self.max_health = type_config["stability"]
+        self.cost = type_config["cost"]
+
+
+# The UnitTypes of the last config seen, every unit of a game shares them
+_unit_types_config = None
+_unit_types = {}
+
+def get_unit_type(unit_type, config):
+    """Gets the shared stats of a unit type
+
+    Args:
+        unit_type: A unit type
+        config: Contains information about the game
+
+    Returns:
+        The UnitType of unit_type under config
+
+    """
+    global _unit_types_config, _unit_types
+    if config is not _unit_types_config:
+        _unit_types_config = config
+        _unit_types = {}
+    stats = _unit_types.get(unit_type)
+    if stats is None:
+        stats = UnitType(unit_type, config)
+        _unit_types[unit_type] = stats
+    return stats
+
+
+def _shared_stat(name):
+    return property(attrgetter("_stats." + name), doc="Shared with every unit of this type, see UnitType")
+
+
 class GameUnit:
     """Holds information about a Unit. 
 
+    Only the location, owner and health are stored per unit, the other attributes are read from the
+    UnitType shared by all units of the same type.
+
     Attributes :
         * unit_type (string): This unit's type
         * config (JSON): Contains information about the game
@@ -28,36 +103,29 @@ class GameUnit:
         * cost (int): The resource cost of this unit
 
     """
+    __slots__ = ("_stats", "player_index", "pending_removal", "x", "y", "health")
+
     def __init__(self, unit_type, config, player_index=None, health=None, x=-1, y=-1):
         """ Initialize unit variables using args passed
 
         """
-        self.unit_type = unit_type
-        self.config = config
+        self._stats = get_unit_type(unit_type, config)
         self.player_index = player_index
         self.pending_removal = False
         self.x = x
         self.y = y
-        self.__serialize_type()
-        self.health = self.max_health if not health else health
+        self.health = self._stats.max_health if not health else health
 
-    def __serialize_type(self):
-        from .game_state import FIREWALL_TYPES, UNIT_TYPE_TO_INDEX, ENCRYPTOR
-        self.stationary = is_stationary(self.unit_type, FIREWALL_TYPES)
-        type_config = self.config["unitInformation"][UNIT_TYPE_TO_INDEX[self.unit_type]]
-        if self.stationary:
-            self.speed = 0
-            if self.unit_type == ENCRYPTOR:
-                self.damage = type_config["shieldAmount"]
-            else:
-                self.damage = type_config["damage"]
-        else:
-            self.speed = type_config["speed"]
-            self.damage_f = type_config["damageF"]
-            self.damage_i = type_config["damageI"]
-        self.range = type_config["range"]
-        self.max_health = type_config["stability"]
-        self.cost = type_config["cost"]
+    unit_type = _shared_stat("unit_type")
+    config = _shared_stat("config")
+    stationary = _shared_stat("stationary")
+    speed = _shared_stat("speed")
+    damage = _shared_stat("damage")
+    damage_f = _shared_stat("damage_f")
+    damage_i = _shared_stat("damage_i")
+    range = _shared_stat("range")
+    max_health = _shared_stat("max_health")
+    cost = _shared_stat("cost")
 
     def __toString(self):
         owner = "Friendly" if self.player_index == 0 else "Enemy"
@@ -69,4 +137,3 @@ class GameUnit:
 
     def __repr__(self):
         return self.__toString()
-
@@ -1,4 +1,20 @@
+import atexit
+import json
+import os
+import re
 import sys
+import threading
+import time
+from collections import OrderedDict, deque
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import ujson
+except ImportError:
+    ujson = None
 
 
 BANNER_TEXT = "---------------- Starting Your Algo --------------------"
@@ -29,13 +45,346 @@ def send_command(cmd):
     sys.stdout.write(cmd.strip() + "\n")
     sys.stdout.flush()
 
+# The (loads, dumps) of every installed json library, fastest first
+JSON_CODECS = {}
+if orjson is not None:
+    JSON_CODECS["orjson"] = (orjson.loads, lambda obj: orjson.dumps(obj).decode())
+if ujson is not None:
+    JSON_CODECS["ujson"] = (ujson.loads, ujson.dumps)
+JSON_CODECS["stdlib"] = (json.loads, json.dumps)
+_json_codec = None
+
+
+def set_json_codec(codec=None):
+    """Chooses the json library used for the messages exchanged with the game engine
+
+    Args:
+        codec: "orjson", "ujson" or "stdlib". If None, the GAMELIB_JSON_CODEC environment variable is used,
+            defaulting to the fastest installed library.
+
+    Returns:
+        The name of the codec in use. Falls back to the fastest installed library if the requested one is not installed.
+
+    """
+    global _json_codec
+    if codec is None:
+        codec = os.environ.get("GAMELIB_JSON_CODEC")
+    if codec is not None and codec not in JSON_CODECS:
+        debug_write("The '{}' json codec is not installed. Using {}.".format(codec, next(iter(JSON_CODECS))))
+        codec = None
+    if codec is None:
+        codec = next(iter(JSON_CODECS))
+    _json_codec = (codec,) + JSON_CODECS[codec]
+    return codec
+
+
+def get_json_codec():
+    """The name of the json library used for the messages exchanged with the game engine, see set_json_codec
+    """
+    return _json_codec[0]
+
+
+def json_loads(text):
+    """Parses a json message with the codec chosen by set_json_codec
+    """
+    return _json_codec[1](text)
+
+
+def json_dumps(obj):
+    """Serializes a json message with the codec chosen by set_json_codec
+    """
+    return _json_codec[2](obj)
+
+
+_TURN_INFO_TYPE = re.compile(r'"turnInfo"\s*:\s*\[\s*(\d+)')
+_DECODER = json.JSONDecoder()
+
+
+def get_state_type(message):
+    """Reads the type of a game state message without parsing it
+
+    Args:
+        message: A message from the game engine
+
+    Returns:
+        The first entry of turnInfo, 0 for a turn, 1 for an action frame and 2 for the end of the game,
+        or None if the message is not a game state
+
+    """
+    match = _TURN_INFO_TYPE.search(message)
+    return int(match.group(1)) if match else None
+
+
+def parse_fields(message, *keys):
+    """Parses the values of some keys of a json object message, skipping the rest of it
+
+    Only for keys that appear once, at the top level of the message, like the turnInfo, p1Stats or events of a game state.
+
+    Args:
+        message: A json object, as a string
+        keys: The keys to parse
+
+    Returns:
+        A dict of the parsed values, without the keys missing from message
+
+    """
+    fields = {}
+    for key in keys:
+        match = re.search(r'"{}"\s*:\s*'.format(re.escape(key)), message)
+        if match:
+            fields[key] = _DECODER.raw_decode(message, match.end())[0]
+    return fields
+
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+
+# Queued by DebugLog.new_turn, with the number of messages dropped during the turn that ended
+_TURN_MARKER = object()
+
+
+class DebugLog:
+    """Buffers debug messages and writes them to the games debug output off the hot path
+
+    Logging a message only checks its level and appends it to a ring buffer, it is formatted and written later:
+    by a background thread every interval seconds in "thread" mode, at the start of every turn in "turn" mode,
+    or right away in "sync" mode. If the buffer fills up the oldest messages are dropped, so a slow engine pipe
+    never blocks the algo. At most max_bytes_per_turn bytes are written per turn, the rest is dropped and counted.
+
+    Attributes :
+        * level (int): Messages below this level, DEBUG, INFO, WARNING or ERROR, are ignored
+        * mode (str): "thread", "turn" or "sync"
+        * max_bytes_per_turn (int): The most bytes written between two calls to new_turn
+        * dropped (int): The messages dropped this turn, because the buffer was full or max_bytes_per_turn was reached
+
+    """
+    def __init__(self, level=INFO, mode="thread", max_bytes_per_turn=1 << 16, buffer_size=4096, interval=0.05, stream=None):
+        """Creates a log, its thread is started by the first message
+
+        Args:
+            * level (int): The lowest level written
+            * mode (str): When messages are written, "thread", "turn" or "sync"
+            * max_bytes_per_turn (int): The most bytes written per turn
+            * buffer_size (int): The number of messages buffered before the oldest are dropped
+            * interval (float): How often the thread writes the buffered messages, in seconds
+            * stream: Where messages are written, sys.stderr at the time of writing if None
+
+        """
+        self.level = level
+        self.mode = mode
+        self.max_bytes_per_turn = max_bytes_per_turn
+        self.interval = interval
+        self.stream = stream
+        self.dropped = 0
+        # The bytes written in the turn flush is at
+        self._written = 0
+        self._buffer = deque(maxlen=buffer_size)
+        # Guards the buffer and the counters, never held while writing
+        self._lock = threading.Lock()
+        # Keeps the writes of flush in order
+        self._write_lock = threading.Lock()
+        # Set by flush once the turn reached max_bytes_per_turn, so later messages are dropped right away
+        self._capped = False
+        self._pending_turns = 0
+        self._thread = None
+
+    def log(self, level, message, *args):
+        """Buffers a message
+
+        Args:
+            * level (int): DEBUG, INFO, WARNING or ERROR
+            * message: The message, formatted with message.format(*args) when it is written.
+              Arguments are read at that time, pass copies of objects that are about to change
+            * args: The arguments of the message
+
+        """
+        if level < self.level:
+            return
+        with self._lock:
+            if self._capped:
+                self.dropped += 1
+                return
+            if len(self._buffer) == self._buffer.maxlen:
+                message_dropped, dropped = self._buffer.popleft()
+                # A dropped turn marker hands its count over to this turn
+                self.dropped += dropped if message_dropped is _TURN_MARKER else 1
+            self._buffer.append((message, args))
+        if self.mode == "sync":
+            self.flush()
+        elif self._thread is None and self.mode == "thread":
+            self._thread = threading.Thread(target=self.__drain, name="debug_log", daemon=True)
+            self._thread.start()
+
+    def flush(self):
+        """Formats and writes the buffered messages now
+        """
+        with self._write_lock:
+            with self._lock:
+                entries = list(self._buffer)
+                self._buffer.clear()
+                written = self._written
+            lines = []
+            dropped = 0
+            turns = 0
+            for message, args in entries:
+                if message is _TURN_MARKER:
+                    dropped += args
+                    if dropped:
+                        # Not counted against the limit, so it is always written
+                        lines.append("Dropped {} debug messages last turn, over the buffer size or {} bytes\n".format(dropped, self.max_bytes_per_turn))
+                    written = dropped = 0
+                    turns += 1
+                    continue
+                if written >= self.max_bytes_per_turn:
+                    dropped += 1
+                    continue
+                try:
+                    line = (message.format(*args) if args else str(message)).rstrip() + "\n"
+                except Exception as error:
+                    line = "Could not format debug message {!r}: {!r}\n".format(message, error)
+                if written + len(line) > self.max_bytes_per_turn:
+                    dropped += 1
+                    written = self.max_bytes_per_turn
+                    continue
+                written += len(line)
+                lines.append(line)
+            with self._lock:
+                self._pending_turns -= turns
+                self._written = written
+                self.dropped += dropped
+                # Messages of a turn that started since entries were taken are not dropped for the previous one
+                self._capped = written >= self.max_bytes_per_turn and not self._pending_turns
+            self.__write(lines)
+
+    def new_turn(self):
+        """Resets the per turn limit, called by AlgoCore at the start of every turn
+
+        What is left of the previous turn is written before the messages of the new one, by the thread in "thread" mode
+        so a slow engine pipe does not hold up the turn, right away in the other modes.
+        """
+        with self._lock:
+            self._buffer.append((_TURN_MARKER, self.dropped))
+            self._pending_turns += 1
+            self.dropped = 0
+            self._capped = False
+        if self.mode != "thread":
+            self.flush()
+        elif self._thread is None:
+            self._thread = threading.Thread(target=self.__drain, name="debug_log", daemon=True)
+            self._thread.start()
+
+    def __write(self, lines):
+        if lines:
+            stream = self.stream or sys.stderr
+            stream.write("".join(lines))
+            stream.flush()
+
+    def __drain(self):
+        while True:
+            time.sleep(self.interval)
+            self.flush()
+
+
+_debug_log = DebugLog()
+atexit.register(lambda: _debug_log.flush())
+
+
+def get_debug_log():
+    """The DebugLog used by debug_write and debug_log, whose level, mode and max_bytes_per_turn can be changed
+    """
+    return _debug_log
+
+
+def debug_log(level, message, *args):
+    """Logs a message to the games debug output, see DebugLog.log
+
+    Args:
+        level: DEBUG, INFO, WARNING or ERROR
+        message: The message, only formatted with message.format(*args) if level is logged
+        args: The arguments of the message
+
+    """
+    _debug_log.log(level, message, *args)
+
+
 def debug_write(*msg):
     """Prints a message to the games debug output
 
+    The message is formatted right away, then buffered and written shortly after, see DebugLog.
+    Use debug_log to only format messages that are written.
+
     Args:
         msg: The message to output
 
     """
     #Printing to STDERR is okay and printed out by the game but doesn't effect turns.
-    sys.stderr.write(", ".join(map(str, msg)).strip() + "\n")
-    sys.stderr.flush()
+    if INFO >= _debug_log.level:
+        _debug_log.log(INFO, ", ".join(map(str, msg)).strip())
+
+
+set_json_codec()
+
+
+class Memo:
+    """A dictionary of bounded size, that forgets the least recently used entries first
+
+    Meant for results worth keeping for the whole game, keyed for example by GameMap.zobrist_hash,
+    so that they are reused across search branches and turns without growing without bound.
+    Safe to share between threads, such as the main thread and AlgoCore.precompute_next_turn.
+
+    Attributes :
+        * max_size (int): The number of entries kept
+
+    """
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self.__entries = OrderedDict()
+        # Reads reorder the entries too, so every access is guarded
+        self.__lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Gets a stored result
+
+        Args:
+            key: The key the result was stored with
+            default: What to return if there is no result for key
+
+        Returns:
+            The result stored for key, or default
+
+        """
+        with self.__lock:
+            if key not in self.__entries:
+                return default
+            self.__entries.move_to_end(key)
+            return self.__entries[key]
+
+    def put(self, key, value):
+        """Stores a result, forgetting the least recently used one if the memo is full
+
+        Args:
+            key: A hashable key
+            value: The result to store
+
+        """
+        with self.__lock:
+            self.__entries[key] = value
+            self.__entries.move_to_end(key)
+            if len(self.__entries) > self.max_size:
+                self.__entries.popitem(last=False)
+
+    def clear(self):
+        """Forgets every result
+        """
+        with self.__lock:
+            self.__entries.clear()
+
+    def __contains__(self, key):
+        with self.__lock:
+            return key in self.__entries
+
+    def __len__(self):
+        return len(self.__entries)